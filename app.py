@@ -1,11 +1,12 @@
 import streamlit as st
 import os
-from components.auth import handle_authentication, check_authentication
+from components.auth import handle_authentication, check_authentication, is_admin
 from pages.landing import show_landing_page
 from components.dashboard import show_dashboard
 from pages.results import show_results_page
 from pages.about import show_about_page
 from utils.styling import load_custom_css
+from utils.profiling import PROFILE_ALWAYS, profile_run, show_profile_report
 
 # Page configuration
 st.set_page_config(
@@ -28,7 +29,7 @@ load_custom_css()
 
 def main():
     # Check authentication status
-    if not st.session_state.authenticated:
+    if not check_authentication():
         if st.session_state.page == "landing":
             show_landing_page()
         elif st.session_state.page == "auth":
@@ -48,5 +49,14 @@ def main():
             st.session_state.page = "dashboard"
             st.rerun()
 
+def profiling_requested():
+    """Admins profile reruns with ?profile=1 or EXOHUNTER_PROFILE=1"""
+    return is_admin() and (PROFILE_ALWAYS or st.query_params.get("profile") == "1")
+
 if __name__ == "__main__":
-    main()
+    if profiling_requested():
+        with profile_run(st.session_state.page) as profile:
+            main()
+        show_profile_report(profile)
+    else:
+        main()
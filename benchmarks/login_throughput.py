@@ -0,0 +1,40 @@
+"""Login throughput of ``UserStore`` under concurrent callers
+
+Run from the repository root with ``python -m benchmarks.login_throughput``;
+EXOHUNTER_PBKDF2_ITERATIONS sets the hash cost being measured.
+"""
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from utils.user_store import UserStore
+
+def benchmark_logins(store, email, password, threads=8, attempts=64):
+    """Logins per second with ``threads`` concurrent callers"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: store.authenticate(email, password), range(attempts)))
+    elapsed = time.perf_counter() - start
+    if not all(results):
+        raise RuntimeError("Benchmark login failed")
+    return attempts / elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.login_throughput", description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8], help="concurrent callers to measure")
+    parser.add_argument("--attempts", type=int, default=64, help="logins per measurement")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = UserStore(os.path.join(directory, "users.sqlite3"))
+        store.create_user("bench@exohunter.com", "bench-password")
+        try:
+            for threads in args.threads:
+                rate = benchmark_logins(store, "bench@exohunter.com", "bench-password", threads, args.attempts)
+                print(f"{threads} threads: {rate:.1f} logins/s at {store.iterations} iterations")
+        finally:
+            store.close()
+
+if __name__ == "__main__":
+    main()
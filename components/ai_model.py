@@ -1,238 +1,211 @@
+import os
+import logging
+import functools
+import contextlib
 import streamlit as st
-import pandas as pd
-import numpy as np
-import warnings
-warnings.filterwarnings("ignore")
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, accuracy_score
-import xgboost as xgb
-
-# Try importing optional dependencies
-try:
-    import shap
-    SHAP_AVAILABLE = True
-except ImportError:
-    SHAP_AVAILABLE = False
-
-try:
-    import tensorflow as tf
-    from tensorflow.keras import layers, models
-    TF_AVAILABLE = True
-except ImportError:
-    TF_AVAILABLE = False
-    
-import io
-import time
+from core import pipeline, demo, feature_store
+from core.admission import get_admission_controller
+from core.batching import BatchDispatcher
+from core.worker_pool import ModelWorkerPool, train_in_subprocess
+from core.registry import ModelRegistry, ScoringBackend, publish_artifacts, latest_version_dir
+from core.pipeline import SHAP_AVAILABLE, FEATURE_COLUMNS
+from utils.instrumentation import span
 
-def load_or_generate_dataset():
-    """Load NASA KOI dataset or generate synthetic data - using exact code from provided file"""
-    KOI_URL = "https://exoplanetarchive.ipac.caltech.edu/TblView/nph-tblView?config=KOI&format=csv"
-    
-    try:
-        st.info("Attempting to download KOI CSV from NASA Exoplanet Archive...")
-        # skip comment lines
-        df = pd.read_csv(KOI_URL, comment='#')
-        st.success(f"Downloaded KOI table with shape: {df.shape}")
-        
-        # Keep only relevant columns
-        cols = [c for c in ['koi_period','koi_depth','koi_duration','koi_impact','koi_prad','koi_disposition'] if c in df.columns]
-        df = df[cols].copy()
-        
-        # Normalize disposition
-        if 'koi_disposition' in df.columns:
-            df['koi_disposition'] = df['koi_disposition'].astype(str).str.upper()
-            df = df[df['koi_disposition'].isin(['CANDIDATE','CONFIRMED','FALSE POSITIVE','FALSE_POSITIVE','FALSE_POS'])]
-            df['label'] = df['koi_disposition'].apply(lambda x: 0 if 'FALSE' in x else 1)
+class _StreamlitLogHandler(logging.Handler):
+    """Show pipeline log records as Streamlit status messages"""
+
+    def emit(self, record):
+        message = self.format(record)
+        if record.levelno >= logging.ERROR:
+            st.error(message)
+        elif record.levelno >= logging.WARNING:
+            st.warning(message)
         else:
-            raise ValueError("Disposition column missing in KOI fetch -> fallback")
-            
-        # Fill numeric columns
-        for c in ['koi_period','koi_depth','koi_duration','koi_impact','koi_prad']:
-            if c in df.columns:
-                df[c] = pd.to_numeric(df[c], errors='coerce').fillna(df[c].median())
-            else:
-                df[c] = 0
-                
-        df = df[['koi_period','koi_depth','koi_duration','koi_impact','koi_prad','label']].dropna().reset_index(drop=True)
-        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-        
-        if df.shape[0] < 500:
-            raise ValueError("KOI table too small, using synthetic instead.")
-            
-        return df
-        
-    except Exception as e:
-        st.warning(f"Could not download KOI CSV. Generating synthetic dataset. Error: {e}")
-        # synthetic dataset - exact code from provided file
-        n = 9000
-        rng = np.random.RandomState(42)
-        koi_period = 10**rng.uniform(np.log10(0.3), np.log10(500), n)
-        koi_depth = rng.exponential(scale=200, size=n) / 1e5
-        koi_duration = np.clip(rng.normal(3,1,n), 0.1, 20)
-        koi_impact = np.clip(rng.beta(2,2,n), 0, 1)
-        koi_prad = np.clip(rng.normal(2,1,n), 0.1, 20)
-        prob = (koi_depth*1e5) * (1/(1+np.exp(-(koi_prad-1.2)))) * (1/(1+np.log1p(koi_period)))
-        prob = (prob - prob.min())/(prob.max()-prob.min())
-        label = (prob + 0.1*rng.randn(n) > 0.5).astype(int)
-        
-        df = pd.DataFrame({
-            'koi_period': koi_period,
-            'koi_depth': koi_depth,
-            'koi_duration': koi_duration,
-            'koi_impact': koi_impact,
-            'koi_prad': koi_prad,
-            'label': label
-        })
-        return df
+            st.info(message)
 
-@st.cache_resource
-def train_models():
-    """Train the hybrid XGBoost + CNN model - using exact code from provided file"""
-    with st.spinner("Training AI models..."):
-        # Load dataset
-        df = load_or_generate_dataset()
-        
-        # Preprocessing
-        X = df[['koi_period','koi_depth','koi_duration','koi_impact','koi_prad']].values
-        y = df['label'].values
-        
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
-        
-        X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42, stratify=y)
-        
-        # XGBoost Model - exact code
-        xgb_model = xgb.XGBClassifier(n_estimators=100, use_label_encoder=False, eval_metric='logloss')
-        xgb_model.fit(X_train, y_train)
-        
-        # Test predictions
-        y_pred_xgb = xgb_model.predict(X_test)
-        xgb_acc = accuracy_score(y_test, y_pred_xgb)
-        
-        # CNN Model (if TensorFlow is available)
-        cnn_model = None
-        cnn_acc = 0.0
-        fusion_acc = xgb_acc
-        
-        if TF_AVAILABLE:
-            # Simple CNN Model - exact code
-            X_train_cnn = X_train.reshape(-1,5,1)
-            X_test_cnn = X_test.reshape(-1,5,1)
-            
-            cnn_model = models.Sequential([
-                layers.Conv1D(32, 2, activation='relu', input_shape=(5,1)),
-                layers.MaxPooling1D(2),
-                layers.Flatten(),
-                layers.Dense(32, activation='relu'),
-                layers.Dense(1, activation='sigmoid')
-            ])
-            cnn_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-            cnn_model.fit(X_train_cnn, y_train, epochs=5, batch_size=32, verbose=0)
-            
-            y_pred_cnn = (cnn_model.predict(X_test_cnn) > 0.5).astype(int)
-            y_pred_fusion = ((y_pred_xgb + y_pred_cnn.flatten()) / 2 > 0.5).astype(int)
-            
-            # Calculate accuracies
-            cnn_acc = accuracy_score(y_test, y_pred_cnn)
-            fusion_acc = accuracy_score(y_test, y_pred_fusion)
-        
-        return {
-            'xgb_model': xgb_model,
-            'cnn_model': cnn_model,
-            'scaler': scaler,
-            'test_data': (X_test, y_test),
-            'accuracies': {
-                'xgb': xgb_acc,
-                'cnn': cnn_acc,
-                'fusion': fusion_acc
-            },
-            'tf_available': TF_AVAILABLE
-        }
-
-def run_ai_detection(uploaded_data):
-    """Run AI detection on uploaded data"""
-    # Get trained models
-    model_data = train_models()
-    xgb_model = model_data['xgb_model']
-    cnn_model = model_data['cnn_model']
-    scaler = model_data['scaler']
-    tf_available = model_data.get('tf_available', False)
-    
-    # Prepare uploaded data
-    required_cols = ['koi_period','koi_depth','koi_duration','koi_impact','koi_prad']
-    
-    # Check if uploaded data has the required columns
-    if all(col in uploaded_data.columns for col in required_cols):
-        X_user = uploaded_data[required_cols].values
+@contextlib.contextmanager
+def _pipeline_messages_in_ui():
+    """Route core pipeline INFO/WARNING logs to the current Streamlit page"""
+    handler = _StreamlitLogHandler(level=logging.INFO)
+    pipeline_logger = logging.getLogger(pipeline.__name__)
+    previous_level = pipeline_logger.level
+    pipeline_logger.addHandler(handler)
+    pipeline_logger.setLevel(logging.INFO)
+    try:
+        yield
+    finally:
+        pipeline_logger.removeHandler(handler)
+        pipeline_logger.setLevel(previous_level)
+
+@contextlib.contextmanager
+def _queue_feedback(activity):
+    """``on_wait`` callback showing the session's place in the admission queue"""
+    placeholder = None
+
+    def on_wait(position):
+        nonlocal placeholder
+        if placeholder is None:
+            placeholder = st.empty()
+        placeholder.info(f"⏳ Server busy — you are #{position} in line for {activity}...")
+
+    try:
+        yield on_wait
+    finally:
+        if placeholder is not None:
+            placeholder.empty()
+
+def load_or_generate_dataset():
+    """Load NASA KOI dataset or generate synthetic data"""
+    with _pipeline_messages_in_ui(), span('dataset.load') as load:
+        data = pipeline.load_or_generate_dataset()
+        load.rows = len(data)
+        return data
+
+# Small uploads from all sessions are merged into shared predict calls
+BATCHING_ENABLED = os.environ.get("EXOHUNTER_BATCHING", "1") != "0"
+BATCH_MAX_REQUEST_ROWS = int(os.environ.get("EXOHUNTER_BATCH_MAX_REQUEST_ROWS", "50000"))
+BATCH_MAX_LATENCY_MS = float(os.environ.get("EXOHUNTER_BATCH_MAX_LATENCY_MS", "20"))
+
+# With EXOHUNTER_MODEL_WORKERS > 0 the models live in separate worker processes
+MODEL_WORKERS = int(os.environ.get("EXOHUNTER_MODEL_WORKERS", "0"))
+MODEL_WORKER_TIMEOUT = float(os.environ.get("EXOHUNTER_MODEL_WORKER_TIMEOUT", "600"))
+
+# Published model versions; `python -m core.cli publish` hot-swaps a running app
+ARTIFACTS_ROOT = os.environ.get("EXOHUNTER_ARTIFACTS_ROOT", "artifacts")
+MODEL_WATCH_INTERVAL = float(os.environ.get("EXOHUNTER_MODEL_WATCH_INTERVAL", "5"))
+
+def _load_backend(directory):
+    """Load one published version for in-process or worker-pool scoring"""
+    if MODEL_WORKERS > 0:
+        pool = ModelWorkerPool(directory, workers=MODEL_WORKERS).start()
+        model_data = pool.manifest
+        predict_fn = functools.partial(pool.submit, timeout=MODEL_WORKER_TIMEOUT)
+        close = pool.stop
     else:
-        # If columns are missing, try to map or use first 5 numeric columns
-        numeric_cols = uploaded_data.select_dtypes(include=[np.number]).columns.tolist()[:5]
-        if len(numeric_cols) >= 5:
-            X_user = uploaded_data[numeric_cols].values
+        pool = None
+        model_data = pipeline.load_models(directory)
+        predict_fn = functools.partial(pipeline.score_features, model_data)
+        close = None
+
+    # One batch in flight per worker process, so every worker stays busy
+    dispatcher = BatchDispatcher(predict_fn, max_latency_ms=BATCH_MAX_LATENCY_MS, concurrency=max(MODEL_WORKERS, 1))
+    dispatcher.start()
+
+    def shutdown():
+        dispatcher.stop()
+        if close is not None:
+            close()
+
+    return ScoringBackend(model_data, predict_fn, shutdown, pool=pool, dispatcher=dispatcher)
+
+def _bootstrap_artifacts(progress_callback=None):
+    """Train and publish a first model version when none exists yet"""
+    staging = os.path.join(ARTIFACTS_ROOT, "staging")
+    with get_admission_controller().admit('train'), span('model.train'):
+        if MODEL_WORKERS > 0:
+            pipeline.report_progress(progress_callback, 'load_dataset', 0)
+            train_in_subprocess(staging)
         else:
-            st.error("Uploaded data doesn't have enough numeric columns for prediction.")
+            model_data = pipeline.train_models(progress_callback=progress_callback)
+            pipeline.save_models(model_data, staging)
+    publish_artifacts(staging, ARTIFACTS_ROOT)
+
+@st.cache_resource
+def get_model_registry(_progress_callback=None):
+    """Process-wide registry serving the latest published model version
+
+    Trains and publishes a first version if the artifacts root is empty, then
+    watches ``LATEST`` so newly published versions are swapped in without a restart.
+    ``_progress_callback`` is excluded from the cache key.
+    """
+    with st.spinner("Loading AI models..."), _pipeline_messages_in_ui():
+        if latest_version_dir(ARTIFACTS_ROOT) is None:
+            _bootstrap_artifacts(_progress_callback)
+        registry = ModelRegistry(_load_backend)
+        registry.publish(latest_version_dir(ARTIFACTS_ROOT), wait=True)
+    registry.watch(ARTIFACTS_ROOT, MODEL_WATCH_INTERVAL)
+    return registry
+
+def train_models(_progress_callback=None):
+    """Return the model data of the version currently being served"""
+    registry = get_model_registry(_progress_callback=_progress_callback)
+    with registry.acquire() as backend:
+        return backend.model_data
+
+def run_ai_detection(uploaded_data, progress_callback=None, store=None):
+    """Run AI detection on uploaded data
+
+    ``progress_callback(stage, rows)`` is called as each stage in ``PIPELINE_STAGES`` starts.
+    The whole analysis runs on the model version that was current when it started.
+    Uploads too large for the batch dispatcher wait for a ``score`` admission slot;
+    small ones are already coalesced into shared predict calls and go straight through.
+    When ``store`` is the upload's ``FeatureStore``, large uploads are scored
+    chunk by chunk from it and only one chunk is held in memory at a time.
+    """
+    registry = get_model_registry(_progress_callback=progress_callback)
+
+    with registry.acquire() as backend:
+        score_fn = backend.predict_fn if backend.pool is not None else None
+        batched = BATCHING_ENABLED and len(uploaded_data) <= BATCH_MAX_REQUEST_ROWS
+        if batched:
+            score_fn = backend.dispatcher.submit
+        out_of_core = store is not None and not batched
+
+        input_bytes = uploaded_data.memory_usage().sum()
+        if out_of_core:
+            input_bytes = input_bytes * min(feature_store.SCORE_CHUNK_ROWS, store.rows) // max(store.rows, 1)
+
+        try:
+            with contextlib.ExitStack() as stack:
+                if not batched:
+                    on_wait = stack.enter_context(_queue_feedback("scoring"))
+                    stack.enter_context(get_admission_controller().admit('score', input_bytes, on_wait=on_wait))
+                with span('detect', rows=len(uploaded_data)):
+                    if out_of_core:
+                        return feature_store.run_detection(backend.model_data, store, progress_callback, score_fn)
+                    return pipeline.run_detection(backend.model_data, uploaded_data, progress_callback, score_fn)
+        except ValueError as e:
+            st.error(str(e))
             return None
-    
-    # Scale the data
-    X_user_scaled = scaler.transform(X_user)
-    
-    # Make predictions
-    pred_xgb = xgb_model.predict(X_user_scaled)
-    prob_xgb = xgb_model.predict_proba(X_user_scaled)[:, 1]
-    
-    if tf_available and cnn_model is not None:
-        pred_cnn = (cnn_model.predict(X_user_scaled.reshape(-1,5,1)) > 0.5).astype(int)
-        prob_cnn = cnn_model.predict(X_user_scaled.reshape(-1,5,1)).flatten()
-        pred_fusion = ((pred_xgb + pred_cnn.flatten()) / 2 > 0.5).astype(int)
-        prob_fusion = (prob_xgb + prob_cnn) / 2
-    else:
-        # Use only XGBoost if TensorFlow is not available
-        pred_cnn = pred_xgb
-        prob_cnn = prob_xgb
-        pred_fusion = pred_xgb
-        prob_fusion = prob_xgb
-    
-    # Determine overall result
-    exoplanet_count = pred_fusion.sum()
-    confidence = prob_fusion.max()
-    
-    result = {
-        'predictions': pred_fusion,
-        'probabilities': prob_fusion,
-        'exoplanet_count': exoplanet_count,
-        'confidence': confidence,
-        'model_accuracies': model_data['accuracies'],
-        'individual_preds': {
-            'xgb': pred_xgb,
-            'cnn': pred_cnn.flatten() if isinstance(pred_cnn, np.ndarray) else pred_cnn
-        }
-    }
-    
-    return result
-
-def get_model_explainability(uploaded_data):
+
+@st.cache_resource(show_spinner="Preparing the demo dataset...")
+def get_demo_dataset():
+    """The bundled demo table, parsed once per process"""
+    return demo.load_demo_dataset()
+
+@st.cache_resource(show_spinner="Preparing the demo dataset...")
+def _demo_bundle(model_version, _backend):
+    """Demo table, results and sketch for one model version; ``_backend`` is excluded from the key"""
+    score_fn = _backend.predict_fn if _backend.pool is not None else None
+    return demo.prepare_demo(_backend.model_data, score_fn=score_fn)
+
+def load_demo_bundle():
+    """Precomputed demo analysis for the model version currently being served"""
+    registry = get_model_registry()
+    with registry.acquire() as backend:
+        return _demo_bundle(backend.model_data['model_version'], backend)
+
+def get_model_explainability(uploaded_data, progress_callback=None):
     """Generate SHAP values for model explainability"""
     if not SHAP_AVAILABLE:
         return None, None
-        
-    model_data = train_models()
-    xgb_model = model_data['xgb_model']
-    scaler = model_data['scaler']
-    
-    # Prepare data
-    required_cols = ['koi_period','koi_depth','koi_duration','koi_impact','koi_prad']
-    
-    if all(col in uploaded_data.columns for col in required_cols):
-        X_user = uploaded_data[required_cols].values
-    else:
-        numeric_cols = uploaded_data.select_dtypes(include=[np.number]).columns.tolist()[:5]
-        X_user = uploaded_data[numeric_cols].values
-    
-    X_user_scaled = scaler.transform(X_user)
-    
-    # Generate SHAP values
-    explainer = shap.Explainer(xgb_model)
-    shap_values = explainer(X_user_scaled)
-    
-    return shap_values, required_cols
+
+    registry = get_model_registry(_progress_callback=progress_callback)
+    with registry.acquire() as backend, _queue_feedback("SHAP analysis") as on_wait, get_admission_controller().admit(
+        'shap', uploaded_data.memory_usage().sum(), on_wait=on_wait
+    ), span('shap', rows=len(uploaded_data)):
+        if backend.pool is None:
+            return pipeline.explain(backend.model_data, uploaded_data, progress_callback)
+
+        import shap
+
+        X = pipeline.select_features(uploaded_data)
+        pipeline.report_progress(progress_callback, 'shap', len(X))
+        outputs = backend.pool.submit(X, op='shap', timeout=MODEL_WORKER_TIMEOUT)
+        explanation = shap.Explanation(
+            values=outputs['values'],
+            base_values=outputs['base_values'],
+            data=outputs['data'],
+            feature_names=FEATURE_COLUMNS
+        )
+        return explanation, FEATURE_COLUMNS
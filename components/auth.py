@@ -1,10 +1,30 @@
 import streamlit as st
-import hashlib
 import os
+from utils.user_store import UserStore
 
-def hash_password(password):
-    """Hash password using SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Comma-separated emails allowed to see operator tooling such as the debug panel
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get("EXOHUNTER_ADMINS", "").split(",") if email.strip()}
+
+# Demo credentials for testing, created in the user store on first start
+DEMO_USERS = {
+    "demo@exohunter.com": "demo123",
+    "explorer@exohunter.com": "explore123"
+}
+
+@st.cache_resource
+def get_user_store():
+    """Process-wide SQLite user store with the demo accounts in place"""
+    store = UserStore()
+    for email, password in DEMO_USERS.items():
+        store.ensure_user(email, password)
+    return store
+
+def start_session(email):
+    """Mark the session as logged in and keep a signed token for later reruns"""
+    st.session_state.authenticated = True
+    st.session_state.username = email.split('@')[0].capitalize()
+    st.session_state.email = email
+    st.session_state.session_token = get_user_store().issue_token(email)
 
 def handle_authentication():
     """Handle user authentication (signup/login)"""
@@ -35,8 +55,7 @@ def handle_authentication():
                 if email and password:
                     # Simple authentication (in production, use proper database)
                     if authenticate_user(email, password):
-                        st.session_state.authenticated = True
-                        st.session_state.username = email.split('@')[0].capitalize()
+                        start_session(email)
                         st.session_state.page = "dashboard"
                         st.success("Login successful!")
                         st.rerun()
@@ -61,8 +80,7 @@ def handle_authentication():
                 if new_email and new_password and confirm_password:
                     if new_password == confirm_password:
                         if register_user(new_email, new_password):
-                            st.session_state.authenticated = True
-                            st.session_state.username = new_email.split('@')[0].capitalize()
+                            start_session(new_email)
                             st.session_state.page = "dashboard"
                             st.success("Account created successfully!")
                             st.rerun()
@@ -89,29 +107,37 @@ def handle_authentication():
 
 def authenticate_user(email, password):
     """Authenticate user credentials"""
-    # Demo credentials for testing
-    demo_users = {
-        "demo@exohunter.com": hash_password("demo123"),
-        "explorer@exohunter.com": hash_password("explore123")
-    }
-    
-    hashed_password = hash_password(password)
-    return email in demo_users and demo_users[email] == hashed_password
+    return get_user_store().authenticate(email, password)
 
 def register_user(email, password):
-    """Register new user (simplified for demo)"""
-    # In production, store in database
-    if email not in ["demo@exohunter.com", "explorer@exohunter.com"]:
-        return True
-    return False
+    """Register new user; returns False when the email already exists"""
+    return get_user_store().create_user(email, password)
+
+def current_email():
+    """Email proven by the session token, or None without a valid token"""
+    token = st.session_state.get('session_token')
+    return get_user_store().verify_token(token) if token else None
 
 def check_authentication():
-    """Check if user is authenticated"""
-    return st.session_state.get('authenticated', False)
+    """Check if user is authenticated with a valid, unexpired session token"""
+    if not st.session_state.get('authenticated', False):
+        return False
+    if current_email() is None:
+        # Expired or tampered token: ask for a fresh login
+        st.session_state.authenticated = False
+        st.session_state.page = "auth"
+        return False
+    return True
+
+def is_admin():
+    """Check if the logged-in user is listed in EXOHUNTER_ADMINS"""
+    return check_authentication() and current_email() in ADMIN_EMAILS
 
 def logout_user():
     """Logout current user"""
     st.session_state.authenticated = False
     st.session_state.username = ""
+    st.session_state.email = ""
+    st.session_state.session_token = None
     st.session_state.page = "landing"
     st.rerun()
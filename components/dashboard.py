@@ -1,8 +1,14 @@
 import streamlit as st
-from components.data_processing import handle_data_upload, show_dataset_insights
-from components.ai_model import run_ai_detection
+from components.data_processing import handle_data_upload, show_dataset_insights, preview_rows
+from components.ai_model import run_ai_detection, load_demo_bundle
+from utils.figure_cache import dataset_key
 from components.visualizations import show_exovisuals, show_shap_explainability
-from components.auth import logout_user
+from components.history import show_history_tab
+import tracemalloc
+import pandas as pd
+from components.auth import logout_user, is_admin
+from utils.instrumentation import get_recorder, rss_bytes
+from core.admission import get_admission_controller
 
 def show_dashboard():
     """Main dashboard interface"""
@@ -38,6 +44,10 @@ def show_dashboard():
             st.session_state.dashboard_tab = "shap"
             st.rerun()
             
+        if st.button("🗂️ Analysis History", use_container_width=True):
+            st.session_state.dashboard_tab = "history"
+            st.rerun()
+            
         if st.button("📜 About NASA Dataset", use_container_width=True):
             st.session_state.page = "about"
             st.rerun()
@@ -47,6 +57,9 @@ def show_dashboard():
         if st.button("🚪 Logout", use_container_width=True):
             logout_user()
         
+        if is_admin():
+            show_debug_panel()
+        
         st.markdown("</div>", unsafe_allow_html=True)
     
     # Initialize dashboard tab if not set
@@ -62,6 +75,8 @@ def show_dashboard():
         show_exovisuals()
     elif st.session_state.dashboard_tab == "shap":
         show_shap_explainability()
+    elif st.session_state.dashboard_tab == "history":
+        show_history_tab()
 
 def show_ai_detection_tab():
     """AI Detection tab content"""
@@ -91,7 +106,7 @@ def show_ai_detection_tab():
                 
                 # Show data preview
                 st.markdown("### Data Preview")
-                st.dataframe(preview_data.head(), use_container_width=True)
+                st.dataframe(preview_rows(preview_data), use_container_width=True)
                 
                 st.markdown(f"**Dataset Shape:** {preview_data.shape[0]} rows × {preview_data.shape[1]} columns")
                 
@@ -114,7 +129,78 @@ def show_ai_detection_tab():
         <li><strong>koi_prad:</strong> Planet radius (Earth radii)</li>
         </ul>
         <p style='font-size: 0.9rem; color: #00ffff;'>
-        💡 Don't have data? We'll use NASA's KOI dataset for demonstration.
+        💡 Don't have data? Load our synthetic demo dataset with results ready to explore.
         </p>
         </div>
         """, unsafe_allow_html=True)
+        
+        if st.button("🌟 Load Demo Dataset", use_container_width=True):
+            open_demo_analysis()
+
+def open_demo_analysis():
+    """Show the bundled demo dataset's precomputed results, without parsing or scoring"""
+    bundle = load_demo_bundle()
+    data_key = dataset_key(bundle['data'])
+    st.session_state.original_data = bundle['data']
+    st.session_state.data_sketch = (data_key, bundle['sketch'])
+    st.session_state.detection_results = bundle['results']
+    st.session_state.results_data_key = data_key
+    st.session_state.analysis_complete = True
+    for key in ('uploaded_file', 'report_key'):
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state.page = "results"
+    st.rerun()
+
+def show_debug_panel():
+    """Admin-only view of the per-stage timing and memory spans"""
+    recorder = get_recorder()
+    with st.expander("🛠️ Debug Metrics"):
+        rss = rss_bytes()
+        if rss is not None:
+            st.metric("Process RSS", f"{rss / 2**20:.0f} MB")
+        
+        stages = recorder.stages()
+        if stages:
+            table = pd.DataFrame.from_dict(stages, orient='index')
+            table['mean_seconds'] = table['seconds'] / table['calls']
+            st.dataframe(
+                table[['calls', 'errors', 'mean_seconds', 'max_seconds', 'rows', 'last_rss_delta_bytes', 'last_alloc_delta_bytes']]
+                .sort_values('mean_seconds', ascending=False),
+                use_container_width=True
+            )
+            st.markdown("**Recent spans**")
+            st.dataframe(pd.DataFrame(recorder.recent()[::-1]), use_container_width=True)
+        else:
+            st.info("No spans recorded yet.")
+        
+        admission = get_admission_controller().stats()
+        st.markdown("**Admission control**")
+        st.dataframe(pd.DataFrame.from_dict(admission['classes'], orient='index'), use_container_width=True)
+        if admission['memory_budget_bytes']:
+            st.caption(
+                f"Reserved {admission['reserved_bytes'] / 2**20:.0f} MB "
+                f"of {admission['memory_budget_bytes'] / 2**20:.0f} MB memory budget"
+            )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            label = "Stop tracemalloc" if tracemalloc.is_tracing() else "Start tracemalloc"
+            if st.button(label, use_container_width=True):
+                if tracemalloc.is_tracing():
+                    tracemalloc.stop()
+                else:
+                    tracemalloc.start()
+                st.rerun()
+        with col2:
+            if st.button("Reset", use_container_width=True):
+                recorder.reset()
+                st.rerun()
+        
+        st.download_button(
+            "Prometheus metrics",
+            recorder.prometheus_text(),
+            file_name="exohunter_metrics.prom",
+            mime="text/plain",
+            use_container_width=True
+        )
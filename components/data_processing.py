@@ -1,36 +1,91 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from utils.instrumentation import span
+from utils.figure_cache import cached_figure, dataset_key
+from utils.correlation import correlation_matrix, top_correlated_pairs, relevant_columns, cluster_order
+from utils.sketches import TableSketch, sketch_frame, rank_error
+from core.feature_store import FeatureStoreWriter, prune_stores
+from utils.sampling import (
+    ReservoirSampler, ChartSample, uniform_positions, confidence_strata, stratified_positions,
+    DEFAULT_SAMPLE_ROWS, EXACT, UNIFORM, STRATIFIED
+)
+
+# Above this many rows the correlation heatmap defaults to a sampled approximation
+CORRELATION_SAMPLE_ROWS = 200000
+CORRELATION_TOP_K = 20
+
+# Uploads are parsed and summarised in chunks of this many rows
+UPLOAD_CHUNK_ROWS = int(os.environ.get("EXOHUNTER_UPLOAD_CHUNK_ROWS", "100000"))
 
 def handle_data_upload(uploaded_file):
-    """Handle CSV file upload and preprocessing"""
+    """Handle CSV file upload and preprocessing
+
+    The upload is parsed once into a memory-mapped ``core.feature_store``
+    store; ``original_data`` is a zero-copy frame over it. Reruns with the
+    same file reuse the store instead of parsing again.
+    """
+    current = current_feature_store()
+    if current is not None and st.session_state.get('upload_id') == uploaded_file.file_id:
+        return st.session_state.original_data
+
+    writer = None
     try:
-        # Read CSV file, handling potential comment lines
-        df = pd.read_csv(uploaded_file, comment='#')
+        # Read CSV file in chunks, handling potential comment lines, and
+        # store, summarise and sample each chunk as it arrives
+        prune_stores()
+        writer = FeatureStoreWriter()
+        sketch = TableSketch()
+        sampler = ReservoirSampler()
+        with span('upload.parse') as parse:
+            for chunk in pd.read_csv(uploaded_file, comment='#', chunksize=UPLOAD_CHUNK_ROWS):
+                writer.append(chunk)
+                sketch.update(chunk)
+                sampler.update(len(chunk))
+            # Columns the store fell back to text for are not numeric in the sketch either
+            sketch.discard(writer.text_columns)
+            store = writer.close()
+            parse.rows = store.rows
         
         # Basic data validation
-        if df.empty:
+        if store.rows == 0 or not store.columns:
             st.error("The uploaded file is empty.")
             return None
             
-        # Store original data
-        st.session_state.original_data = df.copy()
-        
-        # Clean numeric columns
-        numeric_columns = df.select_dtypes(include=[np.number]).columns.tolist()
+        # Store original data as views on the feature store
+        st.session_state.original_data = store.frame()
+        data_key = dataset_key(st.session_state.original_data)
+        st.session_state.feature_store = (data_key, store)
+        st.session_state.upload_id = uploaded_file.file_id
+        st.session_state.data_sketch = (data_key, sketch)
+        st.session_state.data_sample = (data_key, sampler.positions())
         
-        for col in numeric_columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            df[col] = df[col].fillna(df[col].median())
-        
-        return df
+        return st.session_state.original_data
         
     except Exception as e:
+        if writer is not None:
+            writer.abort()
         st.error(f"Error processing uploaded file: {str(e)}")
         return None
 
+def current_feature_store():
+    """The feature store behind ``original_data``, if it came from an upload"""
+    stored = st.session_state.get('feature_store')
+    if stored is None or 'original_data' not in st.session_state:
+        return None
+    data_key, store = stored
+    return store if dataset_key(st.session_state.original_data) == data_key else None
+
+def preview_rows(df, rows=5):
+    """First ``rows`` rows with numeric gaps filled by the upload sketch's streaming medians"""
+    preview = df.head(rows)
+    numeric_columns = preview.select_dtypes(include=[np.number]).columns.tolist()
+    medians = dataset_sketch(df, dataset_key(df)).medians()
+    return preview.fillna({col: medians[col] for col in numeric_columns if col in medians})
+
 def show_dataset_insights():
     """Display comprehensive dataset insights"""
     st.markdown("## 📈 Dataset Insights")
@@ -41,6 +96,7 @@ def show_dataset_insights():
         return
     
     df = st.session_state.original_data
+    data_key = dataset_key(df)
     
     # Dataset overview
     col1, col2, col3, col4 = st.columns(4)
@@ -68,55 +124,168 @@ def show_dataset_insights():
         # Missing data heatmap
         missing_data = df.isnull().sum()
         if missing_data.sum() > 0:
-            fig_missing = px.bar(
-                x=missing_data.index,
-                y=missing_data.values,
-                title="Missing Values by Column",
-                labels={'x': 'Columns', 'y': 'Missing Count'}
-            )
-            fig_missing.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white'
-            )
-            st.plotly_chart(fig_missing, use_container_width=True)
+            def build_missing():
+                fig_missing = px.bar(
+                    x=missing_data.index,
+                    y=missing_data.values,
+                    title="Missing Values by Column",
+                    labels={'x': 'Columns', 'y': 'Missing Count'}
+                )
+                fig_missing.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+                return fig_missing
+            
+            st.plotly_chart(cached_figure('missing_bar', data_key, (), build_missing), use_container_width=True)
         else:
             st.success("✅ No missing values detected!")
     
     with col2:
         # Data types distribution
-        dtype_counts = df.dtypes.value_counts()
-        fig_dtypes = px.pie(
-            values=dtype_counts.values,
-            names=dtype_counts.index.astype(str),
-            title="Data Types Distribution"
-        )
-        fig_dtypes.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white'
-        )
-        st.plotly_chart(fig_dtypes, use_container_width=True)
+        def build_dtypes():
+            dtype_counts = df.dtypes.value_counts()
+            fig_dtypes = px.pie(
+                values=dtype_counts.values,
+                names=dtype_counts.index.astype(str),
+                title="Data Types Distribution"
+            )
+            fig_dtypes.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white'
+            )
+            return fig_dtypes
+        
+        st.plotly_chart(cached_figure('dtype_pie', data_key, (), build_dtypes), use_container_width=True)
     
     # Statistical summary for numeric columns
     if numeric_cols:
         st.markdown("### Statistical Summary")
-        st.dataframe(df[numeric_cols].describe(), use_container_width=True)
+        st.dataframe(dataset_sketch(df, data_key).describe(numeric_cols), use_container_width=True)
+        st.caption(f"Quartiles are streaming KLL sketch estimates (rank error within {rank_error():.1%}).")
         
         # Distribution plots
-        st.markdown("### Feature Distributions")
+        show_feature_distributions(df, numeric_cols)
+    
+    # Correlation analysis
+    if len(numeric_cols) > 1:
+        st.markdown("### Correlation Analysis")
+        sample_rows = None
+        if len(df) > CORRELATION_SAMPLE_ROWS:
+            sampled = st.checkbox(
+                f"Fast approximate correlations (sample of {CORRELATION_SAMPLE_ROWS:,} rows)",
+                value=True,
+                key="correlation_sampled"
+            )
+            sample_rows = CORRELATION_SAMPLE_ROWS if sampled else None
+        
+        corr_matrix, top_pairs = compute_correlations(data_key, tuple(numeric_cols), sample_rows, df)
+        
+        def build_correlation():
+            # Cluster the strongest-correlated columns so related features sit together
+            columns = relevant_columns(corr_matrix, top_pairs)
+            order = cluster_order(corr_matrix.loc[columns, columns])
+            
+            fig_corr = px.imshow(
+                corr_matrix.loc[order, order],
+                title="Feature Correlation Matrix",
+                color_continuous_scale="RdBu_r",
+                zmin=-1,
+                zmax=1,
+                aspect="auto"
+            )
+            fig_corr.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white'
+            )
+            return fig_corr
         
-        # Select columns for distribution plots
-        selected_cols = st.multiselect(
-            "Select columns to visualize:",
-            numeric_cols,
-            default=numeric_cols[:3] if len(numeric_cols) >= 3 else numeric_cols
-        )
+        fig_corr = cached_figure('correlation_heatmap', data_key, (tuple(numeric_cols), sample_rows), build_correlation)
+        st.plotly_chart(fig_corr, use_container_width=True)
         
-        if selected_cols:
-            for col in selected_cols:
+        st.markdown("#### Most Correlated Feature Pairs")
+        st.dataframe(top_pairs, use_container_width=True, hide_index=True)
+    
+    # Raw data preview
+    st.markdown("### Raw Data Preview")
+    st.dataframe(df.head(100), use_container_width=True)
+
+def dataset_sketch(df, data_key):
+    """Summary sketch of ``df``: the one built during upload, else built from the frame"""
+    uploaded = st.session_state.get('data_sketch')
+    if uploaded is not None and uploaded[0] == data_key:
+        return uploaded[1]
+    return build_sketch(data_key, df)
+
+@st.cache_data(show_spinner=False)
+@span('sketch')
+def build_sketch(data_key, _df):
+    """``TableSketch`` of a frame that did not come through ``handle_data_upload``"""
+    return sketch_frame(_df, UPLOAD_CHUNK_ROWS)
+
+def chart_sample(df, data_key, sampling):
+    """Rows a chart with the given ``utils.sampling`` policy should plot
+
+    Stratified samples need detection results for this same table; until
+    then, and for ``UNIFORM`` charts, the reservoir sample drawn at upload is used.
+    """
+    if sampling == EXACT or len(df) <= DEFAULT_SAMPLE_ROWS:
+        return ChartSample(df)
+    results = st.session_state.get('detection_results')
+    if sampling == STRATIFIED and results is not None and st.session_state.get('results_data_key') == data_key:
+        positions = results_sample(data_key, results['model_version'], results['predictions'], results['probabilities'])
+        return ChartSample(df, positions, STRATIFIED, results['model_version'])
+    uploaded = st.session_state.get('data_sample')
+    if uploaded is not None and uploaded[0] == data_key:
+        return ChartSample(df, uploaded[1], UNIFORM)
+    return ChartSample(df, reservoir_sample(data_key, len(df)), UNIFORM)
+
+def show_sample_caption(sample):
+    if sample.caption:
+        st.caption(sample.caption)
+
+@st.cache_data(show_spinner=False)
+def reservoir_sample(data_key, rows):
+    """Uniform sample positions for a table that did not come through ``handle_data_upload``"""
+    return uniform_positions(rows)
+
+@st.cache_data(show_spinner=False)
+@span('sample.stratified')
+def results_sample(data_key, model_version, _predictions, _probabilities):
+    """Sample positions stratified by predicted label and confidence band"""
+    return stratified_positions(confidence_strata(_predictions, _probabilities))
+
+@st.cache_data(show_spinner=False)
+@span('correlations')
+def compute_correlations(data_key, columns, sample_rows, _df):
+    """Correlation matrix and top pairs for ``columns``; ``_df`` is identified by ``data_key``"""
+    corr_matrix = correlation_matrix(_df, columns, sample_rows=sample_rows)
+    return corr_matrix, top_correlated_pairs(corr_matrix, CORRELATION_TOP_K)
+
+@st.fragment
+@span('figures.feature_distributions')
+def show_feature_distributions(df, numeric_cols):
+    """Feature distribution histograms; changing the selection reruns only this section"""
+    st.markdown("### Feature Distributions")
+    
+    # Select columns for distribution plots
+    selected_cols = st.multiselect(
+        "Select columns to visualize:",
+        numeric_cols,
+        default=numeric_cols[:3] if len(numeric_cols) >= 3 else numeric_cols
+    )
+    
+    if selected_cols:
+        data_key = dataset_key(df)
+        sample = chart_sample(df, data_key, UNIFORM)
+        show_sample_caption(sample)
+        for col in selected_cols:
+            def build_distribution(col=col):
                 fig_dist = px.histogram(
-                    df,
+                    sample.frame,
                     x=col,
                     title=f"Distribution of {col}",
                     marginal="box"
@@ -126,29 +295,10 @@ def show_dataset_insights():
                     paper_bgcolor='rgba(0,0,0,0)',
                     font_color='white'
                 )
-                st.plotly_chart(fig_dist, use_container_width=True)
-    
-    # Correlation analysis
-    if len(numeric_cols) > 1:
-        st.markdown("### Correlation Analysis")
-        corr_matrix = df[numeric_cols].corr()
-        
-        fig_corr = px.imshow(
-            corr_matrix,
-            title="Feature Correlation Matrix",
-            color_continuous_scale="RdBu_r",
-            aspect="auto"
-        )
-        fig_corr.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white'
-        )
-        st.plotly_chart(fig_corr, use_container_width=True)
-    
-    # Raw data preview
-    st.markdown("### Raw Data Preview")
-    st.dataframe(df.head(100), use_container_width=True)
+                return fig_dist
+            
+            fig_dist = cached_figure('distribution_histogram', data_key, (col, sample.key), build_distribution)
+            st.plotly_chart(fig_dist, use_container_width=True)
 
 def process_uploaded_csv_for_detection(uploaded_data):
     """Process uploaded CSV specifically for exoplanet detection"""
@@ -0,0 +1,101 @@
+import streamlit as st
+import logging
+import sqlite3
+from components.auth import current_email
+from utils.analysis_store import AnalysisStore
+from utils.instrumentation import span
+from utils.figure_cache import dataset_key
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 25
+
+@st.cache_resource
+def get_analysis_store():
+    """Process-wide store of past analyses"""
+    return AnalysisStore()
+
+@span('history.save')
+def record_analysis(results, data):
+    """Save a finished analysis to the current user's history
+
+    A failure here is logged rather than raised, since the results are
+    already on screen and the run itself succeeded.
+    """
+    email = current_email()
+    if email is None:
+        return None
+    uploaded_file = st.session_state.get('uploaded_file')
+    label = getattr(uploaded_file, 'name', None)
+    try:
+        return get_analysis_store().save(email, results, data, label=label)
+    except (OSError, ValueError, TypeError, sqlite3.Error) as exc:
+        logger.warning("Could not save analysis to history: %s", exc)
+        st.warning(f"The analysis finished but could not be saved to your history: {exc}")
+        return None
+
+@span('history.open')
+def open_analysis(analysis_id):
+    """Load a saved analysis into the session and show it on the results page"""
+    loaded = get_analysis_store().load(current_email(), analysis_id)
+    if loaded is None:
+        st.error("That analysis is no longer available.")
+        return
+    results, data = loaded
+    st.session_state.original_data = data
+    st.session_state.detection_results = results
+    st.session_state.results_data_key = dataset_key(data)
+    st.session_state.analysis_complete = True
+    if 'report_key' in st.session_state:
+        del st.session_state.report_key
+    st.session_state.page = "results"
+    st.rerun()
+
+def show_history_tab():
+    """List the user's past analyses and reopen them without re-scoring"""
+    st.markdown("## 🗂️ Analysis History")
+    st.markdown("Your previous ExoFusion runs. Reopening one loads its saved results instantly.")
+
+    email = current_email()
+    store = get_analysis_store()
+    total = store.count_runs(email)
+    if total == 0:
+        st.info("No saved analyses yet. Run ExoFusion AI on a dataset and it will appear here.")
+        return
+
+    pages = (total - 1) // HISTORY_PAGE_SIZE + 1
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    runs = store.list_runs(email, limit=HISTORY_PAGE_SIZE, offset=(page - 1) * HISTORY_PAGE_SIZE)
+
+    display = runs.assign(
+        label=runs['label'].fillna("—"),
+        confidence=(runs['confidence'] * 100).round(1)
+    ).rename(columns={
+        'created_at': 'Run at',
+        'label': 'File',
+        'rows': 'Rows',
+        'exoplanet_count': 'Exoplanets',
+        'confidence': 'Max confidence (%)',
+        'scorer': 'Scorer',
+        'model_version': 'Model'
+    })
+    st.dataframe(
+        display[['id', 'Run at', 'File', 'Rows', 'Exoplanets', 'Max confidence (%)', 'Scorer', 'Model']],
+        use_container_width=True,
+        hide_index=True
+    )
+
+    labels = {
+        row.id: f"#{row.id} · {row.created_at:%Y-%m-%d %H:%M} · {row.label or 'dataset'} ({row.rows:,} rows)"
+        for row in runs.itertuples()
+    }
+    selected = st.selectbox("Analysis", list(labels), format_func=labels.get)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📂 Open Results", use_container_width=True, type="primary"):
+            open_analysis(selected)
+    with col2:
+        if st.button("🗑️ Delete", use_container_width=True):
+            store.delete(email, selected)
+            st.rerun()
@@ -2,8 +2,11 @@ import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-import pandas as pd
-from components.ai_model import get_model_explainability, train_models
+from components.ai_model import get_model_explainability, train_models, get_demo_dataset
+from utils.instrumentation import span
+from utils.figure_cache import cached_figure, dataset_key
+from utils.sampling import UNIFORM, STRATIFIED
+from components.data_processing import chart_sample, show_sample_caption, dataset_sketch
 
 try:
     import shap
@@ -38,6 +41,7 @@ def show_exovisuals():
     with tab4:
         show_statistical_plots(df)
 
+@span('figures.light_curves')
 def show_light_curve_plots(df):
     """Display transit light curve visualizations"""
     st.markdown("### 🌟 Simulated Transit Light Curves")
@@ -92,11 +96,14 @@ def show_light_curve_plots(df):
                 
                 st.plotly_chart(fig, use_container_width=True)
 
+@st.fragment
+@span('figures.planetary_properties')
 def show_planetary_properties(df):
     """Display planetary properties visualizations"""
     st.markdown("### 🪐 Planetary Properties Analysis")
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    data_key = dataset_key(df)
     
     if len(numeric_cols) >= 2:
         col1, col2 = st.columns(2)
@@ -107,47 +114,64 @@ def show_planetary_properties(df):
         with col2:
             y_axis = st.selectbox("Select Y-axis:", numeric_cols, index=1, key="y_axis_planet")
         
-        # Create scatter plot
-        fig = px.scatter(
-            df,
-            x=x_axis,
-            y=y_axis,
-            title=f"{x_axis} vs {y_axis}",
-            hover_data=numeric_cols[:3],
-            color=numeric_cols[0] if len(numeric_cols) > 0 else None,
-            size=numeric_cols[1] if len(numeric_cols) > 1 else None,
-            size_max=20
-        )
+        sample = chart_sample(df, data_key, STRATIFIED)
         
-        fig.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white'
-        )
+        def build_scatter():
+            # Create scatter plot
+            fig = px.scatter(
+                sample.frame,
+                x=x_axis,
+                y=y_axis,
+                title=f"{x_axis} vs {y_axis}",
+                hover_data=numeric_cols[:3],
+                color=numeric_cols[0] if len(numeric_cols) > 0 else None,
+                size=numeric_cols[1] if len(numeric_cols) > 1 else None,
+                size_max=20
+            )
         
+            fig.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white'
+            )
+        
+            return fig
+        
+        fig = cached_figure('scatter', data_key, (x_axis, y_axis, sample.key), build_scatter)
         st.plotly_chart(fig, use_container_width=True)
+        show_sample_caption(sample)
         
         # Planet size comparison
         if 'koi_prad' in df.columns:
             st.markdown("### Planet Size Distribution")
-            fig_size = px.histogram(
-                df,
-                x='koi_prad',
-                title="Planet Radius Distribution (Earth Radii)",
-                nbins=30
-            )
-            fig_size.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white'
-            )
+            size_sample = chart_sample(df, data_key, UNIFORM)
+            
+            def build_size():
+                fig_size = px.histogram(
+                    size_sample.frame,
+                    x='koi_prad',
+                    title="Planet Radius Distribution (Earth Radii)",
+                    nbins=30
+                )
+                fig_size.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+                return fig_size
+            
+            fig_size = cached_figure('radius_histogram', data_key, (size_sample.key,), build_size)
             st.plotly_chart(fig_size, use_container_width=True)
+            show_sample_caption(size_sample)
 
+@st.fragment
+@span('figures.3d_explorer')
 def show_3d_explorer(df):
     """Display 3D visualization of planetary data"""
     st.markdown("### 🌌 3D Cosmic Explorer")
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    data_key = dataset_key(df)
     
     if len(numeric_cols) >= 3:
         col1, col2, col3 = st.columns(3)
@@ -159,44 +183,55 @@ def show_3d_explorer(df):
         with col3:
             z_3d = st.selectbox("Z-axis:", numeric_cols, index=2, key="z_3d")
         
-        # Create 3D scatter plot
-        fig_3d = go.Figure(data=[go.Scatter3d(
-            x=df[x_3d],
-            y=df[y_3d],
-            z=df[z_3d],
-            mode='markers',
-            marker=dict(
-                size=5,
-                color=df[numeric_cols[0]] if len(numeric_cols) > 0 else 'cyan',
-                colorscale='Viridis',
-                showscale=True,
-                opacity=0.8
-            ),
-            text=[f"Point {i+1}" for i in range(len(df))],
-            hovertemplate=f'<b>%{{text}}</b><br>{x_3d}: %{{x}}<br>{y_3d}: %{{y}}<br>{z_3d}: %{{z}}<extra></extra>'
-        )])
+        sample = chart_sample(df, data_key, STRATIFIED)
         
-        fig_3d.update_layout(
-            title="3D Planetary Data Explorer",
-            scene=dict(
-                xaxis_title=x_3d,
-                yaxis_title=y_3d,
-                zaxis_title=z_3d,
-                bgcolor='rgba(0,0,0,0)'
-            ),
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white',
-            height=600
-        )
+        def build_3d():
+            points = sample.frame
+            # Create 3D scatter plot
+            fig_3d = go.Figure(data=[go.Scatter3d(
+                x=points[x_3d],
+                y=points[y_3d],
+                z=points[z_3d],
+                mode='markers',
+                marker=dict(
+                    size=5,
+                    color=points[numeric_cols[0]] if len(numeric_cols) > 0 else 'cyan',
+                    colorscale='Viridis',
+                    showscale=True,
+                    opacity=0.8
+                ),
+                text=[f"Point {i+1}" for i in sample.row_positions],
+                hovertemplate=f'<b>%{{text}}</b><br>{x_3d}: %{{x}}<br>{y_3d}: %{{y}}<br>{z_3d}: %{{z}}<extra></extra>'
+            )])
         
+            fig_3d.update_layout(
+                title="3D Planetary Data Explorer",
+                scene=dict(
+                    xaxis_title=x_3d,
+                    yaxis_title=y_3d,
+                    zaxis_title=z_3d,
+                    bgcolor='rgba(0,0,0,0)'
+                ),
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white',
+                height=600
+            )
+        
+            return fig_3d
+        
+        fig_3d = cached_figure('scatter_3d', data_key, (x_3d, y_3d, z_3d, sample.key), build_3d)
         st.plotly_chart(fig_3d, use_container_width=True)
+        show_sample_caption(sample)
 
+@st.fragment
+@span('figures.statistical')
 def show_statistical_plots(df):
     """Display various statistical plots"""
     st.markdown("### 📊 Statistical Analysis")
     
     numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    data_key = dataset_key(df)
     
     if len(numeric_cols) >= 2:
         # Box plots
@@ -207,29 +242,38 @@ def show_statistical_plots(df):
         )
         
         if selected_columns:
-            # Normalize data for comparison
-            df_normalized = df[selected_columns].copy()
-            for col in selected_columns:
-                df_normalized[col] = (df_normalized[col] - df_normalized[col].mean()) / df_normalized[col].std()
+            sample = chart_sample(df, data_key, UNIFORM)
             
-            fig_box = go.Figure()
-            for col in selected_columns:
-                fig_box.add_trace(go.Box(
-                    y=df_normalized[col],
-                    name=col,
-                    boxpoints='outliers'
-                ))
+            def build_box():
+                # Normalize with the full-data mean and std, then plot the sample's spread
+                summary = dataset_sketch(df, data_key).describe(selected_columns)
+                df_normalized = sample.frame[selected_columns].copy()
+                for col in selected_columns:
+                    df_normalized[col] = (df_normalized[col] - summary.loc['mean', col]) / summary.loc['std', col]
+                
+                fig_box = go.Figure()
+                for col in selected_columns:
+                    fig_box.add_trace(go.Box(
+                        y=df_normalized[col],
+                        name=col,
+                        boxpoints='outliers'
+                    ))
             
-            fig_box.update_layout(
-                title="Normalized Feature Distributions",
-                yaxis_title="Normalized Values",
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='white'
-            )
+                fig_box.update_layout(
+                    title="Normalized Feature Distributions",
+                    yaxis_title="Normalized Values",
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font_color='white'
+                )
+            
+                return fig_box
             
+            fig_box = cached_figure('normalized_box', data_key, (tuple(selected_columns), sample.key), build_box)
             st.plotly_chart(fig_box, use_container_width=True)
+            show_sample_caption(sample)
 
+@span('figures.shap')
 def show_shap_explainability():
     """Display SHAP explainability analysis"""
     st.markdown("## 🔍 AI Model Explainability (SHAP Analysis)")
@@ -309,49 +353,42 @@ def show_demo_visualizations():
     """Show demo visualizations when no data is uploaded"""
     st.markdown("### 🌟 Demo: Kepler Space Telescope Discoveries")
     
-    # Generate demo data
-    np.random.seed(42)
-    n_samples = 1000
+    demo_df = get_demo_dataset()
     
-    demo_data = {
-        'koi_period': 10**np.random.uniform(np.log10(0.3), np.log10(500), n_samples),
-        'koi_depth': np.random.exponential(scale=200, size=n_samples) / 1e5,
-        'koi_duration': np.clip(np.random.normal(3, 1, n_samples), 0.1, 20),
-        'koi_prad': np.clip(np.random.normal(2, 1, n_samples), 0.1, 20)
-    }
-    
-    demo_df = pd.DataFrame(demo_data)
-    
-    # 3D visualization
-    fig_demo = go.Figure(data=[go.Scatter3d(
-        x=demo_df['koi_period'],
-        y=demo_df['koi_depth'],
-        z=demo_df['koi_prad'],
-        mode='markers',
-        marker=dict(
-            size=4,
-            color=demo_df['koi_duration'],
-            colorscale='Viridis',
-            showscale=True,
-            opacity=0.6
-        ),
-        text=[f"Candidate {i+1}" for i in range(len(demo_df))],
-    )])
+    def build_demo():
+        # 3D visualization
+        fig_demo = go.Figure(data=[go.Scatter3d(
+            x=demo_df['koi_period'],
+            y=demo_df['koi_depth'],
+            z=demo_df['koi_prad'],
+            mode='markers',
+            marker=dict(
+                size=4,
+                color=demo_df['koi_duration'],
+                colorscale='Viridis',
+                showscale=True,
+                opacity=0.6
+            ),
+            text=[f"Candidate {i+1}" for i in range(len(demo_df))],
+        )])
     
-    fig_demo.update_layout(
-        title="Demo: 3D Exoplanet Candidate Distribution",
-        scene=dict(
-            xaxis_title="Orbital Period (days)",
-            yaxis_title="Transit Depth",
-            zaxis_title="Planet Radius (Earth Radii)",
-            bgcolor='rgba(0,0,0,0)'
-        ),
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font_color='white',
-        height=600
-    )
+        fig_demo.update_layout(
+            title="Demo: 3D Exoplanet Candidate Distribution",
+            scene=dict(
+                xaxis_title="Orbital Period (days)",
+                yaxis_title="Transit Depth",
+                zaxis_title="Planet Radius (Earth Radii)",
+                bgcolor='rgba(0,0,0,0)'
+            ),
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font_color='white',
+            height=600
+        )
+        
+        return fig_demo
     
+    fig_demo = cached_figure('demo_scatter_3d', dataset_key(demo_df), (), build_demo)
     st.plotly_chart(fig_demo, use_container_width=True)
     
-    st.info("This is a demonstration using simulated exoplanet data. Upload your own dataset to see real visualizations!")
+    st.info("This is the bundled demo dataset of simulated KOI candidates. Upload your own dataset to see real visualizations!")
@@ -0,0 +1,219 @@
+"""Server-wide admission control for heavy operations
+
+Every session's large-upload scoring, SHAP, report rendering, exports and training
+goes through one ``AdmissionController``. Each operation class has a concurrency limit
+and a priority; waiting requests are admitted strictly by priority, then in
+arrival order, so interactive scoring overtakes queued reports and a burst
+of one kind of work cannot starve the CPU for the others.
+
+Admission is also memory aware: a request reserves an estimate of the
+memory it will need and waits while the reservations of running work would
+push the total past the budget. A request larger than the whole budget
+still runs, alone, rather than waiting forever. The request at the head of
+the queue holds back lower-priority requests that also need memory, so
+large jobs are not starved by a stream of small ones.
+"""
+import os
+import time
+import itertools
+import threading
+import contextlib
+from dataclasses import dataclass
+from utils.instrumentation import span
+
+def _default_memory_budget():
+    """Half of physical memory, or no limit where it cannot be read"""
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // 2
+    except (AttributeError, ValueError, OSError):
+        return 0
+
+MEMORY_BUDGET_BYTES = int(os.environ.get("EXOHUNTER_MEMORY_BUDGET_MB", "0")) * 1024 * 1024 or _default_memory_budget()
+QUEUE_TIMEOUT = float(os.environ.get("EXOHUNTER_QUEUE_TIMEOUT", "300"))
+CPU_COUNT = os.cpu_count() or 1
+
+@dataclass(frozen=True)
+class OperationClass:
+    """Scheduling policy for one kind of work
+
+    ``memory_factor`` times the input size plus ``base_bytes`` is the memory
+    reserved while a request of this class runs; lower ``priority`` runs first.
+    """
+    name: str
+    priority: int
+    slots: int
+    memory_factor: float = 1.0
+    base_bytes: int = 0
+
+def _slots(name, default):
+    return max(1, int(os.environ.get(f"EXOHUNTER_{name.upper()}_SLOTS", str(default))))
+
+DEFAULT_CLASSES = (
+    OperationClass('score', priority=0, slots=_slots('score', max(4, 2 * CPU_COUNT)), memory_factor=4),
+    OperationClass('shap', priority=1, slots=_slots('shap', max(1, CPU_COUNT // 2)), memory_factor=12),
+    OperationClass('report', priority=2, slots=_slots('report', 1), memory_factor=2, base_bytes=64 * 2**20),
+    OperationClass('export', priority=2, slots=_slots('export', 1), memory_factor=2),
+    OperationClass('train', priority=3, slots=_slots('train', 1), base_bytes=1024 * 2**20)
+)
+
+class AdmissionTimeout(TimeoutError):
+    """Raised when a request waited longer than its timeout for admission"""
+
+class Ticket:
+    """One request's place in the admission queue"""
+
+    def __init__(self, operation, reserve_bytes, sequence):
+        self.operation = operation
+        self.reserve_bytes = reserve_bytes
+        self.sequence = sequence
+        self._admitted = threading.Event()
+
+    @property
+    def admitted(self):
+        return self._admitted.is_set()
+
+    def __lt__(self, other):
+        return (self.operation.priority, self.sequence) < (other.operation.priority, other.sequence)
+
+class AdmissionController:
+    """Priority admission with per-class concurrency limits and a shared memory budget"""
+
+    def __init__(self, classes=DEFAULT_CLASSES, memory_budget=MEMORY_BUDGET_BYTES):
+        self.classes = {operation.name: operation for operation in classes}
+        self.memory_budget = memory_budget
+        self._waiting = []
+        self._running = {name: 0 for name in self.classes}
+        self._admitted_total = {name: 0 for name in self.classes}
+        self._reserved = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def reservation(self, name, input_bytes=0):
+        operation = self.classes[name]
+        return int(operation.base_bytes + operation.memory_factor * input_bytes)
+
+    def submit(self, name, input_bytes=0):
+        """Queue a request of class ``name``; it may be admitted immediately"""
+        operation = self.classes[name]
+        ticket = Ticket(operation, self.reservation(name, input_bytes), next(self._sequence))
+        with self._lock:
+            self._waiting.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def _fits(self, ticket):
+        if not self.memory_budget or self._reserved == 0:
+            return True
+        return self._reserved + ticket.reserve_bytes <= self.memory_budget
+
+    def _dispatch(self):
+        """Admit waiting tickets in priority order; caller holds the lock"""
+        memory_blocked = False
+        for ticket in sorted(self._waiting):
+            operation = ticket.operation
+            if self._running[operation.name] >= operation.slots:
+                continue
+            if ticket.reserve_bytes and (memory_blocked or not self._fits(ticket)):
+                memory_blocked = True
+                continue
+            self._waiting.remove(ticket)
+            self._running[operation.name] += 1
+            self._admitted_total[operation.name] += 1
+            self._reserved += ticket.reserve_bytes
+            ticket._admitted.set()
+
+    def position(self, ticket):
+        """1-based place among waiting requests, 0 once admitted"""
+        with self._lock:
+            if ticket.admitted:
+                return 0
+            return sum(1 for other in self._waiting if other < ticket) + 1
+
+    def wait(self, ticket, timeout=QUEUE_TIMEOUT, on_wait=None, poll_interval=0.5):
+        """Block until ``ticket`` is admitted, reporting its position to ``on_wait(position)``"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            step = poll_interval if remaining is None else min(poll_interval, remaining)
+            if ticket._admitted.wait(step):
+                return ticket
+            if deadline is not None and time.perf_counter() >= deadline:
+                self.cancel(ticket)
+                if ticket.admitted:
+                    return ticket
+                raise AdmissionTimeout(
+                    f"The server is busy; {ticket.operation.name} did not start within {timeout:g} s. Please try again."
+                )
+            if on_wait is not None:
+                on_wait(self.position(ticket))
+
+    def cancel(self, ticket):
+        with self._lock:
+            if not ticket.admitted and ticket in self._waiting:
+                self._waiting.remove(ticket)
+                self._dispatch()
+
+    def abandon(self, ticket):
+        """Give up a ticket whether it is still queued or was admitted meanwhile"""
+        with self._lock:
+            if ticket.admitted:
+                self._running[ticket.operation.name] -= 1
+                self._reserved -= ticket.reserve_bytes
+            elif ticket in self._waiting:
+                self._waiting.remove(ticket)
+            self._dispatch()
+
+    def release(self, ticket):
+        with self._lock:
+            self._running[ticket.operation.name] -= 1
+            self._reserved -= ticket.reserve_bytes
+            self._dispatch()
+
+    @contextlib.contextmanager
+    def admit(self, name, input_bytes=0, timeout=QUEUE_TIMEOUT, on_wait=None):
+        """Run the body once a request of class ``name`` is admitted
+
+        ``on_wait(position)`` is called about twice a second while queued, so
+        the UI can show the caller's place in line. Time spent queued is
+        recorded as the ``queue.<name>`` span.
+        """
+        ticket = self.submit(name, input_bytes)
+        if not ticket.admitted:
+            try:
+                with span('queue.' + name):
+                    self.wait(ticket, timeout=timeout, on_wait=on_wait)
+            except BaseException:
+                # e.g. a Streamlit rerun raised from ``on_wait``: never leave the ticket behind
+                self.abandon(ticket)
+                raise
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        """Per-class running, queued and admitted counts plus memory reservations"""
+        with self._lock:
+            queued = {name: 0 for name in self.classes}
+            for ticket in self._waiting:
+                queued[ticket.operation.name] += 1
+            return {
+                'classes': {
+                    name: {
+                        'priority': operation.priority,
+                        'slots': operation.slots,
+                        'running': self._running[name],
+                        'queued': queued[name],
+                        'admitted': self._admitted_total[name]
+                    }
+                    for name, operation in self.classes.items()
+                },
+                'reserved_bytes': self._reserved,
+                'memory_budget_bytes': self.memory_budget
+            }
+
+_controller = AdmissionController()
+
+def get_admission_controller():
+    """Return the process-wide admission controller"""
+    return _controller
@@ -0,0 +1,222 @@
+"""Request coalescing for vectorised model scoring"""
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+class LatencyStats:
+    """Rolling window of request latencies and batch sizes"""
+
+    def __init__(self, window=2048):
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+
+    def record_batch(self, rows, requests):
+        with self._lock:
+            self._batch_sizes.append(rows)
+            self.batches += 1
+            self.rows += rows
+            self.requests += requests
+
+    def record_latency(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=np.float64) * 1000
+            batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+            requests, batches, rows = self.requests, self.batches, self.rows
+        return {
+            'requests': requests,
+            'batches': batches,
+            'rows': rows,
+            'latency_ms_p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+            'latency_ms_p99': float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+            'batch_rows_mean': float(batch_sizes.mean()) if len(batch_sizes) else 0.0,
+            'batch_rows_max': int(batch_sizes.max()) if len(batch_sizes) else 0,
+            'requests_per_batch': requests / batches if batches else 0.0
+        }
+
+def split_scores(scores, offsets):
+    """Slice a dict of per-row arrays back into one dict per request"""
+    return [
+        {name: values[start:end] for name, values in scores.items()}
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+class AsyncMicroBatcher:
+    """Coalesce concurrent scoring requests into single vectorised predict calls
+
+    The first queued request opens a batch; further requests join it until
+    ``max_batch_rows`` is reached or ``max_latency_ms`` has elapsed since that
+    first request. ``predict_fn(X)`` must return a dict of per-row arrays and
+    runs in the default executor so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, predict_fn, max_batch_rows=8192, max_latency_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_latency = max_latency_ms / 1000
+        self.stats = LatencyStats()
+        self._queue = None
+        self._worker = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    async def submit(self, X):
+        """Queue one feature matrix and wait for its slice of the batch result"""
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((np.asarray(X, dtype=np.float64), future, start))
+        try:
+            return await future
+        finally:
+            self.stats.record_latency(time.perf_counter() - start)
+
+    async def _collect(self):
+        """Wait for one request, then gather more until the batch is full or due"""
+        batch = [await self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = batch[0][2] + self.max_latency
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            try:
+                if timeout <= 0:
+                    # Past the deadline: take whatever is already waiting, without blocking
+                    item = self._queue.get_nowait()
+                else:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            matrices = [item[0] for item in batch]
+            offsets = np.concatenate([[0], np.cumsum([len(X) for X in matrices])])
+            try:
+                scores = await loop.run_in_executor(None, self.predict_fn, np.concatenate(matrices))
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats.record_batch(int(offsets[-1]), len(batch))
+            for (_, future, _), part in zip(batch, split_scores(scores, offsets)):
+                if not future.done():
+                    future.set_result(part)
+
+class BatchDispatcher:
+    """Thread-based counterpart of ``AsyncMicroBatcher`` for synchronous callers
+
+    Streamlit sessions call ``submit`` from their own script threads; a single
+    dispatcher thread merges everything queued within one tick into one feature
+    matrix and hands each caller its slice. Up to ``concurrency`` batches run
+    ``predict_fn`` at once (one per model worker process); while all of them
+    are busy, new requests keep queueing and join the next batch.
+    """
+
+    def __init__(self, predict_fn, max_batch_rows=65536, max_latency_ms=20.0, concurrency=1):
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_latency = max_latency_ms / 1000
+        self.concurrency = concurrency
+        self.stats = LatencyStats()
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._executor = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="exohunter-batch")
+            self._thread = threading.Thread(target=self._run, name="exohunter-batch-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def submit(self, X, timeout=None):
+        """Queue one feature matrix and block until its slice of the batch result is ready"""
+        start = time.perf_counter()
+        future = Future()
+        self._queue.put((np.asarray(X, dtype=np.float64), future, start))
+        try:
+            return future.result(timeout)
+        finally:
+            self.stats.record_latency(time.perf_counter() - start)
+
+    def _collect(self):
+        """Wait for one request, then gather more until the batch is full or due"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        rows = len(first[0])
+        deadline = first[2] + self.max_latency
+        while rows < self.max_batch_rows:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            # Wait for a free slot first, so requests arriving meanwhile join this batch
+            self._slots.acquire()
+            batch = self._collect()
+            if batch is None:
+                self._slots.release()
+                return
+            self._executor.submit(self._score, batch)
+
+    def _score(self, batch):
+        try:
+            matrices = [item[0] for item in batch]
+            offsets = np.concatenate([[0], np.cumsum([len(X) for X in matrices])])
+            try:
+                scores = self.predict_fn(np.concatenate(matrices))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                return
+            self.stats.record_batch(int(offsets[-1]), len(batch))
+            for (_, future, _), part in zip(batch, split_scores(scores, offsets)):
+                future.set_result(part)
+        finally:
+            self._slots.release()
@@ -0,0 +1,164 @@
+"""Headless batch scoring for ExoHunter
+
+Examples::
+
+    python -m core.cli train --models-dir artifacts/current --publish
+    python -m core.cli publish artifacts/current
+    python -m core.cli score data/*.csv --output-dir scored/ --format csv.gz
+    python -m core.cli demo
+
+Models are loaded once and reused for every input file; ``score`` and
+``demo`` never train, so run ``train --publish`` first.
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import pandas as pd
+from core import pipeline, demo, export
+from core.registry import publish_artifacts, resolve_models_dir
+
+logger = logging.getLogger("exohunter.cli")
+
+def read_table(path):
+    """Read a CSV or Parquet file into a DataFrame"""
+    if path.lower().endswith(('.parquet', '.pq')):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, comment='#')
+
+def get_models(models_dir, artifacts_root):
+    """Load ``models_dir``, else the latest published version; exits when neither exists"""
+    try:
+        return pipeline.load_models(resolve_models_dir(models_dir, artifacts_root))
+    except FileNotFoundError as e:
+        sys.exit(f"error: {e}")
+
+def output_paths(inputs, output_dir, extension):
+    """Prediction file for each input, mirroring the inputs' directories under ``output_dir``
+
+    Inputs in one directory that share a stem (``koi.csv``, ``koi.parquet``)
+    keep their extension in the name, so no two inputs write the same file.
+    """
+    directories = [os.path.dirname(os.path.abspath(path)) for path in inputs]
+    common = os.path.commonpath(directories)
+    stems = {}
+    for path, directory in zip(inputs, directories):
+        stems.setdefault((directory, os.path.splitext(os.path.basename(path))[0]), set()).add(os.path.abspath(path))
+
+    paths = []
+    for path, directory in zip(inputs, directories):
+        name = os.path.basename(path)
+        stem = os.path.splitext(name)[0]
+        if len(stems[(directory, stem)]) > 1:
+            stem = name.replace('.', '_')
+        relative = os.path.relpath(directory, common)
+        paths.append(os.path.normpath(os.path.join(output_dir, relative, f"{stem}_predictions.{extension}")))
+    return paths
+
+def cmd_train(args):
+    model_data = pipeline.train_models(distill=args.distill or args.scorer == 'student', scorer=args.scorer)
+    pipeline.save_models(model_data, args.models_dir)
+    if args.publish:
+        publish_artifacts(args.models_dir, args.artifacts_root)
+    return 0
+
+def cmd_publish(args):
+    publish_artifacts(args.models_dir, args.artifacts_root)
+    return 0
+
+def cmd_score(args):
+    start = time.perf_counter()
+    model_data = get_models(args.models_dir, args.artifacts_root)
+    logger.info("Models ready in %.2fs (version %s)", time.perf_counter() - start, model_data['model_version'])
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    total_rows = 0
+    failures = 0
+    scoring_start = time.perf_counter()
+
+    for path, output_path in zip(args.inputs, output_paths(args.inputs, args.output_dir, export.FORMATS[args.format][0])):
+        file_start = time.perf_counter()
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            data = read_table(path)
+            result = pipeline.run_detection(model_data, data)
+            export.write_predictions(data, result, output_path, args.format, args.chunk_rows)
+        except Exception as e:
+            logger.error("Failed to score %s: %s", path, e)
+            failures += 1
+            continue
+
+        elapsed = time.perf_counter() - file_start
+        total_rows += len(data)
+        logger.info(
+            "%s: %d rows, %d candidates, %.2fs (%.0f rows/s) -> %s",
+            path, len(data), result['exoplanet_count'], elapsed, len(data) / max(elapsed, 1e-9), output_path
+        )
+
+    elapsed = time.perf_counter() - scoring_start
+    logger.info(
+        "Scored %d rows from %d files in %.2fs (%.0f rows/s)",
+        total_rows, len(args.inputs) - failures, elapsed, total_rows / max(elapsed, 1e-9)
+    )
+    return 1 if failures else 0
+
+def cmd_demo(args):
+    if args.write_dataset:
+        logger.info("Wrote demo dataset to %s", demo.write_demo_dataset(args.demo_dir))
+    model_data = get_models(args.models_dir, args.artifacts_root)
+    start = time.perf_counter()
+    bundle = demo.prepare_demo(model_data, args.demo_dir)
+    logger.info(
+        "Demo scores ready for version %s: %d rows, %d candidates (%.2fs)",
+        model_data['model_version'], len(bundle['data']), bundle['results']['exoplanet_count'],
+        time.perf_counter() - start
+    )
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="ExoHunter batch scoring")
+    parser.add_argument("-v", "--verbose", action="store_true", help="enable debug logging")
+    parser.add_argument(
+        "--artifacts-root", default=os.environ.get("EXOHUNTER_ARTIFACTS_ROOT", "artifacts"),
+        help="registry root holding published model versions"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train = subparsers.add_parser("train", help="train the models and save the artifacts")
+    train.add_argument("--models-dir", default="artifacts/current", help="directory to write the artifacts to")
+    train.add_argument("--publish", action="store_true", help="publish the new version so running apps hot-swap to it")
+    train.add_argument("--distill", action="store_true", default=pipeline.DISTILL_STUDENT, help="also fit a student model on the fusion's soft probabilities")
+    train.add_argument("--scorer", choices=pipeline.SCORERS, default=pipeline.DEFAULT_SCORER, help="model that serves predictions (student implies --distill)")
+    train.set_defaults(func=cmd_train)
+
+    publish = subparsers.add_parser("publish", help="publish saved artifacts as the version to serve")
+    publish.add_argument("models_dir", help="directory written by 'train'")
+    publish.set_defaults(func=cmd_publish)
+
+    score = subparsers.add_parser("score", help="score CSV/Parquet files and write per-row predictions")
+    score.add_argument("inputs", nargs="+", help="CSV or Parquet files to score")
+    score.add_argument("--models-dir", help="saved artifacts to load (default: latest published version)")
+    score.add_argument("--output-dir", default="predictions", help="directory for the prediction files")
+    score.add_argument("--format", choices=export.available_formats(), default="csv", help="output file format")
+    score.add_argument("--chunk-rows", type=int, default=export.EXPORT_CHUNK_ROWS, help="rows converted and written at a time")
+    score.set_defaults(func=cmd_score)
+
+    demo_parser = subparsers.add_parser("demo", help="precompute the bundled demo dataset's scores")
+    demo_parser.add_argument("--models-dir", help="saved artifacts to load (default: latest published version)")
+    demo_parser.add_argument("--demo-dir", default=demo.DEMO_DIR, help="directory holding the demo bundle")
+    demo_parser.add_argument("--write-dataset", action="store_true", help="regenerate the demo CSV before scoring")
+    demo_parser.set_defaults(func=cmd_demo)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""NumPy forward pass for the fusion's Conv1D model
+
+The CNN trained in ``pipeline.train_models`` is
+Conv1D(32, 2, relu) -> MaxPooling1D(2) -> Flatten -> Dense(32, relu) -> Dense(1, sigmoid).
+``NumpyConv1DNet`` evaluates exactly that architecture from the exported
+Keras weights, so serving processes score the CNN without TensorFlow and
+without Keras' per-call graph dispatch overhead.
+"""
+import numpy as np
+
+WEIGHTS_FILE = "cnn_weights.npz"
+
+# Order of ``get_weights()`` for the Sequential model built in train_models
+WEIGHT_NAMES = ('conv_kernel', 'conv_bias', 'hidden_kernel', 'hidden_bias', 'output_kernel', 'output_bias')
+
+class NumpyConv1DNet:
+    """Vectorized float32 inference for the trained Conv1D model"""
+
+    def __init__(self, weights, pool_size=2):
+        if len(weights) != len(WEIGHT_NAMES):
+            raise ValueError(f"Expected {len(WEIGHT_NAMES)} weight arrays, got {len(weights)}")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.pool_size = pool_size
+        conv_kernel = self.weights[0]
+        if conv_kernel.ndim != 3 or conv_kernel.shape[1] != 1:
+            raise ValueError(f"Unsupported Conv1D kernel shape {conv_kernel.shape}")
+        self.kernel_size = conv_kernel.shape[0]
+        # (kernel_size, 1, filters) -> (kernel_size, filters) for a single input channel
+        self._conv_kernel = conv_kernel[:, 0, :]
+
+    @classmethod
+    def from_keras(cls, model):
+        return cls(model.get_weights())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            return cls([archive[name] for name in WEIGHT_NAMES])
+
+    def save(self, path):
+        np.savez(path, **dict(zip(WEIGHT_NAMES, self.weights)))
+
+    def get_weights(self):
+        """Weights in Keras order, so model fingerprints match the Keras model"""
+        return list(self.weights)
+
+    def predict_proba(self, X):
+        """Exoplanet probability for each row of a scaled ``(n, features)`` matrix"""
+        X = np.asarray(X, dtype=np.float32).reshape(len(X), -1)
+        _, conv_bias, hidden_kernel, hidden_bias, output_kernel, output_bias = self.weights
+
+        # Conv1D, 'valid' padding, stride 1: stack the shifted windows and contract over the kernel axis
+        steps = X.shape[1] - self.kernel_size + 1
+        windows = np.stack([X[:, k:k + steps] for k in range(self.kernel_size)], axis=-1)
+        conv = np.maximum(windows @ self._conv_kernel + conv_bias, 0)
+
+        # MaxPooling1D drops a trailing partial window
+        pooled_steps = steps // self.pool_size
+        pooled = conv[:, :pooled_steps * self.pool_size].reshape(
+            len(X), pooled_steps, self.pool_size, -1
+        ).max(axis=2)
+
+        hidden = np.maximum(pooled.reshape(len(X), -1) @ hidden_kernel + hidden_bias, 0)
+        logits = (hidden @ output_kernel + output_bias)[:, 0]
+        return 1 / (1 + np.exp(-np.clip(logits, -80, 80)))
+
+def parity_error(keras_model, net, X):
+    """Largest absolute probability difference between Keras and the NumPy pass on ``X``"""
+    X = np.asarray(X, dtype=np.float32)
+    expected = keras_model.predict(X.reshape(len(X), -1, 1), verbose=0).flatten()
+    return float(np.max(np.abs(expected - net.predict_proba(X)), initial=0.0))
@@ -0,0 +1,83 @@
+"""Bundled demo dataset with precomputed scores
+
+The demo table ships with the app as ``demo/koi_demo.csv``. Its scores are
+computed once per model version and saved under ``demo/cache/``, keyed by
+the feature hash and model version, so later demo sessions and restarts
+load them instead of running the models. ``python -m core.cli demo``
+precomputes them at deploy time.
+"""
+import os
+import logging
+import numpy as np
+import pandas as pd
+from core import pipeline
+from utils.hashing import hash_array
+from utils.result_cache import get_result_cache
+from utils.sketches import sketch_frame
+
+logger = logging.getLogger(__name__)
+
+DEMO_DIR = os.environ.get("EXOHUNTER_DEMO_DIR", "demo")
+DEMO_DATASET = "koi_demo.csv"
+DEMO_ROWS = 2000
+DEMO_SEED = 2024
+
+def build_demo_dataset(rows=DEMO_ROWS, seed=DEMO_SEED):
+    """Synthetic KOI-like features for the demo, rounded to keep the bundled file small"""
+    data = pipeline.synthetic_dataset(rows, seed)[pipeline.FEATURE_COLUMNS]
+    return data.apply(lambda column: column.map(lambda value: float(f"{value:.6g}")))
+
+def write_demo_dataset(directory=DEMO_DIR, rows=DEMO_ROWS, seed=DEMO_SEED):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, DEMO_DATASET)
+    build_demo_dataset(rows, seed).to_csv(f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def load_demo_dataset(directory=DEMO_DIR):
+    """The bundled demo table, or a freshly generated one when the file is missing"""
+    path = os.path.join(directory, DEMO_DATASET)
+    if os.path.exists(path):
+        return pd.read_csv(path)
+    logger.warning("Demo dataset %s not found; generating it", path)
+    return build_demo_dataset()
+
+def _scores_path(directory, data_hash, model_version):
+    return os.path.join(directory, "cache", f"{data_hash}-{model_version}.npz")
+
+def load_demo_results(model_data, data, directory=DEMO_DIR, score_fn=None):
+    """Detection results for ``data``, from the score cache when this model version already scored it"""
+    data_hash = hash_array(pipeline.select_features(data))
+    path = _scores_path(directory, data_hash, model_data['model_version'])
+    if os.path.exists(path):
+        with np.load(path) as scores:
+            entry = get_result_cache().put(
+                (data_hash, model_data['model_version']),
+                scores['predictions'], scores['probabilities'], scores['xgb'], scores['cnn']
+            )
+        return pipeline.build_detection_result(entry, model_data, data_hash)
+
+    results = pipeline.run_detection(model_data, data, score_fn=score_fn)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "wb") as handle:
+        np.savez(
+            handle,
+            predictions=results['predictions'],
+            probabilities=results['probabilities'],
+            xgb=results['individual_preds']['xgb'],
+            cnn=results['individual_preds']['cnn']
+        )
+    os.replace(f"{path}.tmp", path)
+    return results
+
+def prepare_demo(model_data, directory=DEMO_DIR, score_fn=None):
+    """Everything a demo session needs: the table, its results and its summary sketch
+
+    The returned objects are shared by every demo session and must not be mutated.
+    """
+    data = load_demo_dataset(directory)
+    return {
+        'data': data,
+        'results': load_demo_results(model_data, data, directory, score_fn),
+        'sketch': sketch_frame(data)
+    }
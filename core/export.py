@@ -0,0 +1,116 @@
+"""Streaming export of per-row detection results
+
+Each output row carries the input row number, its identifier and feature
+columns, and the fused and per-model predictions. Rows are converted and
+written ``EXPORT_CHUNK_ROWS`` at a time straight from the scored table and
+result arrays (memmaps for uploads in the feature store), so no full-size
+frame or encoded string is built however many rows the result has.
+"""
+import io
+import os
+import gzip
+import contextlib
+import numpy as np
+import pandas as pd
+from core import pipeline
+from utils.instrumentation import span
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXOHUNTER_EXPORT_CHUNK_ROWS", "100000"))
+# zlib's default level: most of level 9's compression at a fraction of its time
+GZIP_LEVEL = 6
+
+# Identifier columns copied from the input next to each prediction when present
+ID_COLUMNS = ['kepid', 'kepoi_name', 'kepler_name', 'rowid']
+
+# Output format -> (file extension, MIME type)
+FORMATS = {
+    'csv': ('csv', 'text/csv'),
+    'csv.gz': ('csv.gz', 'application/gzip'),
+    'parquet': ('parquet', 'application/vnd.apache.parquet')
+}
+
+def available_formats():
+    return [name for name in FORMATS if name != 'parquet' or ARROW_AVAILABLE]
+
+def export_columns(data):
+    """Input columns carried into the export: identifiers, then model features"""
+    ids = [col for col in ID_COLUMNS if col in data.columns]
+    return ids + [col for col in pipeline.select_columns(data, pipeline.FEATURE_COLUMNS) if col not in ids]
+
+def prediction_chunks(data, results, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Per-row results joined with the input's identifier and feature columns, in row chunks"""
+    if len(data) != len(results['predictions']):
+        raise ValueError("The results do not belong to this table.")
+    columns = export_columns(data)
+    for start in range(0, len(data), chunk_rows):
+        end = min(start + chunk_rows, len(data))
+        chunk = data.iloc[start:end][columns].reset_index(drop=True)
+        chunk.insert(0, 'row', np.arange(start, end))
+        chunk['prediction'] = np.asarray(results['predictions'][start:end])
+        chunk['probability'] = np.asarray(results['probabilities'][start:end])
+        chunk['xgb_prediction'] = np.asarray(results['individual_preds']['xgb'][start:end])
+        chunk['cnn_prediction'] = np.asarray(results['individual_preds']['cnn'][start:end])
+        yield chunk
+
+def write_predictions(data, results, target, fmt='csv', chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write the per-row export to ``target`` (a path or a binary file object); returns rows written"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    if fmt == 'parquet' and not ARROW_AVAILABLE:
+        raise ValueError("Parquet export needs pyarrow; export as CSV instead.")
+
+    rows = 0
+    with span(f'export.{fmt}', rows=len(data)):
+        if fmt == 'parquet':
+            writer = None
+            try:
+                for chunk in prediction_chunks(data, results, chunk_rows):
+                    # Each chunk becomes one row group, cast to the first chunk's schema
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema if writer else None, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(target, table.schema)
+                    writer.write_table(table)
+                    rows += len(chunk)
+                if writer is None:
+                    pq.write_table(pa.Table.from_pandas(_empty_export(data), preserve_index=False), target)
+            finally:
+                if writer is not None:
+                    writer.close()
+            return rows
+
+        with _text_output(target, compress=fmt == 'csv.gz') as handle:
+            for chunk in prediction_chunks(data, results, chunk_rows):
+                chunk.to_csv(handle, header=rows == 0, index=False)
+                rows += len(chunk)
+            if rows == 0:
+                _empty_export(data).to_csv(handle, index=False)
+    return rows
+
+@contextlib.contextmanager
+def _text_output(target, compress=False):
+    """UTF-8 text handle on a path or binary file object, gzip-compressed if asked"""
+    if isinstance(target, (str, os.PathLike)):
+        with open(target, 'wb') as binary_file, _text_output(binary_file, compress) as handle:
+            yield handle
+        return
+    binary = gzip.GzipFile(fileobj=target, mode='wb', compresslevel=GZIP_LEVEL) if compress else target
+    handle = io.TextIOWrapper(binary, encoding='utf-8', newline='')
+    try:
+        yield handle
+    finally:
+        # Leave the caller's file object open
+        handle.flush()
+        handle.detach()
+        if compress:
+            binary.close()
+
+def _empty_export(data):
+    columns = ['row'] + export_columns(data) + ['prediction', 'probability', 'xgb_prediction', 'cnn_prediction']
+    return pd.DataFrame(columns=columns)
@@ -0,0 +1,289 @@
+"""Memory-mapped columnar store for uploaded tables
+
+An upload is written once, chunk by chunk, into a directory under
+``STORE_ROOT``::
+
+    manifest.json            row count and columns in upload order
+    columns/<n>.bin          each numeric column as a raw array of its dtype
+    text.parquet             the non-numeric columns, if any
+    <version>/scaled.f32     imputed and standardised feature matrix (rows x features)
+    <version>/<output>.npy   predictions, probabilities and per-model predictions
+
+Numeric columns keep the dtype pandas parsed for them, widened to float64
+if a later chunk needs it. They, the scaled matrix and the scores are read back as
+read-only ``np.memmap`` views, so a table far larger than the session's heap
+is paged in by the OS on demand. ``FeatureStore.frame()`` wraps the column
+views in a DataFrame without copying them, for code that expects one.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+from core import pipeline
+from utils.hashing import hash_array_chunks
+from utils.result_cache import get_result_cache
+from utils.instrumentation import span
+
+logger = logging.getLogger(__name__)
+
+STORE_ROOT = os.environ.get("EXOHUNTER_FEATURE_STORE_DIR", os.path.join("data", "feature_store"))
+STORE_TTL_SECONDS = float(os.environ.get("EXOHUNTER_FEATURE_STORE_TTL", str(24 * 3600)))
+SCORE_CHUNK_ROWS = int(os.environ.get("EXOHUNTER_SCORE_CHUNK_ROWS", "262144"))
+
+MANIFEST = "manifest.json"
+TEXT_FILE = "text.parquet"
+SCORE_DTYPES = {'predictions': np.int8, 'probabilities': np.float32, 'xgb': np.int8, 'cnn': np.int8}
+
+def _write_json(path, payload):
+    with open(f"{path}.tmp", "w") as handle:
+        json.dump(payload, handle)
+    os.replace(f"{path}.tmp", path)
+
+class FeatureStoreWriter:
+    """Append DataFrame chunks to a new store; the first chunk fixes the columns"""
+
+    def __init__(self, root=STORE_ROOT):
+        self.directory = os.path.join(root, uuid.uuid4().hex)
+        os.makedirs(os.path.join(self.directory, "columns"))
+        self.rows = 0
+        self._columns = None
+        self._files = {}
+        self._text = {}
+
+    def append(self, chunk):
+        if self._columns is None:
+            numeric = set(chunk.select_dtypes(include=[np.number, 'bool']).columns)
+            self._columns = [
+                {'name': name, 'kind': 'numeric' if name in numeric else 'text'}
+                for name in chunk.columns
+            ]
+            for index, column in enumerate(self._columns):
+                if column['kind'] == 'numeric':
+                    column['file'] = f"{index}.bin"
+                    column['dtype'] = np.dtype(chunk[column['name']].dtype).str
+                    self._files[column['name']] = open(self._path(column), "wb")
+        elif list(chunk.columns) != [column['name'] for column in self._columns]:
+            raise ValueError("Every chunk of an upload must have the same columns.")
+
+        for column in self._columns:
+            values = chunk[column['name']]
+            if column['kind'] == 'numeric' and values.dtype.kind not in 'biuf':
+                # Text in a column that parsed as numbers so far: the whole column becomes text,
+                # as it would in one concatenated frame
+                self._to_text(column)
+            if column['kind'] == 'text':
+                # "string" keeps missing values missing, where astype(str) would write "nan"
+                self._text.setdefault(column['name'], []).append(values.astype("string"))
+                continue
+            if not np.can_cast(values.dtype, column['dtype']):
+                self._widen(column)
+            # Only float columns can hold gaps; pandas 2 rejects an na_value for integer targets
+            gaps = {'na_value': np.nan} if np.dtype(column['dtype']).kind == 'f' else {}
+            self._files[column['name']].write(values.to_numpy(dtype=column['dtype'], **gaps).tobytes())
+        self.rows += len(chunk)
+        return self
+
+    @property
+    def text_columns(self):
+        """Columns stored as text, including numeric ones that met text in a later chunk"""
+        return [column['name'] for column in self._columns or [] if column['kind'] == 'text']
+
+    def _path(self, column):
+        return os.path.join(self.directory, "columns", column['file'])
+
+    def _widen(self, column):
+        """Rewrite a column written so far as float64, e.g. when integers are followed by gaps"""
+        if column['dtype'] == np.dtype(np.float64).str:
+            return
+        self._files[column['name']].close()
+        written = np.fromfile(self._path(column), dtype=column['dtype'])
+        column['dtype'] = np.dtype(np.float64).str
+        written.astype(np.float64).tofile(self._path(column))
+        self._files[column['name']] = open(self._path(column), "ab")
+
+    def _to_text(self, column):
+        """Move a numeric column written so far into the text columns"""
+        handle = self._files.pop(column['name'])
+        handle.close()
+        written = np.fromfile(self._path(column), dtype=column['dtype'])
+        os.remove(self._path(column))
+        self._text[column['name']] = [pd.Series(written).astype("string")]
+        column['kind'] = 'text'
+        del column['file'], column['dtype']
+
+    def close(self):
+        """Finish the store and open it for reading"""
+        for handle in self._files.values():
+            handle.close()
+        if self._text:
+            text = pd.DataFrame({
+                name: pd.concat(parts, ignore_index=True) for name, parts in self._text.items()
+            })
+            text.to_parquet(os.path.join(self.directory, TEXT_FILE), index=False)
+        _write_json(os.path.join(self.directory, MANIFEST), {'rows': self.rows, 'columns': self._columns or []})
+        return FeatureStore(self.directory)
+
+    def abort(self):
+        for handle in self._files.values():
+            handle.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class FeatureStore:
+    """Read-only, memory-mapped view of one stored upload"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST)) as handle:
+            manifest = json.load(handle)
+        self.rows = manifest['rows']
+        self.columns = manifest['columns']
+        self._maps = {}
+        # Opening a store marks it as in use for ``prune_stores``
+        os.utime(directory)
+
+    def _map(self, relative_path, dtype, shape):
+        if relative_path not in self._maps:
+            path = os.path.join(self.directory, relative_path)
+            self._maps[relative_path] = (
+                np.memmap(path, dtype=dtype, mode='r', shape=shape) if self.rows else np.empty(shape, dtype)
+            )
+        return self._maps[relative_path]
+
+    def column(self, name):
+        """Numeric column ``name`` as a read-only memmap"""
+        for column in self.columns:
+            if column['name'] == name and column['kind'] == 'numeric':
+                return self._map(os.path.join("columns", column['file']), np.dtype(column['dtype']), (self.rows,))
+        raise KeyError(name)
+
+    def schema(self):
+        """Zero-row DataFrame with the stored column names and dtypes"""
+        return pd.DataFrame({
+            column['name']: np.empty(0, dtype=np.dtype(column['dtype']) if column['kind'] == 'numeric' else object)
+            for column in self.columns
+        })
+
+    def frame(self):
+        """The upload as a DataFrame whose numeric columns are views on the memmaps"""
+        text_path = os.path.join(self.directory, TEXT_FILE)
+        text = pd.read_parquet(text_path) if os.path.exists(text_path) else None
+        data = {
+            column['name']: self.column(column['name']) if column['kind'] == 'numeric' else text[column['name']]
+            for column in self.columns
+        }
+        return pd.DataFrame(data, columns=[column['name'] for column in self.columns], copy=False)
+
+    def feature_chunks(self, feature_columns, chunk_rows=SCORE_CHUNK_ROWS):
+        """Raw float64 feature matrix in row chunks, each built from column slices"""
+        columns = [self.column(name) for name in feature_columns]
+        for start in range(0, self.rows, chunk_rows):
+            end = min(start + chunk_rows, self.rows)
+            yield start, end, np.column_stack([column[start:end] for column in columns]).astype(np.float64, copy=False)
+
+    def feature_hash(self, feature_columns, chunk_rows=SCORE_CHUNK_ROWS):
+        """Same value as ``hash_array`` of the in-memory feature matrix, used as the result cache key"""
+        return hash_array_chunks(
+            (chunk for _, _, chunk in self.feature_chunks(feature_columns, chunk_rows)),
+            np.float64, (self.rows, len(feature_columns))
+        )
+
+    def scaled(self, model_data, feature_columns, chunk_rows=SCORE_CHUNK_ROWS):
+        """Imputed, standardised float32 features for this model version, written on first use"""
+        version_dir = os.path.join(self.directory, model_data['model_version'])
+        relative_path = os.path.join(model_data['model_version'], "scaled.f32")
+        shape = (self.rows, len(feature_columns))
+        if not os.path.exists(os.path.join(self.directory, relative_path)):
+            os.makedirs(version_dir, exist_ok=True)
+            tmp_path = os.path.join(version_dir, "scaled.f32.tmp")
+            scaled = np.memmap(tmp_path, dtype=np.float32, mode='w+', shape=shape) if self.rows else None
+            with span('store.scale', rows=self.rows):
+                for start, end, X in self.feature_chunks(feature_columns, chunk_rows):
+                    model_data['preprocessor'].transform(X, out=scaled[start:end])
+            if scaled is not None:
+                scaled.flush()
+                del scaled
+                os.replace(tmp_path, os.path.join(self.directory, relative_path))
+        return self._map(relative_path, np.float32, shape)
+
+    def scores(self, model_version):
+        """Stored outputs of ``model_version`` as read-only arrays, or None before scoring"""
+        paths = {name: os.path.join(self.directory, model_version, f"{name}.npy") for name in SCORE_DTYPES}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        return {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+
+    def score(self, model_data, feature_columns, progress_callback=None, score_fn=None, chunk_rows=SCORE_CHUNK_ROWS):
+        """Score the store chunk by chunk and keep the outputs next to it
+
+        In-process models read the stored scaled matrix; ``score_fn(X)`` (a
+        worker pool) is given raw feature chunks instead.
+        """
+        version = model_data['model_version']
+        stored = self.scores(version)
+        if stored is not None:
+            return stored
+
+        version_dir = os.path.join(self.directory, version)
+        os.makedirs(version_dir, exist_ok=True)
+        outputs = {
+            name: np.lib.format.open_memmap(os.path.join(version_dir, f"{name}.npy.tmp"), mode='w+', dtype=dtype, shape=(self.rows,))
+            for name, dtype in SCORE_DTYPES.items()
+        }
+        if score_fn is None:
+            pipeline.report_progress(progress_callback, 'scale', self.rows)
+            scaled = self.scaled(model_data, feature_columns, chunk_rows)
+            stage = 'student' if model_data.get('scorer') == 'student' else 'xgboost'
+            pipeline.report_progress(progress_callback, stage, self.rows)
+            chunks = ((start, min(start + chunk_rows, self.rows)) for start in range(0, self.rows, chunk_rows))
+            for start, end in chunks:
+                self._write_scores(outputs, start, end, pipeline.score_scaled(model_data, np.asarray(scaled[start:end])))
+        else:
+            pipeline.report_progress(progress_callback, 'batch', self.rows)
+            for start, end, X in self.feature_chunks(feature_columns, chunk_rows):
+                self._write_scores(outputs, start, end, score_fn(X))
+
+        for name, output in outputs.items():
+            output.flush()
+            os.replace(output.filename, os.path.join(version_dir, f"{name}.npy"))
+        return self.scores(version)
+
+    @staticmethod
+    def _write_scores(outputs, start, end, scores):
+        for name, output in outputs.items():
+            output[start:end] = np.asarray(scores[name]).ravel()
+
+def run_detection(model_data, store, progress_callback=None, score_fn=None):
+    """``pipeline.run_detection`` for a stored upload, scoring it out of core
+
+    Results share the in-memory result cache (same feature hash key) but
+    their arrays are memmaps of the stored outputs rather than heap copies.
+    """
+    pipeline.report_progress(progress_callback, 'ingest', store.rows)
+    feature_columns = pipeline.select_columns(store.schema(), pipeline.FEATURE_COLUMNS)
+    data_hash = store.feature_hash(feature_columns)
+    cache_key = (data_hash, model_data['model_version'])
+    cache = get_result_cache()
+    entry = cache.get(cache_key)
+
+    if entry is None:
+        scores = store.score(model_data, feature_columns, progress_callback, score_fn)
+        entry = cache.put(cache_key, scores['predictions'], scores['probabilities'], scores['xgb'], scores['cnn'])
+
+    return pipeline.build_detection_result(entry, model_data, data_hash)
+
+def prune_stores(root=STORE_ROOT, max_age=STORE_TTL_SECONDS):
+    """Delete stores not modified for ``max_age`` seconds"""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError as e:
+            logger.warning("Could not prune feature store %s: %s", path, e)
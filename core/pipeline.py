@@ -0,0 +1,483 @@
+"""Streamlit-free training and inference for the ExoFusion (XGBoost + CNN) model
+
+Everything here reports through ``logging`` and optional progress callbacks so it
+can run inside the Streamlit app, the batch CLI or any other process.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import importlib.util
+import warnings
+warnings.filterwarnings("ignore")
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+import xgboost as xgb
+from core.cnn_numpy import NumpyConv1DNet, WEIGHTS_FILE, parity_error
+from core.preprocessing import FeaturePreprocessor, select_columns
+from utils.hashing import hash_array
+from utils.result_cache import get_result_cache
+from utils.instrumentation import span
+
+# Optional dependencies are imported on first use, so processes that hand
+# scoring to model workers never load TensorFlow or SHAP themselves
+SHAP_AVAILABLE = importlib.util.find_spec("shap") is not None
+TF_AVAILABLE = importlib.util.find_spec("tensorflow") is not None
+
+# Optional distillation of the fusion into one gradient-boosted student model.
+# SCORERS names what serves predictions: the two-model fusion or the student,
+# which implies distillation.
+SCORERS = ('fusion', 'student')
+DEFAULT_SCORER = os.environ.get("EXOHUNTER_SCORER", "fusion")
+DISTILL_STUDENT = os.environ.get("EXOHUNTER_DISTILL", "0") == "1" or DEFAULT_SCORER == 'student'
+
+# Loaded versions score the CNN with the NumPy forward pass unless this is "keras"
+CNN_BACKEND = os.environ.get("EXOHUNTER_CNN_BACKEND", "numpy")
+CNN_PARITY_TOLERANCE = 1e-4
+
+def _keras():
+    from tensorflow.keras import layers, models
+    return layers, models
+
+logger = logging.getLogger(__name__)
+
+KOI_URL = "https://exoplanetarchive.ipac.caltech.edu/TblView/nph-tblView?config=KOI&format=csv"
+FEATURE_COLUMNS = ['koi_period','koi_depth','koi_duration','koi_impact','koi_prad']
+
+# Pipeline stages reported to progress callbacks, in execution order
+PIPELINE_STAGES = [
+    ('load_dataset', "🔍 Loading training dataset"),
+    ('train_xgb', "⚙️ Training XGBoost classifier"),
+    ('train_cnn', "🤖 Training CNN model"),
+    ('distill', "🎓 Distilling fusion into a student model"),
+    ('ingest', "📥 Reading uploaded dataset"),
+    ('batch', "🧮 Scoring in shared batch"),
+    ('scale', "📐 Scaling features"),
+    ('student', "🎓 Scoring with distilled student"),
+    ('xgboost', "🧠 Scoring with XGBoost"),
+    ('cnn', "🤖 Scoring with CNN"),
+    ('fusion', "🔗 Fusing model predictions"),
+    ('shap', "📊 Generating SHAP explanations"),
+]
+
+def report_progress(progress_callback, stage, rows):
+    """Forward a stage event to the progress callback, if one was given"""
+    if progress_callback is not None:
+        progress_callback(stage, rows)
+
+def model_version(xgb_model, preprocessor, cnn_model, student_model=None, scorer='fusion'):
+    """Fingerprint of the trained artifacts, used to invalidate cached results"""
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update(bytes(xgb_model.get_booster().save_raw(raw_format='ubj')))
+    digest.update(np.ascontiguousarray(preprocessor.mean_).tobytes())
+    digest.update(np.ascontiguousarray(preprocessor.scale_).tobytes())
+    digest.update(np.ascontiguousarray(preprocessor.medians_).tobytes())
+    if cnn_model is not None:
+        for weights in cnn_model.get_weights():
+            digest.update(np.ascontiguousarray(weights).tobytes())
+    if student_model is not None:
+        digest.update(bytes(student_model.get_booster().save_raw(raw_format='ubj')))
+        digest.update(scorer.encode())
+    return digest.hexdigest()
+
+def cnn_probabilities(cnn_model, X_scaled):
+    """CNN probabilities from either the NumPy forward pass or a Keras model"""
+    if isinstance(cnn_model, NumpyConv1DNet):
+        return cnn_model.predict_proba(X_scaled)
+    return cnn_model.predict(X_scaled.reshape(-1,5,1), verbose=0).flatten()
+
+def fusion_probabilities(xgb_model, cnn_model, X_scaled):
+    """Soft fusion output (mean of XGBoost and CNN probabilities) on scaled features"""
+    prob_xgb = xgb_model.predict_proba(X_scaled)[:, 1]
+    if cnn_model is None:
+        return prob_xgb
+    return (prob_xgb + cnn_probabilities(cnn_model, X_scaled)) / 2
+
+def distill_student(xgb_model, cnn_model, X_train, X_test, y_test, y_pred_fusion):
+    """Fit a compact boosted student on the fusion's soft probabilities
+
+    Returns the student and a report of its fidelity (agreement with the
+    ensemble's test predictions), probability error and test accuracy.
+    """
+    soft_targets = fusion_probabilities(xgb_model, cnn_model, X_train)
+    student = xgb.XGBRegressor(objective='reg:logistic', n_estimators=150, max_depth=4, learning_rate=0.1)
+    student.fit(X_train, soft_targets)
+
+    student_prob = student.predict(X_test)
+    student_pred = (student_prob > 0.5).astype(int)
+    teacher_prob = fusion_probabilities(xgb_model, cnn_model, X_test)
+    report = {
+        'fidelity': float(np.mean(student_pred == np.asarray(y_pred_fusion).ravel())),
+        'probability_mae': float(np.mean(np.abs(student_prob - teacher_prob))),
+        'accuracy': float(accuracy_score(y_test, student_pred))
+    }
+    return student, report
+
+def load_or_generate_dataset():
+    """Load NASA KOI dataset or generate synthetic data - using exact code from provided file"""
+    try:
+        logger.info("Attempting to download KOI CSV from NASA Exoplanet Archive...")
+        # skip comment lines
+        with span('dataset.download') as download:
+            df = pd.read_csv(KOI_URL, comment='#')
+            download.rows = len(df)
+        logger.info("Downloaded KOI table with shape: %s", df.shape)
+
+        # Keep only relevant columns
+        cols = [c for c in FEATURE_COLUMNS + ['koi_disposition'] if c in df.columns]
+        df = df[cols].copy()
+
+        # Normalize disposition
+        if 'koi_disposition' in df.columns:
+            df['koi_disposition'] = df['koi_disposition'].astype(str).str.upper()
+            df = df[df['koi_disposition'].isin(['CANDIDATE','CONFIRMED','FALSE POSITIVE','FALSE_POSITIVE','FALSE_POS'])]
+            df['label'] = df['koi_disposition'].apply(lambda x: 0 if 'FALSE' in x else 1)
+        else:
+            raise ValueError("Disposition column missing in KOI fetch -> fallback")
+
+        # Coerce numeric columns; gaps are left for the preprocessor, which
+        # learns its imputation medians from the raw values
+        for c in FEATURE_COLUMNS:
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors='coerce')
+            else:
+                df[c] = 0
+
+        df = df[FEATURE_COLUMNS + ['label']].dropna(subset=['label']).reset_index(drop=True)
+        df = df.sample(frac=1, random_state=42).reset_index(drop=True)
+
+        if df.shape[0] < 500:
+            raise ValueError("KOI table too small, using synthetic instead.")
+
+        return df
+
+    except Exception as e:
+        logger.warning("Could not download KOI CSV. Generating synthetic dataset. Error: %s", e)
+        return synthetic_dataset()
+
+def synthetic_dataset(n=9000, seed=42):
+    """Synthetic KOI-like table with a ``label`` column - exact code from provided file"""
+    rng = np.random.RandomState(seed)
+    koi_period = 10**rng.uniform(np.log10(0.3), np.log10(500), n)
+    koi_depth = rng.exponential(scale=200, size=n) / 1e5
+    koi_duration = np.clip(rng.normal(3,1,n), 0.1, 20)
+    koi_impact = np.clip(rng.beta(2,2,n), 0, 1)
+    koi_prad = np.clip(rng.normal(2,1,n), 0.1, 20)
+    prob = (koi_depth*1e5) * (1/(1+np.exp(-(koi_prad-1.2)))) * (1/(1+np.log1p(koi_period)))
+    prob = (prob - prob.min())/(prob.max()-prob.min())
+    label = (prob + 0.1*rng.randn(n) > 0.5).astype(int)
+
+    df = pd.DataFrame({
+        'koi_period': koi_period,
+        'koi_depth': koi_depth,
+        'koi_duration': koi_duration,
+        'koi_impact': koi_impact,
+        'koi_prad': koi_prad,
+        'label': label
+    })
+    return df
+
+def train_models(progress_callback=None, distill=DISTILL_STUDENT, scorer=DEFAULT_SCORER):
+    """Train the hybrid XGBoost + CNN model - using exact code from provided file
+
+    ``progress_callback(stage, rows)`` receives stage events while training runs.
+    With ``distill`` a student model is fitted to the fusion as well, and
+    ``scorer='student'`` (which implies ``distill``) makes it the production scorer.
+    """
+    if scorer not in SCORERS:
+        raise ValueError(f"Unknown scorer {scorer!r}; expected one of {SCORERS}")
+    distill = distill or scorer == 'student'
+
+    # Load dataset
+    report_progress(progress_callback, 'load_dataset', 0)
+    df = load_or_generate_dataset()
+
+    # Preprocessing: the fitted preprocessor is saved with the models and
+    # applied identically at inference time
+    X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df['label'].values
+
+    preprocessor = FeaturePreprocessor(FEATURE_COLUMNS)
+    X_scaled = preprocessor.fit_transform(X)
+
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42, stratify=y)
+
+    # XGBoost Model - exact code
+    report_progress(progress_callback, 'train_xgb', len(X_train))
+    xgb_model = xgb.XGBClassifier(n_estimators=100, use_label_encoder=False, eval_metric='logloss')
+    with span('train.xgboost', rows=len(X_train)):
+        xgb_model.fit(X_train, y_train)
+
+    # Test predictions
+    y_pred_xgb = xgb_model.predict(X_test)
+    xgb_acc = accuracy_score(y_test, y_pred_xgb)
+
+    # CNN Model (if TensorFlow is available)
+    cnn_model = None
+    cnn_acc = 0.0
+    fusion_acc = xgb_acc
+    y_pred_fusion = y_pred_xgb
+
+    if TF_AVAILABLE:
+        # Simple CNN Model - exact code
+        report_progress(progress_callback, 'train_cnn', len(X_train))
+        X_train_cnn = X_train.reshape(-1,5,1)
+        X_test_cnn = X_test.reshape(-1,5,1)
+
+        layers, models = _keras()
+        cnn_model = models.Sequential([
+            layers.Conv1D(32, 2, activation='relu', input_shape=(5,1)),
+            layers.MaxPooling1D(2),
+            layers.Flatten(),
+            layers.Dense(32, activation='relu'),
+            layers.Dense(1, activation='sigmoid')
+        ])
+        cnn_model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+        with span('train.cnn', rows=len(X_train)):
+            cnn_model.fit(X_train_cnn, y_train, epochs=5, batch_size=32, verbose=0)
+
+        y_pred_cnn = (cnn_model.predict(X_test_cnn, verbose=0) > 0.5).astype(int)
+        y_pred_fusion = ((y_pred_xgb + y_pred_cnn.flatten()) / 2 > 0.5).astype(int)
+
+        # Calculate accuracies
+        cnn_acc = accuracy_score(y_test, y_pred_cnn)
+        fusion_acc = accuracy_score(y_test, y_pred_fusion)
+
+        # Serving uses the NumPy forward pass; refuse weights it cannot reproduce
+        error = parity_error(cnn_model, NumpyConv1DNet.from_keras(cnn_model), X_test)
+        logger.info("NumPy CNN parity: max probability difference %.2e", error)
+        if error > CNN_PARITY_TOLERANCE:
+            raise RuntimeError(f"NumPy CNN differs from Keras by {error:.2e} (tolerance {CNN_PARITY_TOLERANCE:.0e})")
+
+    logger.info("Trained models: xgb=%.3f cnn=%.3f fusion=%.3f", xgb_acc, cnn_acc, fusion_acc)
+
+    accuracies = {
+        'xgb': xgb_acc,
+        'cnn': cnn_acc,
+        'fusion': fusion_acc
+    }
+    student_model = None
+    distillation = None
+    if distill:
+        report_progress(progress_callback, 'distill', len(X_train))
+        with span('train.distill', rows=len(X_train)):
+            student_model, distillation = distill_student(xgb_model, cnn_model, X_train, X_test, y_test, y_pred_fusion)
+        accuracies['student'] = distillation['accuracy']
+        logger.info(
+            "Distilled student: accuracy=%.3f fidelity=%.3f probability MAE=%.4f",
+            distillation['accuracy'], distillation['fidelity'], distillation['probability_mae']
+        )
+
+    return {
+        'xgb_model': xgb_model,
+        'cnn_model': cnn_model,
+        'student_model': student_model,
+        'preprocessor': preprocessor,
+        'test_data': (X_test, y_test),
+        'accuracies': accuracies,
+        'distillation': distillation,
+        'scorer': scorer,
+        'tf_available': TF_AVAILABLE,
+        'model_version': model_version(xgb_model, preprocessor, cnn_model, student_model, scorer)
+    }
+
+def save_models(model_data, directory):
+    """Persist trained artifacts to ``directory``
+
+    Writes the joblib bundle, the CNN weights for the NumPy forward pass and,
+    when the CNN is a Keras model, the full Keras model as well.
+    """
+    os.makedirs(directory, exist_ok=True)
+    bundle = {key: value for key, value in model_data.items() if key != 'cnn_model'}
+    joblib.dump(bundle, os.path.join(directory, 'models.joblib'))
+    cnn_model = model_data['cnn_model']
+    if cnn_model is not None:
+        if isinstance(cnn_model, NumpyConv1DNet):
+            cnn_model.save(os.path.join(directory, WEIGHTS_FILE))
+        else:
+            NumpyConv1DNet.from_keras(cnn_model).save(os.path.join(directory, WEIGHTS_FILE))
+            cnn_model.save(os.path.join(directory, 'cnn_model.keras'))
+    # Lightweight metadata for processes that do not load the models themselves
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump({
+            'model_version': model_data['model_version'],
+            'accuracies': {name: float(value) for name, value in model_data['accuracies'].items()},
+            'distillation': model_data.get('distillation'),
+            'scorer': model_data.get('scorer', 'fusion'),
+            'tf_available': model_data['cnn_model'] is not None
+        }, f)
+    logger.info("Saved model %s to %s", model_data['model_version'], directory)
+
+def load_models(directory):
+    """Load artifacts written by ``save_models``
+
+    The CNN is loaded as a ``NumpyConv1DNet`` from its exported weights, so
+    serving needs no TensorFlow; EXOHUNTER_CNN_BACKEND=keras loads the Keras
+    model instead. A student-scored version skips the CNN entirely.
+    """
+    model_data = joblib.load(os.path.join(directory, 'models.joblib'))
+    model_data.setdefault('scorer', 'fusion')
+    model_data.setdefault('student_model', None)
+    if 'preprocessor' not in model_data:
+        model_data['preprocessor'] = FeaturePreprocessor.from_scaler(model_data.pop('scaler'), FEATURE_COLUMNS)
+    cnn_path = os.path.join(directory, 'cnn_model.keras')
+    weights_path = os.path.join(directory, WEIGHTS_FILE)
+    keras_available = TF_AVAILABLE and os.path.exists(cnn_path)
+    model_data['cnn_model'] = None
+    if model_data['scorer'] != 'student':
+        # Artifacts saved before the weights were exported only have the Keras model
+        if keras_available and (CNN_BACKEND == 'keras' or not os.path.exists(weights_path)):
+            _, models = _keras()
+            model_data['cnn_model'] = models.load_model(cnn_path)
+        elif os.path.exists(weights_path):
+            model_data['cnn_model'] = NumpyConv1DNet.load(weights_path)
+    model_data['tf_available'] = model_data['cnn_model'] is not None
+    logger.info("Loaded model %s from %s", model_data['model_version'], directory)
+    return model_data
+
+def read_manifest(directory):
+    """Return the metadata written by ``save_models`` or None when absent"""
+    path = os.path.join(directory, 'manifest.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def select_features(data):
+    """Pick the five model features from ``data``
+
+    Falls back to the first five numeric columns and raises ``ValueError`` when
+    there are not enough of them.
+    """
+    return data[select_columns(data, FEATURE_COLUMNS)].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def score_features(model_data, X, progress_callback=None):
+    """Score a raw feature matrix and return fusion, XGBoost and CNN outputs
+
+    When the version's scorer is the distilled student, one student pass
+    replaces both models and its predictions fill every output.
+    """
+    # Impute and scale the data in one float32 pass
+    report_progress(progress_callback, 'scale', len(X))
+    with span('predict.scale', rows=len(X)):
+        X_scaled = model_data['preprocessor'].transform(X)
+
+    return score_scaled(model_data, X_scaled, progress_callback)
+
+def score_scaled(model_data, X_scaled, progress_callback=None):
+    """Score a feature matrix already imputed and scaled by the version's preprocessor"""
+    xgb_model = model_data['xgb_model']
+    cnn_model = model_data['cnn_model']
+    tf_available = model_data.get('tf_available', False)
+
+    if model_data.get('scorer') == 'student':
+        report_progress(progress_callback, 'student', len(X_scaled))
+        with span('predict.student', rows=len(X_scaled)):
+            prob_student = np.clip(model_data['student_model'].predict(X_scaled), 0, 1)
+        pred_student = (prob_student > 0.5).astype(int)
+        return {
+            'predictions': pred_student,
+            'probabilities': prob_student,
+            'xgb': pred_student,
+            'cnn': pred_student
+        }
+
+    # Make predictions
+    report_progress(progress_callback, 'xgboost', len(X_scaled))
+    with span('predict.xgboost', rows=len(X_scaled)):
+        pred_xgb = xgb_model.predict(X_scaled)
+        prob_xgb = xgb_model.predict_proba(X_scaled)[:, 1]
+
+    if tf_available and cnn_model is not None:
+        report_progress(progress_callback, 'cnn', len(X_scaled))
+        with span('predict.cnn', rows=len(X_scaled)):
+            prob_cnn = cnn_probabilities(cnn_model, X_scaled)
+        pred_cnn = (prob_cnn > 0.5).astype(int)
+        report_progress(progress_callback, 'fusion', len(X_scaled))
+        pred_fusion = ((pred_xgb + pred_cnn) / 2 > 0.5).astype(int)
+        prob_fusion = (prob_xgb + prob_cnn) / 2
+    else:
+        # Use only XGBoost if TensorFlow is not available
+        pred_cnn = pred_xgb
+        pred_fusion = pred_xgb
+        prob_fusion = prob_xgb
+
+    return {
+        'predictions': pred_fusion,
+        'probabilities': prob_fusion,
+        'xgb': pred_xgb,
+        'cnn': pred_cnn
+    }
+
+def run_detection(model_data, data, progress_callback=None, score_fn=None):
+    """Score a DataFrame, reusing cached results for identical feature matrices
+
+    ``progress_callback(stage, rows)`` is called as each stage in ``PIPELINE_STAGES`` starts.
+    ``score_fn(X)`` replaces the in-thread ``score_features`` call, e.g. with a
+    shared ``BatchDispatcher.submit``.
+    """
+    report_progress(progress_callback, 'ingest', len(data))
+    X = select_features(data)
+
+    # Reuse results when this feature matrix was already scored by the same model
+    data_hash = hash_array(np.asarray(X, dtype=np.float64))
+    cache_key = (data_hash, model_data['model_version'])
+    cache = get_result_cache()
+    entry = cache.get(cache_key)
+
+    if entry is None:
+        if score_fn is None:
+            scores = score_features(model_data, X, progress_callback)
+        else:
+            report_progress(progress_callback, 'batch', len(X))
+            scores = score_fn(X)
+        entry = cache.put(cache_key, scores['predictions'], scores['probabilities'], scores['xgb'], scores['cnn'])
+
+    return build_detection_result(entry, model_data, data_hash)
+
+def build_detection_result(entry, model_data, data_hash):
+    """Assemble the result dict consumed by the results page from compact arrays"""
+    predictions = entry['predictions']
+    probabilities = entry['probabilities']
+
+    # Determine overall result
+    exoplanet_count = int(predictions.sum())
+    confidence = float(probabilities.max()) if len(probabilities) else 0.0
+
+    return {
+        'predictions': predictions,
+        'probabilities': probabilities,
+        'exoplanet_count': exoplanet_count,
+        'confidence': confidence,
+        'model_accuracies': model_data['accuracies'],
+        'individual_preds': {
+            'xgb': entry['xgb'],
+            'cnn': entry['cnn']
+        },
+        'data_hash': data_hash,
+        'model_version': model_data['model_version'],
+        'scorer': model_data.get('scorer', 'fusion'),
+        'distillation': model_data.get('distillation'),
+        'analyzed_at': time.time()
+    }
+
+def explain(model_data, data, progress_callback=None):
+    """Generate SHAP values for the XGBoost model, or ``(None, None)`` without SHAP"""
+    if not SHAP_AVAILABLE:
+        return None, None
+
+    X = select_features(data)
+    report_progress(progress_callback, 'shap', len(X))
+    return explain_features(model_data, X), FEATURE_COLUMNS
+
+def explain_features(model_data, X):
+    """SHAP explanation of the XGBoost model for a raw feature matrix"""
+    import shap
+
+    X_scaled = model_data['preprocessor'].transform(X)
+    explainer = shap.Explainer(model_data['xgb_model'])
+    return explainer(X_scaled)
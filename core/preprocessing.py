@@ -0,0 +1,91 @@
+"""Fitted feature preprocessing shared by training and inference
+
+``FeaturePreprocessor`` is fitted once on the training table and saved with
+the models. It holds the column mapping, the training medians used to impute
+missing values and the standardisation means and scales, and applies
+imputation plus scaling in one vectorized float32 pass.
+"""
+import numpy as np
+
+def select_columns(data, feature_columns):
+    """Columns of ``data`` feeding the model
+
+    Uses ``feature_columns`` when all are present, else the first numeric
+    columns; raises ``ValueError`` when there are not enough of them.
+    """
+    if all(col in data.columns for col in feature_columns):
+        return list(feature_columns)
+    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()[:len(feature_columns)]
+    if len(numeric_cols) >= len(feature_columns):
+        return numeric_cols
+    raise ValueError("Uploaded data doesn't have enough numeric columns for prediction.")
+
+class FeaturePreprocessor:
+    """Median imputation and standardisation fitted on the training features"""
+
+    def __init__(self, feature_columns):
+        self.feature_columns = list(feature_columns)
+        self.medians_ = None
+        self.mean_ = None
+        self.scale_ = None
+
+    @classmethod
+    def from_scaler(cls, scaler, feature_columns):
+        """Wrap a fitted ``StandardScaler`` from artifacts saved before this class existed
+
+        Missing values impute to the training mean, i.e. zero after scaling.
+        """
+        preprocessor = cls(feature_columns)
+        preprocessor.mean_ = np.asarray(scaler.mean_, dtype=np.float64)
+        preprocessor.scale_ = np.asarray(scaler.scale_, dtype=np.float64)
+        preprocessor.medians_ = preprocessor.mean_.copy()
+        preprocessor._prepare()
+        return preprocessor
+
+    def fit(self, X):
+        """Learn medians, then the mean and scale of the imputed raw features ``X``"""
+        X = np.asarray(X, dtype=np.float64)
+        self.medians_ = np.nanmedian(X, axis=0)
+        imputed = np.where(np.isnan(X), self.medians_, X)
+        self.mean_ = imputed.mean(axis=0)
+        scale = imputed.std(axis=0)
+        # Constant columns are left unscaled, as StandardScaler does
+        self.scale_ = np.where(scale == 0, 1.0, scale)
+        self._prepare()
+        return self
+
+    def _prepare(self):
+        self._mean32 = self.mean_.astype(np.float32)
+        self._inverse_scale32 = (1 / self.scale_).astype(np.float32)
+        self._fill32 = ((self.medians_ - self.mean_) / self.scale_).astype(np.float32)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._prepare()
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if not key.endswith('32')}
+
+    def select(self, data):
+        """Raw feature matrix of ``data`` following the fitted column mapping"""
+        return data[select_columns(data, self.feature_columns)].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def transform(self, X, out=None):
+        """Impute and standardise raw features into float32
+
+        ``out`` may be a preallocated float32 array of the same shape, including
+        ``X`` itself when it is float32, to avoid allocating the result.
+        """
+        X = np.asarray(X)
+        if out is None:
+            out = np.empty(X.shape, dtype=np.float32)
+        np.subtract(X, self._mean32, out=out, casting='same_kind')
+        np.multiply(out, self._inverse_scale32, out=out)
+        # NaN survives the arithmetic, so the missing cells are still marked
+        missing = np.isnan(out)
+        if missing.any():
+            np.copyto(out, np.broadcast_to(self._fill32, out.shape), where=missing)
+        return out
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
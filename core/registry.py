@@ -0,0 +1,249 @@
+"""Versioned model registry with atomic hot-swap
+
+Artifacts are published under ``<root>/versions/<model_version>/`` and the
+``<root>/LATEST`` pointer file names the version to serve. A registry loads and
+validates new versions in the background, then swaps its ``current`` pointer in
+one step. Callers hold a version for the duration of an analysis through
+``acquire()``; a replaced version is closed once its last holder releases it.
+"""
+import os
+import time
+import shutil
+import logging
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core import pipeline
+
+logger = logging.getLogger(__name__)
+
+LATEST_FILE = "LATEST"
+MIN_VALIDATION_ACCURACY = float(os.environ.get("EXOHUNTER_MIN_VALIDATION_ACCURACY", "0.5"))
+
+def version_dir(root, version):
+    return os.path.join(root, "versions", version)
+
+def publish_artifacts(source_dir, root):
+    """Copy artifacts from ``source_dir`` into the registry root and point LATEST at them"""
+    manifest = pipeline.read_manifest(source_dir)
+    if manifest is None:
+        raise ValueError(f"{source_dir} does not contain saved models")
+    version = manifest['model_version']
+    destination = version_dir(root, version)
+    if not os.path.exists(destination):
+        staging = destination + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(source_dir, staging)
+        os.replace(staging, destination)
+
+    # Readers only ever see the old or the new pointer, never a partial write
+    pointer = os.path.join(root, LATEST_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    logger.info("Published model %s", version)
+    return version
+
+def latest_version_dir(root):
+    """Directory of the version named by ``<root>/LATEST`` or None"""
+    pointer = os.path.join(root, LATEST_FILE)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        version = f.read().strip()
+    directory = version_dir(root, version)
+    return directory if os.path.isdir(directory) else None
+
+def resolve_models_dir(models_dir, root):
+    """``models_dir`` when given, else the version named by ``<root>/LATEST``
+
+    Raises ``FileNotFoundError`` when there are no saved models to load, so
+    headless callers never fall back to training.
+    """
+    if models_dir:
+        if pipeline.read_manifest(models_dir) is None:
+            raise FileNotFoundError(f"No saved models in {models_dir}")
+        return models_dir
+    published = latest_version_dir(root)
+    if published is None:
+        raise FileNotFoundError(
+            f"No published model version under {root}; run 'python -m core.cli train --publish' first"
+        )
+    return published
+
+def validation_probe(rows=64):
+    """Deterministic raw feature rows shaped like the training data"""
+    rng = np.random.RandomState(7)
+    return np.column_stack([
+        10**rng.uniform(np.log10(0.3), np.log10(500), rows),
+        rng.exponential(scale=200, size=rows) / 1e5,
+        np.clip(rng.normal(3, 1, rows), 0.1, 20),
+        np.clip(rng.beta(2, 2, rows), 0, 1),
+        np.clip(rng.normal(2, 1, rows), 0.1, 20),
+    ])
+
+def validate_backend(backend):
+    """Reject versions that score badly or produce malformed output"""
+    scorer = backend.model_data.get('scorer', 'fusion')
+    accuracy = backend.model_data['accuracies'][scorer]
+    if accuracy < MIN_VALIDATION_ACCURACY:
+        raise ValueError(f"{scorer.capitalize()} accuracy {accuracy:.3f} is below {MIN_VALIDATION_ACCURACY:.3f}")
+    probe = validation_probe()
+    scores = backend.predict_fn(probe)
+    probabilities = np.asarray(scores['probabilities'])
+    if probabilities.shape != (len(probe),) or not np.all(np.isfinite(probabilities)):
+        raise ValueError("Model produced malformed probabilities on the validation probe")
+    if probabilities.min() < 0 or probabilities.max() > 1:
+        raise ValueError("Model probabilities fall outside [0, 1]")
+
+class ScoringBackend:
+    """One loaded model version and the callables used to score with it"""
+
+    def __init__(self, model_data, predict_fn, close=None, **extras):
+        self.model_data = model_data
+        self.predict_fn = predict_fn
+        self.version = model_data['model_version']
+        self._close = close
+        for name, value in extras.items():
+            setattr(self, name, value)
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+
+class _Entry:
+    def __init__(self, backend):
+        self.backend = backend
+        self.refs = 0
+        self.retired = False
+
+class ModelRegistry:
+    """Holds loaded model versions and serves the current one
+
+    ``loader(directory)`` returns a ``ScoringBackend``; ``validator(backend)``
+    raises to reject it before it becomes current.
+    """
+
+    def __init__(self, loader, validator=validate_backend):
+        self._loader = loader
+        self._validator = validator
+        self._entries = {}
+        self._current = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="exohunter-model-loader")
+        self._watcher = None
+        self._stop = threading.Event()
+        self.last_error = None
+
+    @property
+    def current_version(self):
+        return self._current
+
+    def publish(self, directory, wait=False):
+        """Load, validate and swap in the version in ``directory``
+
+        Runs on the background loader thread; pass ``wait=True`` to block until
+        the swap (or failure) has happened.
+        """
+        future = self._executor.submit(self._load_and_swap, directory)
+        if wait:
+            future.result()
+        return future
+
+    def _load_and_swap(self, directory):
+        manifest = pipeline.read_manifest(directory)
+        if manifest is not None and manifest['model_version'] in self._entries:
+            self._swap(manifest['model_version'])
+            return
+        started = time.perf_counter()
+        backend = self._loader(directory)
+        try:
+            if self._validator is not None:
+                self._validator(backend)
+        except Exception as e:
+            self.last_error = f"Model {backend.version} failed validation: {e}"
+            logger.error(self.last_error)
+            backend.close()
+            raise
+        with self._lock:
+            self._entries[backend.version] = _Entry(backend)
+        self._swap(backend.version)
+        logger.info("Model %s live after %.2fs", backend.version, time.perf_counter() - started)
+
+    def _swap(self, version):
+        released = []
+        with self._lock:
+            previous = self._current
+            self._current = version
+            self._entries[version].retired = False
+            if previous is not None and previous != version:
+                self._entries[previous].retired = True
+                released = self._collect_released()
+        for backend in released:
+            backend.close()
+
+    def _collect_released(self):
+        """Drop retired versions nobody holds any more; call with the lock held"""
+        released = []
+        for version, entry in list(self._entries.items()):
+            if entry.retired and entry.refs == 0:
+                del self._entries[version]
+                released.append(entry.backend)
+                logger.info("Released model %s", version)
+        return released
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Pin the current version for the duration of the ``with`` block"""
+        with self._lock:
+            if self._current is None:
+                raise RuntimeError("No model version has been published yet")
+            entry = self._entries[self._current]
+            entry.refs += 1
+        try:
+            yield entry.backend
+        finally:
+            with self._lock:
+                entry.refs -= 1
+                released = self._collect_released()
+            for backend in released:
+                backend.close()
+
+    def status(self):
+        """Loaded versions with their reference counts"""
+        with self._lock:
+            return [
+                {'version': version, 'refs': entry.refs, 'current': version == self._current, 'retired': entry.retired}
+                for version, entry in self._entries.items()
+            ]
+
+    def watch(self, root, interval=5.0):
+        """Poll ``<root>/LATEST`` and publish whatever it points to when it changes"""
+        if self._watcher is not None:
+            return
+
+        def poll():
+            rejected = None
+            while not self._stop.wait(interval):
+                directory = latest_version_dir(root)
+                if directory is None or directory == rejected or os.path.basename(directory) == self._current:
+                    continue
+                try:
+                    self.publish(directory, wait=True)
+                except Exception:
+                    # Keep serving the current version until LATEST points somewhere new
+                    logger.exception("Hot-swap to %s failed; keeping %s", directory, self._current)
+                    rejected = directory
+
+        self._watcher = threading.Thread(target=poll, name="exohunter-model-watcher", daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._current = None
+        for entry in entries:
+            entry.backend.close()
@@ -0,0 +1,206 @@
+"""Local HTTP scoring service for the ExoFusion model
+
+Run with ``python -m core.service --port 8600`` (needs uvicorn) or mount
+``create_app()`` in any ASGI server. Endpoints:
+
+- ``GET  /healthz``      model version and readiness
+- ``GET  /metrics``      latency percentiles and batch-size statistics
+- ``POST /score``        JSON ``{"rows": [{feature: value, ...}, ...]}``
+- ``POST /score/batch``  Arrow IPC stream or Parquet body, answered in the same format
+
+Concurrent requests are coalesced by ``AsyncMicroBatcher`` into single
+vectorised predict calls. The service serves ``--models-dir`` or the latest
+version published under ``--artifacts-root`` and refuses to start without one.
+"""
+import io
+import os
+import json
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from core import pipeline
+from core.batching import AsyncMicroBatcher
+from core.registry import resolve_models_dir
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ScoringService:
+    """ASGI application wrapping trained artifacts and a micro-batcher"""
+
+    def __init__(self, model_data=None, models_dir=None, max_batch_rows=8192, max_latency_ms=5.0, artifacts_root="artifacts"):
+        self.model_data = model_data
+        self.models_dir = models_dir
+        self.artifacts_root = artifacts_root
+        self.batcher = AsyncMicroBatcher(self._predict, max_batch_rows, max_latency_ms)
+
+    def _predict(self, X):
+        scores = pipeline.score_features(self.model_data, X)
+        return {
+            'prediction': np.asarray(scores['predictions'], dtype=np.int8),
+            'probability': np.asarray(scores['probabilities'], dtype=np.float32)
+        }
+
+    def _load_models(self):
+        if self.model_data is not None:
+            return
+        self.model_data = pipeline.load_models(resolve_models_dir(self.models_dir, self.artifacts_root))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self._load_models()
+                    await self.batcher.start()
+                except Exception as e:
+                    logger.exception("Scoring service failed to start")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.batcher.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        method, path = scope['method'], scope['path']
+        headers = {key.decode('latin-1'): value.decode('latin-1') for key, value in scope['headers']}
+        try:
+            if method == 'GET' and path == '/healthz':
+                status, content_type, body = 200, 'application/json', self._json({
+                    'status': 'ok',
+                    'model_version': self.model_data['model_version']
+                })
+            elif method == 'GET' and path == '/metrics':
+                status, content_type, body = 200, 'application/json', self._json(self.batcher.stats.snapshot())
+            elif method == 'POST' and path == '/score':
+                status, content_type, body = 200, 'application/json', await self._score_json(await self._read_body(receive))
+            elif method == 'POST' and path == '/score/batch':
+                content_type = headers.get('content-type', ARROW_STREAM).split(';')[0].strip()
+                status, body = 200, await self._score_table(await self._read_body(receive), content_type)
+            else:
+                raise HTTPError(404, f"No route for {method} {path}")
+        except HTTPError as e:
+            status, content_type, body = e.status, 'application/json', self._json({'error': str(e)})
+        except Exception as e:
+            logger.exception("Scoring request failed")
+            status, content_type, body = 500, 'application/json', self._json({'error': str(e)})
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    @staticmethod
+    def _json(payload):
+        return json.dumps(payload).encode()
+
+    @staticmethod
+    def _features(data):
+        try:
+            return pipeline.select_features(data)
+        except ValueError as e:
+            raise HTTPError(422, str(e))
+
+    async def _score_json(self, body):
+        try:
+            data = pd.DataFrame(json.loads(body)['rows'])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Expected a JSON body of the form {"rows": [{...}, ...]}')
+        scores = await self.batcher.submit(self._features(data))
+        return self._json({
+            'model_version': self.model_data['model_version'],
+            'predictions': scores['prediction'].tolist(),
+            'probabilities': scores['probability'].tolist()
+        })
+
+    async def _score_table(self, body, content_type):
+        if not ARROW_AVAILABLE:
+            raise HTTPError(415, "pyarrow is required for Arrow/Parquet scoring")
+        try:
+            if content_type == ARROW_STREAM:
+                table = pa.ipc.open_stream(body).read_all()
+            elif content_type in (PARQUET, 'application/x-parquet'):
+                table = pq.read_table(io.BytesIO(body))
+            else:
+                raise HTTPError(415, f"Unsupported content type {content_type}")
+        except (pa.ArrowException, ValueError) as e:
+            raise HTTPError(400, f"Could not read the request body as {content_type}: {e}")
+
+        scores = await self.batcher.submit(self._features(table.to_pandas()))
+        output = pa.table({name: pa.array(values) for name, values in scores.items()})
+        sink = io.BytesIO()
+        if content_type == ARROW_STREAM:
+            with pa.ipc.new_stream(sink, output.schema) as writer:
+                writer.write_table(output)
+        else:
+            pq.write_table(output, sink)
+        return sink.getvalue()
+
+def create_app(model_data=None, models_dir=None, max_batch_rows=8192, max_latency_ms=5.0, artifacts_root="artifacts"):
+    """Build the scoring ASGI app
+
+    Unless ``model_data`` is given, startup loads ``models_dir`` or else the
+    latest version published under ``artifacts_root``, and fails if neither exists.
+    """
+    return ScoringService(model_data, models_dir, max_batch_rows, max_latency_ms, artifacts_root)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m core.service", description="ExoHunter scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--models-dir", default=os.environ.get("EXOHUNTER_MODELS_DIR"), help="saved artifacts to serve (default: latest published version)")
+    parser.add_argument("--artifacts-root", default=os.environ.get("EXOHUNTER_ARTIFACTS_ROOT", "artifacts"), help="registry root holding published model versions")
+    parser.add_argument("--max-batch-rows", type=int, default=8192)
+    parser.add_argument("--max-latency-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error("uvicorn is required to run the scoring service")
+
+    try:
+        models_dir = resolve_models_dir(args.models_dir, args.artifacts_root)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    app = create_app(models_dir=models_dir, max_batch_rows=args.max_batch_rows, max_latency_ms=args.max_latency_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""Model worker processes fed through shared memory
+
+The web process writes each feature matrix once into a
+``multiprocessing.shared_memory`` block; a worker maps the same block, scores
+it in place and writes its outputs next to the input. Only tiny control tuples
+(request id, block name, shape) cross the process boundary, so nothing is
+pickled and the web process never loads TensorFlow or XGBoost models.
+"""
+import os
+import time
+import queue
+import itertools
+import logging
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How often the result collector checks for workers that died holding a request
+WORKER_POLL_INTERVAL = float(os.environ.get("EXOHUNTER_WORKER_POLL_INTERVAL", "1"))
+
+# Per-operation outputs written by the worker after the float64 input block
+OUTPUT_LAYOUT = {
+    'score': [
+        ('probabilities', np.float32, 1),
+        ('predictions', np.int8, 1),
+        ('xgb', np.int8, 1),
+        ('cnn', np.int8, 1),
+    ],
+    'shap': [
+        ('values', np.float32, None),
+        ('base_values', np.float32, 1),
+        ('data', np.float32, None),
+    ],
+}
+
+def _layout(op, n_rows, n_features):
+    """Byte offsets of the input and output arrays inside one shared block"""
+    fields = [('input', np.float64, n_features)] + OUTPUT_LAYOUT[op]
+    layout = []
+    offset = 0
+    for name, dtype, width in fields:
+        width = n_features if width is None else width
+        shape = (n_rows, width) if width > 1 or name == 'input' else (n_rows,)
+        layout.append((name, np.dtype(dtype), shape, offset))
+        nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += (nbytes + 7) // 8 * 8
+    return layout, max(offset, 8)
+
+def _views(buffer, layout):
+    return {
+        name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        for name, dtype, shape, offset in layout
+    }
+
+def _run_op(model_data, op, views):
+    from core import pipeline
+
+    X = views['input']
+    if op == 'score':
+        scores = pipeline.score_features(model_data, X)
+        views['probabilities'][:] = scores['probabilities']
+        views['predictions'][:] = scores['predictions']
+        views['xgb'][:] = scores['xgb']
+        views['cnn'][:] = scores['cnn']
+    elif op == 'shap':
+        explanation = pipeline.explain_features(model_data, X)
+        views['values'][:] = explanation.values
+        views['base_values'][:] = explanation.base_values
+        views['data'][:] = explanation.data
+    else:
+        raise ValueError(f"Unknown worker operation {op!r}")
+
+def _worker_main(models_dir, tasks, results):
+    """Entry point of one model worker process"""
+    from core import pipeline
+
+    model_data = pipeline.load_models(models_dir)
+    results.put(('ready', os.getpid(), model_data['model_version']))
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        request_id, op, block_name, n_rows, n_features = task
+        # Lets the pool fail this request if the process dies before answering
+        results.put(('start', os.getpid(), request_id))
+        block = None
+        views = None
+        try:
+            # Spawned workers share the parent's resource tracker, so attaching here
+            # does not register a second owner; the submitting process unlinks the block
+            block = shared_memory.SharedMemory(name=block_name)
+            views = _views(block.buf, _layout(op, n_rows, n_features)[0])
+            _run_op(model_data, op, views)
+            results.put((request_id, None))
+        except Exception as e:
+            results.put((request_id, f"{type(e).__name__}: {e}"))
+        finally:
+            del views
+            if block is not None:
+                block.close()
+
+def _train_and_save(models_dir):
+    from core import pipeline
+
+    logging.basicConfig(level=logging.INFO)
+    pipeline.save_models(pipeline.train_models(), models_dir)
+
+def train_in_subprocess(models_dir):
+    """Train and save the models in a spawned child, keeping this process lean"""
+    trainer = mp.get_context('spawn').Process(target=_train_and_save, args=(models_dir,), name="exohunter-trainer")
+    trainer.start()
+    trainer.join()
+    if trainer.exitcode != 0:
+        raise RuntimeError(f"Model training process exited with code {trainer.exitcode}")
+
+class ModelWorkerPool:
+    """Pool of model processes scoring shared-memory feature matrices
+
+    ``submit`` blocks the calling thread only; each call is served by whichever
+    worker is free. ``resize`` adds or retires workers without a restart. If a
+    worker dies mid-request, that request fails within ``WORKER_POLL_INTERVAL``
+    instead of waiting out its timeout.
+    """
+
+    def __init__(self, models_dir, workers=2, start_timeout=600):
+        self.models_dir = models_dir
+        self.start_timeout = start_timeout
+        self.manifest = None
+        self._target_workers = workers
+        self._ctx = mp.get_context('spawn')
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._processes = []
+        self._pending = {}
+        self._orphans = {}
+        self._running = {}
+        self._ready = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+
+    def start(self):
+        """Make sure artifacts exist, spawn the workers and wait until they are loaded"""
+        from core import pipeline
+
+        if pipeline.read_manifest(self.models_dir) is None:
+            logger.info("No artifacts in %s; training them in a child process", self.models_dir)
+            train_in_subprocess(self.models_dir)
+        self.manifest = pipeline.read_manifest(self.models_dir)
+
+        self._collector = threading.Thread(target=self._collect, name="exohunter-worker-results", daemon=True)
+        self._collector.start()
+        self.resize(self._target_workers)
+        return self
+
+    def resize(self, workers):
+        """Grow or shrink the pool to ``workers`` processes"""
+        with self._lock:
+            self._processes = [p for p in self._processes if p.is_alive()]
+            current = len(self._processes)
+            new = []
+            for _ in range(workers - current):
+                process = self._ctx.Process(
+                    target=_worker_main,
+                    args=(self.models_dir, self._tasks, self._results),
+                    name="exohunter-model-worker",
+                    daemon=True
+                )
+                process.start()
+                new.append(process)
+            self._processes.extend(new)
+            for _ in range(current - workers):
+                self._tasks.put(None)
+            self._target_workers = workers
+
+        deadline = time.monotonic() + self.start_timeout
+        for process in new:
+            while process.pid not in self._ready:
+                if not process.is_alive():
+                    raise RuntimeError(f"Model worker {process.pid} exited during startup")
+                if time.monotonic() > deadline:
+                    raise TimeoutError("Model workers did not finish loading in time")
+                time.sleep(0.05)
+
+    @property
+    def workers(self):
+        return sum(p.is_alive() for p in self._processes)
+
+    def stop(self):
+        processes = list(self._processes)
+        self.resize(0)
+        for process in processes:
+            process.join(timeout=5)
+        self._results.put(('stop', None, None))
+        self._collector.join(timeout=5)
+        with self._lock:
+            orphans, self._orphans = list(self._orphans.values()), {}
+        for block_name in orphans:
+            _unlink_block(block_name)
+
+    def _replace_dead_workers(self):
+        """Respawn workers that died, so requests are never queued to an empty pool"""
+        with self._lock:
+            dead = sum(not p.is_alive() for p in self._processes)
+        if dead:
+            logger.warning("%d model worker(s) died; starting replacements", dead)
+            self.resize(self._target_workers)
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while True:
+            if time.monotonic() - last_check >= WORKER_POLL_INTERVAL:
+                self._fail_lost_requests()
+                last_check = time.monotonic()
+            try:
+                message = self._results.get(timeout=WORKER_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            if message[0] == 'stop':
+                return
+            if message[0] == 'ready':
+                self._ready[message[1]] = message[2]
+                continue
+            if message[0] == 'start':
+                _, pid, request_id = message
+                with self._lock:
+                    process = next((p for p in self._processes if p.pid == pid), None)
+                    if process is not None:
+                        self._running[request_id] = process
+                continue
+            request_id, error = message
+            self._finish(request_id, error)
+
+    def _finish(self, request_id, error):
+        """Hand ``error`` (None on success) to the submitter, or free an abandoned block"""
+        with self._lock:
+            self._running.pop(request_id, None)
+            future = self._pending.pop(request_id, None)
+            orphan = self._orphans.pop(request_id, None)
+        if future is not None:
+            future.set_result(error)
+        if orphan is not None:
+            # The submitter gave up on this request; the worker is done with its block now
+            _unlink_block(orphan)
+
+    def _fail_lost_requests(self):
+        """Fail the requests held by workers that have died instead of waiting for a timeout"""
+        with self._lock:
+            lost = [(request_id, process) for request_id, process in self._running.items() if not process.is_alive()]
+        for request_id, process in lost:
+            logger.warning("Model worker %s died while running request %s", process.pid, request_id)
+            self._finish(request_id, f"worker process {process.pid} exited with code {process.exitcode}")
+
+    def submit(self, X, op='score', timeout=None):
+        """Run ``op`` on a worker for feature matrix ``X`` and return its output arrays"""
+        X = np.asarray(X, dtype=np.float64)
+        n_rows, n_features = X.shape
+        layout, size = _layout(op, n_rows, n_features)
+        self._replace_dead_workers()
+        block = shared_memory.SharedMemory(create=True, size=size)
+        views = None
+        owned = True
+        try:
+            views = _views(block.buf, layout)
+            views['input'][:] = X
+
+            request_id = next(self._ids)
+            future = Future()
+            with self._lock:
+                self._pending[request_id] = future
+            self._tasks.put((request_id, op, block.name, n_rows, n_features))
+
+            try:
+                error = future.result(timeout)
+            except FutureTimeout:
+                with self._lock:
+                    if self._pending.pop(request_id, None) is not None:
+                        # Still queued or running: a worker may yet open the block, so the
+                        # collector unlinks it once that worker reports back
+                        self._orphans[request_id] = block.name
+                        owned = False
+                if owned:
+                    error = future.result()
+                else:
+                    raise TimeoutError(f"Model worker did not finish {op} within {timeout:g} s")
+            if error is not None:
+                raise RuntimeError(f"Model worker failed: {error}")
+            return {name: np.array(views[name]) for name, _, _ in OUTPUT_LAYOUT[op]}
+        finally:
+            del views
+            block.close()
+            if owned:
+                block.unlink()
+
+def _unlink_block(block_name):
+    try:
+        block = shared_memory.SharedMemory(name=block_name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
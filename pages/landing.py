@@ -1,4 +1,6 @@
 import streamlit as st
+from components.auth import start_session, DEMO_USERS
+from components.dashboard import open_demo_analysis
 
 def show_landing_page():
     """Display the landing/welcome page"""
@@ -82,11 +84,10 @@ def show_landing_page():
         
         with button_col3:
             if st.button("🌟 Demo Mode", use_container_width=True):
-                # Set demo credentials
-                st.session_state.authenticated = True
+                # Sign in as the demo account and open the precomputed demo analysis
+                start_session(next(iter(DEMO_USERS)))
                 st.session_state.username = "Demo Explorer"
-                st.session_state.page = "dashboard"
-                st.rerun()
+                open_demo_analysis()
         
         st.markdown("</div>", unsafe_allow_html=True)
     
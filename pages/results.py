@@ -1,11 +1,29 @@
+import os
+import tempfile
+import functools
 import streamlit as st
-import time
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
+import pandas as pd
 from components.ai_model import run_ai_detection
-from components.data_processing import process_uploaded_csv_for_detection
-from utils.pdf_generator import generate_detection_report
+from core.pipeline import PIPELINE_STAGES
+from core import export
+from core.admission import get_admission_controller
+from components.data_processing import process_uploaded_csv_for_detection, current_feature_store
+from components.history import record_analysis
+from utils.pdf_generator import get_report_service, report_cache_key
+from utils.instrumentation import span
+from utils.figure_cache import cached_figure, dataset_key
+from utils.ranking import CandidateIndex
+
+# Candidate explorer page sizes, and how many results keep a ranked index cached
+CANDIDATE_PAGE_SIZES = (25, 50, 100)
+CANDIDATE_INDEX_ENTRIES = 8
+
+# Streamlit holds a download's bytes in memory, so in-app exports are capped;
+# larger tables are exported with `python -m core.cli score`
+EXPORT_MAX_ROWS = int(os.environ.get("EXOHUNTER_EXPORT_MAX_ROWS", "1000000"))
 
 def show_results_page():
     """Display AI detection results with animations"""
@@ -41,34 +59,37 @@ def show_analysis_loader():
     </div>
     """, unsafe_allow_html=True)
     
-    # Progress bar animation
+    # Live progress driven by the detection pipeline's stage events
     progress_bar = st.progress(0)
     status_text = st.empty()
+    stage_log = st.empty()
     
-    steps = [
-        "🔍 Loading dataset...",
-        "🧠 Initializing AI models...",
-        "⚙️ Training XGBoost classifier...",
-        "🤖 Training CNN model...",
-        "🔗 Fusing model predictions...",
-        "📊 Generating SHAP explanations...",
-        "✨ Finalizing analysis..."
-    ]
-    
-    for i, step in enumerate(steps):
-        status_text.text(step)
-        progress_bar.progress((i + 1) / len(steps))
-        time.sleep(0.5)  # Simulate processing time
+    stage_labels = dict(PIPELINE_STAGES)
+    stage_order = [stage for stage, _ in PIPELINE_STAGES if stage != 'shap']
+    completed_steps = []
+    
+    def on_progress(stage, rows):
+        label = stage_labels.get(stage, stage)
+        if stage in stage_order:
+            progress_bar.progress(stage_order.index(stage) / len(stage_order))
+        status_text.text(f"{label}... ({rows:,} rows)" if rows else f"{label}...")
+        completed_steps.append(f"- {label} — {rows:,} rows" if rows else f"- {label}")
+        stage_log.markdown("\n".join(completed_steps))
     
     # Run actual AI detection
     try:
-        with st.spinner("Running final analysis..."):
-            results = run_ai_detection(st.session_state.original_data)
-            st.session_state.detection_results = results
-            st.session_state.analysis_complete = True
+        results = run_ai_detection(
+            st.session_state.original_data, progress_callback=on_progress, store=current_feature_store()
+        )
+        if results is None:
+            raise ValueError("Uploaded data could not be scored.")
+        st.session_state.detection_results = results
+        st.session_state.results_data_key = dataset_key(st.session_state.original_data)
+        st.session_state.analysis_complete = True
+        record_analysis(results, st.session_state.original_data)
         
+        progress_bar.progress(1.0)
         status_text.success("✅ Analysis complete!")
-        time.sleep(1)
         st.rerun()
         
     except Exception as e:
@@ -130,6 +151,17 @@ def display_detection_results():
     with col4:
         st.metric("Total Predictions", len(results['predictions']))
     
+    # Served by the distilled student: show how closely it tracks the fusion
+    if results.get('scorer') == 'student':
+        distillation = results['distillation']
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Student Accuracy", f"{accuracies['student']:.1%}")
+        with col2:
+            st.metric("Fidelity to Fusion", f"{distillation['fidelity']:.1%}")
+        with col3:
+            st.metric("Probability MAE", f"{distillation['probability_mae']:.4f}")
+    
     # Visualizations
     show_results_visualizations(results)
     
@@ -144,23 +176,35 @@ def display_detection_results():
                 del st.session_state.analysis_complete
             if 'detection_results' in st.session_state:
                 del st.session_state.detection_results
+            if 'report_key' in st.session_state:
+                del st.session_state.report_key
             st.rerun()
     
     with col2:
         if st.button("📄 Download Report (PDF)", use_container_width=True, type="primary"):
-            generate_and_download_report()
+            request_report()
+        if 'report_key' in st.session_state:
+            # Poll only while the background render is still running
+            report_state, _ = get_report_service().status(st.session_state.report_key)
+            polling = report_state == 'pending'
+            st.fragment(show_report_download, run_every=1.0 if polling else None)(polling)
     
     with col3:
         if st.button("← Back to Dashboard", use_container_width=True):
             st.session_state.page = "dashboard"
             st.rerun()
+    
+    show_prediction_export(results)
 
+@span('figures.results')
 def show_results_visualizations(results):
     """Display result visualizations"""
     st.markdown("### 📊 Analysis Visualizations")
     
     # Create tabs for different visualizations
-    tab1, tab2, tab3 = st.tabs(["🌟 Light Curves", "📈 Feature Importance", "🎯 Prediction Distribution"])
+    tab1, tab2, tab3, tab4 = st.tabs([
+        "🌟 Light Curves", "📈 Feature Importance", "🎯 Prediction Distribution", "🔎 Candidate Explorer"
+    ])
     
     with tab1:
         show_simulated_light_curves(results)
@@ -170,6 +214,63 @@ def show_results_visualizations(results):
     
     with tab3:
         show_prediction_distribution(results)
+    
+    with tab4:
+        show_candidate_explorer(results)
+
+@st.cache_resource(show_spinner=False, max_entries=CANDIDATE_INDEX_ENTRIES)
+@span('candidates.index')
+def build_candidate_index(data_hash, model_version, _probabilities, _predictions):
+    """``CandidateIndex`` of one result; the arrays are identified by the hash and model version"""
+    return CandidateIndex(_probabilities, _predictions)
+
+def candidate_index(results):
+    return build_candidate_index(
+        results['data_hash'], results['model_version'], results['probabilities'], results['predictions']
+    )
+
+@st.fragment
+@span('candidates.page')
+def show_candidate_explorer(results):
+    """Browse every candidate by rank; paging and filtering rerun only this section"""
+    st.markdown("#### Ranked Candidates")
+    
+    index = candidate_index(results)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        min_confidence = st.slider("Minimum confidence", 0.0, 1.0, 0.0, 0.05, key="candidates_min_confidence")
+    with col2:
+        page_size = st.selectbox("Rows per page", CANDIDATE_PAGE_SIZES, key="candidates_page_size")
+    with col3:
+        exoplanets_only = st.checkbox("Exoplanets only", key="candidates_exoplanets_only")
+    
+    label = 1 if exoplanets_only else None
+    total = index.count(min_confidence, label)
+    if total == 0:
+        st.info("No candidates match these filters.")
+        return
+    
+    pages = (total - 1) // page_size + 1
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    positions, total = index.page(page, page_size, min_confidence, label)
+    
+    # Only this page's rows are gathered and sent to the browser
+    start = (page - 1) * page_size
+    table = pd.DataFrame({
+        'Rank': np.arange(start + 1, start + len(positions) + 1),
+        'Sample': positions + 1,
+        'Confidence (%)': np.round(np.asarray(results['probabilities'])[positions] * 100, 1),
+        'Prediction': np.where(np.asarray(results['predictions'])[positions] == 1, "🟢 Exoplanet", "🔴 No Detection"),
+        'XGBoost': np.asarray(results['individual_preds']['xgb'])[positions],
+        'CNN': np.asarray(results['individual_preds']['cnn'])[positions]
+    })
+    data = st.session_state.get('original_data')
+    if data is not None and len(data) == len(index):
+        features = data.iloc[positions].reset_index(drop=True)
+        table = pd.concat([table, features.drop(columns=table.columns.intersection(features.columns))], axis=1)
+    
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    st.caption(f"Showing ranks {start + 1:,}–{start + len(positions):,} of {total:,} matching candidates.")
 
 def show_simulated_light_curves(results):
     """Show simulated light curves for detected candidates"""
@@ -179,7 +280,7 @@ def show_simulated_light_curves(results):
     probabilities = results['probabilities']
     
     # Get top candidates (highest probabilities)
-    top_indices = np.argsort(probabilities)[-6:][::-1]  # Top 6
+    top_indices = candidate_index(results).top(6)
     
     cols = st.columns(2)
     
@@ -268,59 +369,122 @@ def show_prediction_distribution(results):
     
     predictions = results['predictions']
     probabilities = results['probabilities']
+    # Predictions are fully determined by the scored features and the model version
+    results_key = (results['data_hash'], results['model_version'])
     
     col1, col2 = st.columns(2)
     
     with col1:
-        # Confidence histogram
-        fig_hist = px.histogram(
-            x=probabilities,
-            title="Confidence Score Distribution",
-            nbins=20,
-            labels={'x': 'Confidence Score', 'y': 'Count'}
-        )
-        fig_hist.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white'
-        )
-        st.plotly_chart(fig_hist, use_container_width=True)
+        def build_hist():
+            # Confidence histogram
+            fig_hist = px.histogram(
+                x=probabilities,
+                title="Confidence Score Distribution",
+                nbins=20,
+                labels={'x': 'Confidence Score', 'y': 'Count'}
+            )
+            fig_hist.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white'
+            )
+            return fig_hist
+        
+        st.plotly_chart(cached_figure('confidence_histogram', results_key, (), build_hist), use_container_width=True)
     
     with col2:
-        # Prediction pie chart
-        pred_counts = np.bincount(predictions)
-        labels = ['No Exoplanet', 'Exoplanet Detected']
+        def build_pie():
+            # Prediction pie chart
+            pred_counts = np.bincount(predictions)
+            labels = ['No Exoplanet', 'Exoplanet Detected']
+            
+            fig_pie = px.pie(
+                values=pred_counts,
+                names=labels[:len(pred_counts)],
+                title="Prediction Results Summary",
+                color_discrete_sequence=['#ff6b6b', '#00ff00']
+            )
+            fig_pie.update_layout(
+                plot_bgcolor='rgba(0,0,0,0)',
+                paper_bgcolor='rgba(0,0,0,0)',
+                font_color='white'
+            )
+            return fig_pie
         
-        fig_pie = px.pie(
-            values=pred_counts,
-            names=labels[:len(pred_counts)],
-            title="Prediction Results Summary",
-            color_discrete_sequence=['#ff6b6b', '#00ff00']
-        )
-        fig_pie.update_layout(
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font_color='white'
+        st.plotly_chart(cached_figure('prediction_pie', results_key, (), build_pie), use_container_width=True)
+
+def show_prediction_export(results):
+    """Download per-row predictions joined with the input's identifiers and features"""
+    st.markdown("### 💾 Export Predictions")
+    
+    data = st.session_state.original_data
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = st.selectbox("Format", export.available_formats(), key="export_format")
+    extension, mimetype = export.FORMATS[fmt]
+    with col2:
+        if len(data) > EXPORT_MAX_ROWS:
+            st.info(
+                f"Exports over {EXPORT_MAX_ROWS:,} rows are too large to download in the browser; "
+                f"use `python -m core.cli score <file> --format {fmt}` instead."
+            )
+            return
+        # The file is only written when the button is clicked
+        st.download_button(
+            label=f"⬇️ Download {len(data):,} rows ({fmt})",
+            data=functools.partial(prediction_export, results, data, fmt),
+            file_name=f"exohunter_predictions_{results['model_version']}.{extension}",
+            mime=mimetype,
+            use_container_width=True
         )
-        st.plotly_chart(fig_pie, use_container_width=True)
 
-def generate_and_download_report():
-    """Generate and offer PDF report download"""
+def prediction_export(results, data, fmt):
+    """Write the export to a temporary file in chunks and return its bytes
+
+    Streamlit keeps the returned bytes in memory while serving the download,
+    which ``EXPORT_MAX_ROWS`` bounds; the chunked writer keeps the conversion
+    itself from holding a second full-size copy.
+    """
+    with tempfile.TemporaryFile() as handle:
+        with get_admission_controller().admit('export', export.EXPORT_CHUNK_ROWS * data.shape[1] * 8):
+            export.write_predictions(data, results, handle, fmt)
+        handle.seek(0)
+        return handle.read()
+
+def request_report():
+    """Queue PDF rendering on the background report worker"""
     try:
-        with st.spinner("Generating PDF report..."):
-            pdf_buffer = generate_detection_report(
-                st.session_state.detection_results,
-                st.session_state.original_data
-            )
-            
-            st.download_button(
-                label="📄 Download Analysis Report",
-                data=pdf_buffer.getvalue(),
-                file_name="exohunter_analysis_report.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-            st.success("✅ Report generated successfully!")
-            
+        results = st.session_state.detection_results
+        original_data = st.session_state.original_data
+        report_key = report_cache_key(results, original_data)
+        get_report_service().request(report_key, results, original_data)
+        st.session_state.report_key = report_key
     except Exception as e:
         st.error(f"Failed to generate report: {str(e)}")
+
+def show_report_download(polling=False):
+    """Poll the report worker and offer the cached PDF once it is ready
+
+    When a polling fragment sees the render finish, it reruns the page so the
+    fragment is registered again without ``run_every``.
+    """
+    state, payload = get_report_service().status(st.session_state.report_key)
+    
+    if polling and state != 'pending':
+        st.rerun()
+    elif state == 'ready':
+        st.download_button(
+            label="📄 Download Analysis Report",
+            data=payload,
+            file_name="exohunter_analysis_report.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+    elif state == 'pending' and payload:
+        st.info(f"⏳ Server busy — your report is #{payload} in the queue...")
+    elif state == 'pending':
+        st.info("⏳ Generating PDF report...")
+    elif state == 'failed':
+        st.error(f"Failed to generate report: {payload}")
+    else:
+        del st.session_state.report_key
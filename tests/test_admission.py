@@ -0,0 +1,68 @@
+import threading
+import pytest
+from core.admission import AdmissionController, AdmissionTimeout, OperationClass
+
+CLASSES = (OperationClass('report', priority=0, slots=1),)
+
+class Rerun(BaseException):
+    """Stands in for Streamlit's RerunException, which is not an Exception"""
+
+def test_on_wait_raising_releases_the_queued_ticket():
+    controller = AdmissionController(CLASSES, memory_budget=0)
+    holder = controller.submit('report')
+    assert holder.admitted
+
+    def on_wait(position):
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        with controller.admit('report', on_wait=on_wait, timeout=5):
+            pass
+    assert controller.stats()['classes']['report']['queued'] == 0
+
+    controller.release(holder)
+    assert controller.stats()['classes']['report']['running'] == 0
+    with controller.admit('report', timeout=1):
+        assert controller.stats()['classes']['report']['running'] == 1
+    assert controller.stats()['classes']['report']['running'] == 0
+
+def test_ticket_admitted_while_on_wait_raises_is_released():
+    controller = AdmissionController(CLASSES, memory_budget=0)
+    holder = controller.submit('report')
+
+    def on_wait(position):
+        # The slot frees up just before the caller is interrupted
+        controller.release(holder)
+        raise Rerun()
+
+    with pytest.raises(Rerun):
+        with controller.admit('report', on_wait=on_wait, timeout=5):
+            pass
+    stats = controller.stats()['classes']['report']
+    assert stats['running'] == 0 and stats['queued'] == 0
+
+def test_timeout_leaves_no_ticket_behind():
+    controller = AdmissionController(CLASSES, memory_budget=0)
+    holder = controller.submit('report')
+    with pytest.raises(AdmissionTimeout):
+        with controller.admit('report', timeout=0.05):
+            pass
+    controller.release(holder)
+    stats = controller.stats()['classes']['report']
+    assert stats['running'] == 0 and stats['queued'] == 0
+
+def test_waiting_request_is_admitted_after_release():
+    controller = AdmissionController(CLASSES, memory_budget=0)
+    holder = controller.submit('report')
+    admitted = threading.Event()
+
+    def worker():
+        with controller.admit('report', timeout=5):
+            admitted.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not admitted.wait(0.2)
+    controller.release(holder)
+    thread.join(5)
+    assert admitted.is_set()
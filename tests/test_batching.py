@@ -0,0 +1,51 @@
+import threading
+import numpy as np
+from core.batching import BatchDispatcher
+
+def test_dispatcher_keeps_concurrency_batches_in_flight():
+    entered = threading.Semaphore(0)
+    release = threading.Event()
+
+    def predict_fn(X):
+        entered.release()
+        release.wait(5)
+        return {'probabilities': X[:, 0]}
+
+    dispatcher = BatchDispatcher(predict_fn, max_batch_rows=1, max_latency_ms=1, concurrency=2)
+    dispatcher.start()
+    results = {}
+    threads = [
+        threading.Thread(target=lambda i=i: results.update({i: dispatcher.submit(np.full((1, 3), i), timeout=5)}))
+        for i in range(3)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        # Two batches reach predict_fn while the first is still blocked; the third waits for a slot
+        assert entered.acquire(timeout=5)
+        assert entered.acquire(timeout=5)
+        assert not entered.acquire(timeout=0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        release.set()
+        dispatcher.stop()
+    assert {i: float(part['probabilities'][0]) for i, part in results.items()} == {0: 0.0, 1: 1.0, 2: 2.0}
+
+def test_dispatcher_slices_a_merged_batch_per_request():
+    dispatcher = BatchDispatcher(lambda X: {'probabilities': X.sum(axis=1)}, max_latency_ms=50)
+    dispatcher.start()
+    results = {}
+    threads = [
+        threading.Thread(target=lambda n=n: results.update({n: dispatcher.submit(np.ones((n, 2)), timeout=5)}))
+        for n in (1, 2, 3)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+    finally:
+        dispatcher.stop()
+    assert {n: part['probabilities'].tolist() for n, part in results.items()} == {n: [2.0] * n for n in (1, 2, 3)}
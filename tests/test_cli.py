@@ -0,0 +1,28 @@
+import os
+import pytest
+from core import cli, pipeline
+
+def test_output_paths_mirror_input_directories(tmp_path):
+    inputs = [str(tmp_path / 'a' / 'koi.csv'), str(tmp_path / 'b' / 'koi.csv'), str(tmp_path / 'b' / 'tess.parquet')]
+    out = str(tmp_path / 'out')
+    assert cli.output_paths(inputs, out, 'csv') == [
+        os.path.join(out, 'a', 'koi_predictions.csv'),
+        os.path.join(out, 'b', 'koi_predictions.csv'),
+        os.path.join(out, 'b', 'tess_predictions.csv'),
+    ]
+
+def test_output_paths_keep_extensions_of_shared_stems(tmp_path):
+    inputs = [str(tmp_path / 'koi.csv'), str(tmp_path / 'koi.parquet')]
+    paths = cli.output_paths(inputs, 'out', 'csv')
+    assert paths == [os.path.join('out', 'koi_csv_predictions.csv'), os.path.join('out', 'koi_parquet_predictions.csv')]
+
+def test_single_input_writes_to_the_output_dir(tmp_path):
+    assert cli.output_paths([str(tmp_path / 'koi.csv')], 'out', 'csv.gz') == [os.path.join('out', 'koi_predictions.csv.gz')]
+
+def test_score_without_models_exits_instead_of_training(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'train_models', lambda *args, **kwargs: pytest.fail("the CLI must not train"))
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['--artifacts-root', str(tmp_path), 'score', str(tmp_path / 'koi.csv')])
+    assert str(tmp_path) in str(exit_info.value.code)
+    with pytest.raises(SystemExit):
+        cli.main(['score', str(tmp_path / 'koi.csv'), '--models-dir', str(tmp_path / 'missing')])
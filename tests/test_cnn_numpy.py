@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from core.cnn_numpy import NumpyConv1DNet, WEIGHT_NAMES, parity_error
+
+def _random_weights(rng, features=5, filters=32, kernel_size=2, hidden=32):
+    pooled = (features - kernel_size + 1) // 2
+    shapes = [(kernel_size, 1, filters), (filters,), (pooled * filters, hidden), (hidden,), (hidden, 1), (1,)]
+    return [rng.normal(scale=0.5, size=shape).astype(np.float32) for shape in shapes]
+
+def _reference_proba(weights, x, pool_size=2):
+    """One row through Conv1D -> MaxPooling1D -> Flatten -> Dense -> Dense, written out as loops"""
+    conv_kernel, conv_bias, hidden_kernel, hidden_bias, output_kernel, output_bias = [w.astype(np.float64) for w in weights]
+    kernel_size, _, filters = conv_kernel.shape
+    steps = len(x) - kernel_size + 1
+    conv = [[max(0.0, conv_bias[f] + sum(x[t + k] * conv_kernel[k, 0, f] for k in range(kernel_size))) for f in range(filters)] for t in range(steps)]
+    pooled = [[max(conv[t * pool_size + p][f] for p in range(pool_size)) for f in range(filters)] for t in range(steps // pool_size)]
+    # Flatten is step-major: (step 0, filter 0..F-1), (step 1, ...)
+    flat = [value for step in pooled for value in step]
+    hidden = [max(0.0, hidden_bias[j] + sum(flat[i] * hidden_kernel[i, j] for i in range(len(flat)))) for j in range(hidden_kernel.shape[1])]
+    logit = output_bias[0] + sum(hidden[j] * output_kernel[j, 0] for j in range(len(hidden)))
+    return 1 / (1 + np.exp(-logit))
+
+def test_forward_pass_matches_hand_computed_reference():
+    rng = np.random.default_rng(0)
+    weights = _random_weights(rng)
+    X = rng.normal(size=(16, 5)).astype(np.float32)
+    net = NumpyConv1DNet(weights)
+    expected = np.array([_reference_proba(weights, row.astype(np.float64)) for row in X])
+    np.testing.assert_allclose(net.predict_proba(X), expected, atol=1e-5)
+
+def test_pooling_drops_the_trailing_partial_window():
+    rng = np.random.default_rng(1)
+    # Six features give five conv steps, pooled into two windows
+    weights = _random_weights(rng, features=6, filters=4, hidden=3)
+    X = rng.normal(size=(8, 6)).astype(np.float32)
+    expected = np.array([_reference_proba(weights, row.astype(np.float64)) for row in X])
+    np.testing.assert_allclose(NumpyConv1DNet(weights).predict_proba(X), expected, atol=1e-5)
+
+def test_save_and_load_round_trip(tmp_path):
+    rng = np.random.default_rng(2)
+    net = NumpyConv1DNet(_random_weights(rng))
+    path = tmp_path / 'cnn_weights.npz'
+    net.save(path)
+    loaded = NumpyConv1DNet.load(path)
+    X = rng.normal(size=(4, 5))
+    np.testing.assert_array_equal(loaded.predict_proba(X), net.predict_proba(X))
+    assert len(loaded.get_weights()) == len(WEIGHT_NAMES)
+
+def test_rejects_unsupported_weights():
+    rng = np.random.default_rng(3)
+    weights = _random_weights(rng)
+    with pytest.raises(ValueError):
+        NumpyConv1DNet(weights[:-1])
+    with pytest.raises(ValueError):
+        NumpyConv1DNet([np.zeros((2, 3, 32), dtype=np.float32)] + weights[1:])
+
+def test_from_keras_matches_keras_predict():
+    tf = pytest.importorskip("tensorflow")
+    from tensorflow.keras import layers, models
+
+    tf.keras.utils.set_random_seed(4)
+    # Same architecture as pipeline.train_models
+    model = models.Sequential([
+        layers.Conv1D(32, 2, activation='relu', input_shape=(5, 1)),
+        layers.MaxPooling1D(2),
+        layers.Flatten(),
+        layers.Dense(32, activation='relu'),
+        layers.Dense(1, activation='sigmoid')
+    ])
+    rng = np.random.default_rng(4)
+    model.set_weights(_random_weights(rng))
+    X = rng.normal(size=(256, 5)).astype(np.float32)
+    assert parity_error(model, NumpyConv1DNet.from_keras(model), X) < 1e-5
@@ -0,0 +1,131 @@
+import io
+import json
+import asyncio
+import numpy as np
+import pytest
+from core import pipeline, service
+from core.registry import resolve_models_dir, LATEST_FILE
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+ROWS = [
+    {'koi_period': 10.0, 'koi_depth': 0.002, 'koi_duration': 3.0, 'koi_impact': 0.4, 'koi_prad': 2.0},
+    {'koi_period': 200.0, 'koi_depth': 0.0001, 'koi_duration': 8.0, 'koi_impact': 0.9, 'koi_prad': 11.0},
+]
+
+@pytest.fixture(autouse=True)
+def fake_scores(monkeypatch):
+    """Score by thresholding the period so tests need no trained models"""
+    def score_features(model_data, X):
+        probabilities = (X[:, 0] < 100).astype(np.float32) * 0.9
+        predictions = (probabilities > 0.5).astype(np.int8)
+        return {'probabilities': probabilities, 'predictions': predictions}
+    monkeypatch.setattr(pipeline, 'score_features', score_features)
+
+async def _request(app, method, path, body=b'', content_type=None):
+    headers = [(b'content-type', content_type.encode())] if content_type else []
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers'])[b'content-type'].decode(), sent[1]['body']
+
+def _run(app, *requests):
+    """Start the app, send ``requests`` one after another and return their responses"""
+    async def scenario():
+        await app.batcher.start()
+        try:
+            return [await _request(app, *request) for request in requests]
+        finally:
+            await app.batcher.stop()
+    return asyncio.run(scenario())
+
+def _app():
+    return service.create_app(model_data={'model_version': 'test-version'}, max_latency_ms=1)
+
+def test_healthz_reports_the_model_version():
+    [(status, _, body)] = _run(_app(), ('GET', '/healthz'))
+    assert status == 200
+    assert json.loads(body) == {'status': 'ok', 'model_version': 'test-version'}
+
+def test_score_json():
+    [(status, _, body)] = _run(_app(), ('POST', '/score', json.dumps({'rows': ROWS}).encode()))
+    assert status == 200
+    payload = json.loads(body)
+    assert payload['model_version'] == 'test-version'
+    assert payload['predictions'] == [1, 0]
+    assert payload['probabilities'] == pytest.approx([0.9, 0.0])
+
+@pytest.mark.parametrize('body', [b'not json', b'[1, 2]', b'{"rows": 5}', b'{"rows": "abc"}', b'{"data": []}'])
+def test_score_rejects_malformed_bodies(body):
+    [(status, _, response)] = _run(_app(), ('POST', '/score', body))
+    assert status == 400
+    assert 'rows' in json.loads(response)['error']
+
+def test_score_rejects_rows_without_features():
+    [(status, _, _)] = _run(_app(), ('POST', '/score', json.dumps({'rows': [{'name': 'x'}]}).encode()))
+    assert status == 422
+
+def test_score_batch_arrow_stream():
+    table = pa.Table.from_pylist(ROWS)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    [(status, content_type, body)] = _run(_app(), ('POST', '/score/batch', sink.getvalue(), service.ARROW_STREAM))
+    assert status == 200
+    assert content_type == service.ARROW_STREAM
+    output = pa.ipc.open_stream(body).read_all()
+    assert output.column('prediction').to_pylist() == [1, 0]
+
+def test_score_batch_parquet():
+    sink = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(ROWS), sink)
+    [(status, _, body)] = _run(_app(), ('POST', '/score/batch', sink.getvalue(), service.PARQUET))
+    assert status == 200
+    assert pq.read_table(io.BytesIO(body)).column('prediction').to_pylist() == [1, 0]
+
+@pytest.mark.parametrize('content_type', [service.ARROW_STREAM, service.PARQUET])
+def test_score_batch_rejects_malformed_bodies(content_type):
+    [(status, _, _)] = _run(_app(), ('POST', '/score/batch', b'garbage', content_type))
+    assert status == 400
+
+def test_score_batch_rejects_unknown_content_types():
+    [(status, _, _)] = _run(_app(), ('POST', '/score/batch', b'a,b\n1,2\n', 'text/csv'))
+    assert status == 415
+
+def test_unknown_route():
+    [(status, _, _)] = _run(_app(), ('GET', '/nope'))
+    assert status == 404
+
+def test_startup_fails_without_artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, 'train_models', lambda *args, **kwargs: pytest.fail("the service must not train"))
+    app = service.create_app(artifacts_root=str(tmp_path))
+    messages = iter([{'type': 'lifespan.startup'}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({'type': 'lifespan'}, receive, send))
+    assert sent[0]['type'] == 'lifespan.startup.failed'
+    assert str(tmp_path) in sent[0]['message']
+
+def test_models_resolve_through_the_latest_pointer(tmp_path):
+    version = tmp_path / 'versions' / 'v1'
+    version.mkdir(parents=True)
+    (version / 'manifest.json').write_text('{"model_version": "v1"}')
+    (tmp_path / LATEST_FILE).write_text('v1')
+    assert resolve_models_dir(None, str(tmp_path)) == str(version)
+    assert resolve_models_dir(str(version), str(tmp_path / 'elsewhere')) == str(version)
+    with pytest.raises(FileNotFoundError):
+        resolve_models_dir(str(tmp_path / 'missing'), str(tmp_path))
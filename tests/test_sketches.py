@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from utils.sketches import KLLSketch, TableSketch, DEFAULT_K, rank_error
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+def max_rank_error(sketch, values):
+    ordered = np.sort(values)
+    estimates = sketch.quantiles(QUANTILES)
+    ranks = np.searchsorted(ordered, estimates, side='right') / len(ordered)
+    return np.abs(ranks - QUANTILES).max()
+
+def test_rank_error_matches_documented_figure():
+    assert abs(rank_error(200) - 0.0165) < 0.0002
+
+def test_chunked_sketch_stays_within_documented_bound():
+    # Lognormal values fed in 40 chunks, as an upload would be
+    worst = 0.0
+    for seed in range(30):
+        values = np.random.default_rng(seed).lognormal(size=200_000)
+        sketch = KLLSketch(DEFAULT_K, seed=seed)
+        for chunk in np.array_split(values, 40):
+            sketch.update(chunk)
+        worst = max(worst, max_rank_error(sketch, values))
+    assert worst <= rank_error(DEFAULT_K)
+
+def test_merged_sketches_stay_within_documented_bound():
+    values = np.random.default_rng(7).lognormal(size=200_000)
+    parts = [KLLSketch(DEFAULT_K, seed=i).update(chunk) for i, chunk in enumerate(np.array_split(values, 8))]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+    assert merged.n == len(values)
+    assert max_rank_error(merged, values) <= rank_error(DEFAULT_K)
+
+def test_small_columns_are_exact():
+    values = np.arange(DEFAULT_K, dtype=np.float64)
+    sketch = KLLSketch(DEFAULT_K, seed=0).update(values)
+    assert sketch.quantile(0.5) == np.quantile(values, 0.5, method='inverted_cdf')
+
+def test_table_sketch_moments_are_exact():
+    df = pd.DataFrame({'x': np.random.default_rng(1).normal(size=10_000)})
+    df.loc[::10, 'x'] = np.nan
+    sketch = TableSketch()
+    for start in range(0, len(df), 1000):
+        sketch.update(df.iloc[start:start + 1000])
+    summary = sketch.describe(['x'])
+    expected = df.describe()
+    for row in ('count', 'mean', 'std', 'min', 'max'):
+        assert np.isclose(summary.loc[row, 'x'], expected.loc[row, 'x'])
@@ -0,0 +1,77 @@
+import time
+import pytest
+from utils import user_store
+from utils.user_store import UserStore, hash_password, check_password
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / 'users.sqlite3'), pool_size=2, iterations=1000, secret='test-secret')
+    yield store
+    store.close()
+
+def test_password_hash_round_trip():
+    stored = hash_password('hunter2', iterations=1000)
+    assert stored.startswith('pbkdf2_sha256$1000$')
+    assert check_password('hunter2', stored)
+    assert not check_password('hunter3', stored)
+
+def test_create_and_authenticate(store):
+    assert store.create_user(' Astro@Example.com ', 'pw')
+    assert not store.create_user('astro@example.com', 'other')
+    assert store.authenticate('ASTRO@example.com', 'pw')
+    assert not store.authenticate('astro@example.com', 'wrong')
+
+def test_cheaper_hashes_are_upgraded_on_login(tmp_path):
+    path = str(tmp_path / 'users.sqlite3')
+    old = UserStore(path, iterations=1000, secret='s')
+    old.create_user('a@example.com', 'pw')
+    old.close()
+    store = UserStore(path, iterations=2000, secret='s')
+    assert store.authenticate('a@example.com', 'pw')
+    with store._connection() as conn:
+        stored = conn.execute("SELECT password_hash FROM users").fetchone()[0]
+    assert stored.startswith('pbkdf2_sha256$2000$')
+    assert store.authenticate('a@example.com', 'pw')
+    store.close()
+
+def test_unknown_email_checks_the_dummy_hash(store, monkeypatch):
+    checked = []
+    real_check = user_store.check_password
+    monkeypatch.setattr(user_store, 'check_password', lambda password, stored: checked.append(stored) or real_check(password, stored))
+    assert not store.authenticate('nobody@example.com', 'pw')
+    assert checked == [store._dummy_hash]
+
+def test_token_round_trip(store):
+    token = store.issue_token(' Astro@Example.com ')
+    assert store.verify_token(token) == 'astro@example.com'
+
+def test_tampered_tokens_are_rejected(store):
+    token = store.issue_token('astro@example.com')
+    payload, signature = token.split('.')
+    forged_payload = user_store._b64(b'admin@example.com|9999999999')
+    assert store.verify_token(f"{forged_payload}.{signature}") is None
+    assert store.verify_token(f"{payload}.{signature[:-2]}AA") is None
+    assert store.verify_token(token + '.extra') is None
+    assert store.verify_token('not-a-token') is None
+    assert store.verify_token(None) is None
+
+def test_tokens_from_another_secret_are_rejected(store, tmp_path):
+    other = UserStore(str(tmp_path / 'other.sqlite3'), pool_size=1, iterations=1000, secret='other-secret')
+    assert store.verify_token(other.issue_token('astro@example.com')) is None
+    other.close()
+
+def test_expired_tokens_are_rejected(store, monkeypatch):
+    token = store.issue_token('astro@example.com', ttl=60)
+    now = time.time()
+    monkeypatch.setattr(user_store.time, 'time', lambda: now + 61)
+    assert store.verify_token(token) is None
+
+def test_session_secret_persists_across_stores(tmp_path, monkeypatch):
+    monkeypatch.delenv('EXOHUNTER_SESSION_SECRET', raising=False)
+    path = str(tmp_path / 'users.sqlite3')
+    first = UserStore(path, pool_size=1, iterations=1000)
+    token = first.issue_token('astro@example.com')
+    first.close()
+    second = UserStore(path, pool_size=1, iterations=1000)
+    assert second.verify_token(token) == 'astro@example.com'
+    second.close()
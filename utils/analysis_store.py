@@ -0,0 +1,219 @@
+"""Per-user history of detection runs
+
+Each finished analysis gets one row in a SQLite index (``analyses``, looked
+up by user and date) holding its dataset hash, model version and summary.
+The per-row outputs are written next to it as an uncompressed ``.npz`` and
+the scored table as Parquet, once per user and dataset, so reopening a run
+is a single indexed query plus two file reads with no model call.
+"""
+import os
+import json
+import time
+import queue
+import hashlib
+import sqlite3
+import contextlib
+import numpy as np
+import pandas as pd
+
+HISTORY_DIR = os.environ.get("EXOHUNTER_HISTORY_DIR", os.path.join("data", "history"))
+POOL_SIZE = int(os.environ.get("EXOHUNTER_HISTORY_DB_POOL", "2"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    label TEXT,
+    data_hash TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    scorer TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    exoplanet_count INTEGER NOT NULL,
+    confidence REAL NOT NULL,
+    summary TEXT NOT NULL,
+    results_path TEXT NOT NULL,
+    dataset_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_email_created ON analyses(email, created_at DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_analyses_run ON analyses(email, data_hash, model_version, scorer);
+"""
+
+# Result fields that are arrays; everything else in the result dict is summary
+ARRAY_FIELDS = ('predictions', 'probabilities')
+INDIVIDUAL_FIELDS = ('xgb', 'cnn')
+INDEX_COLUMNS = ['id', 'created_at', 'label', 'data_hash', 'model_version', 'scorer', 'rows', 'exoplanet_count', 'confidence']
+
+def _user_dir(email):
+    return hashlib.blake2b(email.strip().lower().encode(), digest_size=8).hexdigest()
+
+def _atomic_write(path, write):
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "wb") as handle:
+            write(handle)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class AnalysisStore:
+    """Index of past analyses in SQLite plus their arrays on disk, safe to share across threads"""
+
+    def __init__(self, root=HISTORY_DIR, pool_size=POOL_SIZE):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.path = os.path.join(root, "history.sqlite3")
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _write_dataset(self, directory, data_hash, data):
+        """Store the scored table once per user and dataset; Parquet, else pickle for odd dtypes"""
+        for suffix in (".parquet", ".pkl"):
+            existing = os.path.join(directory, f"{data_hash}{suffix}")
+            if os.path.exists(existing):
+                return existing
+        # Written straight to the file: an in-memory copy would undo the feature store's memory bound
+        path = os.path.join(directory, f"{data_hash}.parquet")
+        try:
+            _atomic_write(path, lambda handle: data.to_parquet(handle, index=True))
+        except (ImportError, ValueError, TypeError):
+            path = os.path.join(directory, f"{data_hash}.pkl")
+            _atomic_write(path, lambda handle: data.to_pickle(handle))
+        return path
+
+    def save(self, email, results, data, label=None):
+        """Record a finished analysis and return its id
+
+        Re-running the same dataset with the same model and scorer refreshes
+        the existing entry instead of adding a duplicate.
+        """
+        email = email.strip().lower()
+        directory = os.path.join(self.root, _user_dir(email))
+        os.makedirs(directory, exist_ok=True)
+
+        run_name = f"{results['data_hash']}-{results['model_version']}-{results.get('scorer', 'fusion')}"
+        results_path = os.path.join(directory, f"{run_name}.npz")
+        arrays = {field: np.asarray(results[field]) for field in ARRAY_FIELDS}
+        for field in INDIVIDUAL_FIELDS:
+            value = results['individual_preds'].get(field)
+            if value is not None:
+                arrays[f"individual_{field}"] = np.asarray(value)
+        _atomic_write(results_path, lambda handle: np.savez(handle, **arrays))
+        dataset_path = self._write_dataset(directory, results['data_hash'], data)
+
+        summary = {
+            key: value for key, value in results.items()
+            if key not in ARRAY_FIELDS and key != 'individual_preds'
+        }
+        with self._connection() as conn:
+            return conn.execute(
+                """
+                INSERT INTO analyses (
+                    email, created_at, label, data_hash, model_version, scorer, rows,
+                    exoplanet_count, confidence, summary, results_path, dataset_path
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (email, data_hash, model_version, scorer) DO UPDATE SET
+                    created_at = excluded.created_at,
+                    label = excluded.label
+                RETURNING id
+                """,
+                (
+                    email, time.time(), label, results['data_hash'], results['model_version'],
+                    results.get('scorer', 'fusion'), len(arrays['predictions']),
+                    int(results['exoplanet_count']), float(results['confidence']),
+                    json.dumps(summary, default=_json_default), results_path, dataset_path
+                )
+            ).fetchone()[0]
+
+    def list_runs(self, email, limit=50, offset=0):
+        """The user's analyses, newest first, as a DataFrame of index columns"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(INDEX_COLUMNS)} FROM analyses WHERE email = ? "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (email.strip().lower(), limit, offset)
+            ).fetchall()
+        runs = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+        runs['created_at'] = pd.to_datetime(runs['created_at'], unit='s')
+        return runs
+
+    def count_runs(self, email):
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM analyses WHERE email = ?", (email.strip().lower(),)
+            ).fetchone()[0]
+
+    def load(self, email, analysis_id):
+        """``(results, data)`` of one of the user's analyses, or ``None`` when it is gone"""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT summary, results_path, dataset_path FROM analyses WHERE id = ? AND email = ?",
+                (analysis_id, email.strip().lower())
+            ).fetchone()
+        if row is None:
+            return None
+        summary, results_path, dataset_path = row
+        try:
+            with np.load(results_path) as arrays:
+                results = json.loads(summary)
+                for field in ARRAY_FIELDS:
+                    results[field] = arrays[field]
+                results['individual_preds'] = {
+                    field: arrays[f"individual_{field}"] if f"individual_{field}" in arrays else None
+                    for field in INDIVIDUAL_FIELDS
+                }
+            if dataset_path.endswith(".parquet"):
+                data = pd.read_parquet(dataset_path)
+            else:
+                data = pd.read_pickle(dataset_path)
+        except FileNotFoundError:
+            return None
+        return results, data
+
+    def delete(self, email, analysis_id):
+        """Remove an analysis, and its dataset file when no other entry uses it"""
+        email = email.strip().lower()
+        with self._connection() as conn:
+            row = conn.execute(
+                "DELETE FROM analyses WHERE id = ? AND email = ? RETURNING results_path, dataset_path",
+                (analysis_id, email)
+            ).fetchone()
+            if row is None:
+                return False
+            results_path, dataset_path = row
+            dataset_in_use = conn.execute(
+                "SELECT 1 FROM analyses WHERE dataset_path = ? LIMIT 1", (dataset_path,)
+            ).fetchone()
+        paths = [results_path] if dataset_in_use else [results_path, dataset_path]
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+        return True
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
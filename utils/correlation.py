@@ -0,0 +1,100 @@
+"""Chunked float32 Pearson correlations for wide tables
+
+Columns are standardised in float32 and the correlation matrix is
+accumulated one row chunk at a time with a BLAS ``Z.T @ Z`` product, so
+memory stays at O(chunk x p + p^2) however many rows the table has.
+Missing values count as the column mean, i.e. zero after standardising;
+unlike pandas' pairwise-complete ``corr()`` this keeps a single pass per
+chunk and differs only for columns with missing values.
+"""
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import linkage, leaves_list
+from scipy.spatial.distance import squareform
+
+DEFAULT_CHUNK_ROWS = 65536
+
+def _chunks(df, columns, chunk_rows):
+    """float32 ``(rows, columns)`` blocks, converted one row chunk at a time"""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows][columns].to_numpy(dtype=np.float32, na_value=np.nan)
+
+def correlation_matrix(df, columns=None, chunk_rows=DEFAULT_CHUNK_ROWS, sample_rows=None, seed=0):
+    """Pearson correlation matrix of ``columns`` as a DataFrame
+
+    With ``sample_rows`` an approximate matrix is computed from that many
+    uniformly sampled rows. Constant columns get NaN correlations, like pandas.
+    """
+    columns = list(columns) if columns is not None else df.select_dtypes(include=[np.number]).columns.tolist()
+    if sample_rows is not None and len(df) > sample_rows:
+        rows = np.sort(np.random.default_rng(seed).choice(len(df), sample_rows, replace=False))
+        df = df.iloc[rows]
+
+    # Pass 1: per-column mean and standard deviation (float64 accumulators)
+    count = np.zeros(len(columns))
+    total = np.zeros(len(columns))
+    total_sq = np.zeros(len(columns))
+    for chunk in _chunks(df, columns, chunk_rows):
+        valid = ~np.isnan(chunk)
+        filled = np.where(valid, chunk, 0).astype(np.float64)
+        count += valid.sum(axis=0)
+        total += filled.sum(axis=0)
+        total_sq += (filled * filled).sum(axis=0)
+    mean = total / np.maximum(count, 1)
+    variance = np.maximum(total_sq / np.maximum(count, 1) - mean * mean, 0)
+    std = np.sqrt(variance)
+    constant = std <= 1e-12 * np.maximum(np.abs(mean), 1)
+    scale = np.where(constant, 0, 1 / np.where(constant, 1, std)).astype(np.float32)
+    mean = mean.astype(np.float32)
+
+    # Pass 2: standardise each chunk in float32 and accumulate Z^T Z
+    gram = np.zeros((len(columns), len(columns)))
+    for chunk in _chunks(df, columns, chunk_rows):
+        z = np.nan_to_num((chunk - mean) * scale, nan=0.0)
+        gram += z.T @ z
+
+    n = max(len(df), 1)
+    corr = np.clip(gram / n, -1, 1)
+    np.fill_diagonal(corr, 1.0)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+def top_correlated_pairs(corr, k=20):
+    """The ``k`` column pairs with the largest absolute correlation, strongest first"""
+    values = corr.to_numpy()
+    upper_rows, upper_cols = np.triu_indices(len(values), k=1)
+    strength = np.abs(values[upper_rows, upper_cols])
+    strength = np.nan_to_num(strength, nan=-1.0)
+    k = min(k, len(strength))
+    if k == 0:
+        return pd.DataFrame(columns=['feature_a', 'feature_b', 'correlation'])
+    top = np.argpartition(-strength, k - 1)[:k]
+    top = top[np.argsort(-strength[top])]
+    top = top[strength[top] >= 0]
+    return pd.DataFrame({
+        'feature_a': corr.columns[upper_rows[top]],
+        'feature_b': corr.columns[upper_cols[top]],
+        'correlation': values[upper_rows[top], upper_cols[top]]
+    })
+
+def relevant_columns(corr, pairs, max_columns=30):
+    """Columns worth plotting: all of them when few, else those in the top pairs"""
+    if len(corr.columns) <= max_columns:
+        return list(corr.columns)
+    columns = []
+    for a, b in zip(pairs['feature_a'], pairs['feature_b']):
+        for column in (a, b):
+            if column not in columns and len(columns) < max_columns:
+                columns.append(column)
+    return columns
+
+def cluster_order(corr):
+    """Column order that groups correlated columns, from average-linkage clustering on 1 - |r|"""
+    if len(corr.columns) < 3:
+        return list(corr.columns)
+    distance = 1 - np.abs(np.nan_to_num(corr.to_numpy(), nan=0.0))
+    distance = (distance + distance.T) / 2
+    np.fill_diagonal(distance, 0)
+    order = leaves_list(linkage(squareform(np.clip(distance, 0, None), checks=False), method='average'))
+    return [corr.columns[i] for i in order]
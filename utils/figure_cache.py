@@ -0,0 +1,97 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from utils.hashing import hash_frame
+
+DEFAULT_MAX_BYTES = int(os.environ.get("EXOHUNTER_FIGURE_CACHE_MB", "128")) * 1024 * 1024
+
+# Every chart shares the transparent background / white font layout; bump this when it changes
+THEME = "cosmic-dark"
+
+class FigureCache:
+    """Size-bounded LRU cache of built Plotly figures shared by all sessions
+
+    Entries are keyed by ``(dataset key, chart type, parameters, theme)``. Each
+    figure is sized by its serialised JSON, the payload Streamlit sends to the
+    browser, and least recently used figures are evicted once the total exceeds
+    ``max_bytes``. Cached figures are shared, so callers must not mutate them.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        """Return the figure for ``key``, calling ``build()`` only on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        figure = build()
+        size = len(figure.to_json())
+        if size > self.max_bytes:
+            return figure
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+            self._entries[key] = (figure, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+_figure_cache = FigureCache()
+_frame_keys = {}
+_frame_keys_lock = threading.Lock()
+
+def get_figure_cache():
+    """Return the process-wide figure cache"""
+    return _figure_cache
+
+def dataset_key(df):
+    """Content hash of ``df``, computed once per DataFrame object
+
+    Session state keeps the same DataFrame across reruns, so the hash is
+    remembered by object identity until the frame is garbage collected.
+    """
+    with _frame_keys_lock:
+        known = _frame_keys.get(id(df))
+        if known is not None and known[0]() is df:
+            return known[1]
+
+    key = hash_frame(df)
+    ref = weakref.ref(df, lambda _, frame_id=id(df): _frame_keys.pop(frame_id, None))
+    with _frame_keys_lock:
+        _frame_keys[id(df)] = (ref, key)
+    return key
+
+def cached_figure(chart, data_key, params, build):
+    """Build or reuse the ``chart`` figure for dataset ``data_key`` and ``params``"""
+    return _figure_cache.get_or_build((data_key, chart, params, THEME), build)
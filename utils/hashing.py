@@ -0,0 +1,28 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+def hash_array(array):
+    """Content hash of a NumPy array (dtype, shape and values)"""
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(array.dtype).encode())
+    digest.update(str(array.shape).encode())
+    digest.update(array.data if array.dtype != object else repr(array.tolist()).encode())
+    return digest.hexdigest()
+
+def hash_array_chunks(chunks, dtype, shape):
+    """``hash_array`` of the row-wise concatenation of ``chunks``, without building it"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(np.dtype(dtype)).encode())
+    digest.update(str(tuple(shape)).encode())
+    for chunk in chunks:
+        digest.update(np.ascontiguousarray(chunk, dtype=dtype).data)
+    return digest.hexdigest()
+
+def hash_frame(df):
+    """Content hash of a DataFrame, including column names and index"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
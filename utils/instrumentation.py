@@ -0,0 +1,167 @@
+"""Lightweight timing and memory spans for request stages
+
+``with span('detect', rows=len(df)):`` records wall time, row count, the
+process RSS delta and, while ``tracemalloc`` is tracing, the Python
+allocation delta of the block. Every span is logged as one JSON line on the
+``exohunter.spans`` logger and folded into per-stage aggregates, which are
+rendered in Prometheus text format to EXOHUNTER_METRICS_FILE when it is set.
+"""
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+import contextlib
+from collections import deque
+
+try:
+    import psutil
+    _PROCESS = psutil.Process()
+except ImportError:
+    _PROCESS = None
+
+logger = logging.getLogger("exohunter.spans")
+
+METRICS_FILE = os.environ.get("EXOHUNTER_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("EXOHUNTER_METRICS_INTERVAL", "10"))
+# tracemalloc slows allocation-heavy code noticeably, so it is opt-in
+if os.environ.get("EXOHUNTER_TRACEMALLOC", "0") == "1":
+    tracemalloc.start()
+
+def rss_bytes():
+    """Resident set size of this process, or None where it cannot be read"""
+    if _PROCESS is not None:
+        return _PROCESS.memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+class Span:
+    """One measured stage; ``rows`` may be filled in once it is known"""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.error = None
+        self.seconds = None
+        self.rss_delta = None
+        self.alloc_delta = None
+
+    def as_dict(self):
+        return {
+            'stage': self.name,
+            'seconds': round(self.seconds, 6),
+            'rows': self.rows,
+            'rss_delta_bytes': self.rss_delta,
+            'alloc_delta_bytes': self.alloc_delta,
+            'error': self.error
+        }
+
+class SpanRecorder:
+    """Thread-safe per-stage aggregates plus a window of recent spans"""
+
+    def __init__(self, recent=200):
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._recent = deque(maxlen=recent)
+        self._last_write = 0.0
+
+    def record(self, span):
+        with self._lock:
+            stats = self._stages.setdefault(span.name, {
+                'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                'rows': 0, 'last_rss_delta_bytes': None, 'last_alloc_delta_bytes': None
+            })
+            stats['calls'] += 1
+            stats['errors'] += span.error is not None
+            stats['seconds'] += span.seconds
+            stats['max_seconds'] = max(stats['max_seconds'], span.seconds)
+            stats['rows'] += span.rows or 0
+            stats['last_rss_delta_bytes'] = span.rss_delta
+            stats['last_alloc_delta_bytes'] = span.alloc_delta
+            self._recent.append(span.as_dict())
+            write_due = METRICS_FILE and time.monotonic() - self._last_write >= METRICS_INTERVAL
+            if write_due:
+                self._last_write = time.monotonic()
+        if write_due:
+            try:
+                self.write_prometheus(METRICS_FILE)
+            except OSError as e:
+                logger.warning("Could not write metrics file %s: %s", METRICS_FILE, e)
+
+    def stages(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stages.items()}
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._recent.clear()
+
+    def prometheus_text(self):
+        """Aggregates in the Prometheus text exposition format"""
+        stages = self.stages()
+        metrics = [
+            ('exohunter_stage_calls_total', 'counter', 'Completed spans per stage', 'calls'),
+            ('exohunter_stage_errors_total', 'counter', 'Spans that raised per stage', 'errors'),
+            ('exohunter_stage_seconds_total', 'counter', 'Wall time spent per stage', 'seconds'),
+            ('exohunter_stage_seconds_max', 'gauge', 'Slowest span per stage', 'max_seconds'),
+            ('exohunter_stage_rows_total', 'counter', 'Rows processed per stage', 'rows'),
+            ('exohunter_stage_rss_delta_bytes', 'gauge', 'RSS change over the last span', 'last_rss_delta_bytes'),
+            ('exohunter_stage_alloc_delta_bytes', 'gauge', 'Traced Python allocation change over the last span', 'last_alloc_delta_bytes'),
+        ]
+        lines = []
+        for metric, kind, help_text, field in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in sorted(stages.items()):
+                if stats[field] is not None:
+                    lines.append(f'{metric}{{stage="{name}"}} {stats[field]}')
+        rss = rss_bytes()
+        if rss is not None:
+            lines.append("# HELP exohunter_process_rss_bytes Resident set size of the process")
+            lines.append("# TYPE exohunter_process_rss_bytes gauge")
+            lines.append(f"exohunter_process_rss_bytes {rss}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the metrics file atomically so scrapers never read a partial file"""
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+_recorder = SpanRecorder()
+
+def get_recorder():
+    """Process-wide span recorder"""
+    return _recorder
+
+@contextlib.contextmanager
+def span(name, rows=None):
+    """Measure the enclosed block as stage ``name``"""
+    current = Span(name, rows)
+    rss_start = rss_bytes()
+    tracing = tracemalloc.is_tracing()
+    alloc_start = tracemalloc.get_traced_memory()[0] if tracing else None
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        rss_end = rss_bytes()
+        if rss_start is not None and rss_end is not None:
+            current.rss_delta = rss_end - rss_start
+        if tracing and tracemalloc.is_tracing():
+            current.alloc_delta = tracemalloc.get_traced_memory()[0] - alloc_start
+        _recorder.record(current)
+        logger.info(json.dumps(current.as_dict()))
@@ -1,14 +1,31 @@
 import streamlit as st
 from fpdf import FPDF
 import io
+import threading
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from utils.figure_cache import dataset_key
+from utils.ranking import CandidateIndex
+from utils.instrumentation import span
+from core.admission import get_admission_controller
+
+# Bump whenever the report layout or wording changes to invalidate cached PDFs
+REPORT_TEMPLATE_VERSION = "1"
 
 class ExoHunterReport(FPDF):
     def __init__(self):
         super().__init__()
         self.set_auto_page_break(auto=True, margin=15)
     
+    def normalize_text(self, txt):
+        # Core PDF fonts are latin-1 only; drop emoji and other unsupported glyphs
+        txt = super().normalize_text(txt)
+        if isinstance(txt, str):
+            txt = txt.encode('latin-1', 'ignore').decode('latin-1')
+        return txt
+    
     def header(self):
         self.set_font('Arial', 'B', 16)
         self.set_text_color(0, 100, 200)
@@ -37,20 +54,36 @@ def generate_detection_report(results, original_data):
     """Generate PDF report of exoplanet detection analysis"""
     
     try:
-        # Create PDF object
-        pdf = ExoHunterReport()
-        pdf.add_page()
-        
-        # Title page information
-        pdf.chapter_title("Analysis Summary")
-        
-        # Basic statistics
-        exoplanet_count = results['exoplanet_count']
-        confidence = results['confidence']
-        total_samples = len(results['predictions'])
+        pdf_buffer = io.BytesIO(render_detection_report(results, original_data))
+        return pdf_buffer
         
-        summary_text = f"""
-Analysis Date: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
+    except Exception as e:
+        st.error(f"Error generating PDF report: {str(e)}")
+        return None
+
+@span('report.render')
+def render_detection_report(results, original_data):
+    """Render the detection report and return the PDF bytes
+    
+    Does not touch Streamlit, so it can run on a background worker thread.
+    """
+    # Create PDF object
+    pdf = ExoHunterReport()
+    pdf.add_page()
+    
+    # Title page information
+    pdf.chapter_title("Analysis Summary")
+    
+    # Basic statistics
+    exoplanet_count = results['exoplanet_count']
+    confidence = results['confidence']
+    total_samples = len(results['predictions'])
+    
+    # Stamped from the result, so a cached PDF shows when the analysis ran
+    analyzed_at = datetime.fromtimestamp(results['analyzed_at']) if results.get('analyzed_at') else datetime.now()
+    
+    summary_text = f"""
+Analysis Date: {analyzed_at.strftime('%B %d, %Y at %I:%M %p')}
 Dataset Size: {total_samples:,} samples
 Exoplanets Detected: {exoplanet_count}
 Maximum Confidence: {confidence:.1%}
@@ -59,15 +92,15 @@ Detection Rate: {(exoplanet_count/total_samples)*100:.1f}%
 This report contains the results of advanced AI analysis using ExoHunter's hybrid 
 CNN + XGBoost fusion model for exoplanet detection. The analysis was performed on 
 your uploaded dataset using NASA-validated methodologies.
-        """
-        
-        pdf.chapter_body(summary_text.strip())
-        
-        # Model Performance Section
-        pdf.chapter_title("Model Performance Metrics")
-        
-        accuracies = results['model_accuracies']
-        performance_text = f"""
+    """
+    
+    pdf.chapter_body(summary_text.strip())
+    
+    # Model Performance Section
+    pdf.chapter_title("Model Performance Metrics")
+    
+    accuracies = results['model_accuracies']
+    performance_text = f"""
 Our hybrid AI model combines two powerful machine learning approaches:
 
 XGBoost Classifier Accuracy: {accuracies['xgb']:.1%}
@@ -87,22 +120,22 @@ Fusion Model Accuracy: {accuracies['fusion']:.1%}
 
 The fusion approach typically outperforms individual models by reducing bias 
 and variance through ensemble learning principles.
-        """
-        
-        pdf.chapter_body(performance_text.strip())
-        
-        # Detection Results Section
-        pdf.chapter_title("Detailed Detection Results")
-        
-        predictions = results['predictions']
-        probabilities = results['probabilities']
-        
-        # Calculate detection statistics
-        confirmed_count = np.sum(predictions == 1)
-        high_confidence_count = np.sum(probabilities > 0.8)
-        medium_confidence_count = np.sum((probabilities > 0.5) & (probabilities <= 0.8))
-        
-        results_text = f"""
+    """
+    
+    pdf.chapter_body(performance_text.strip())
+    
+    # Detection Results Section
+    pdf.chapter_title("Detailed Detection Results")
+    
+    predictions = results['predictions']
+    probabilities = results['probabilities']
+    
+    # Calculate detection statistics
+    confirmed_count = np.sum(predictions == 1)
+    high_confidence_count = np.sum(probabilities > 0.8)
+    medium_confidence_count = np.sum((probabilities > 0.5) & (probabilities <= 0.8))
+    
+    results_text = f"""
 Classification Results:
 - Confirmed Exoplanets: {confirmed_count}
 - Non-detections: {total_samples - confirmed_count}
@@ -114,23 +147,23 @@ Confidence Distribution:
 - Standard Deviation: {np.std(probabilities):.1%}
 
 Top 5 Most Confident Detections:
-        """
-        
-        # Add top detections
-        top_indices = np.argsort(probabilities)[-5:][::-1]
-        for i, idx in enumerate(top_indices, 1):
-            if predictions[idx] == 1:
-                results_text += f"\n{i}. Sample {idx+1}: {probabilities[idx]:.1%} confidence - CONFIRMED"
-            else:
-                results_text += f"\n{i}. Sample {idx+1}: {probabilities[idx]:.1%} confidence - Not detected"
-        
-        pdf.chapter_body(results_text.strip())
-        
-        # Dataset Information Section
-        pdf.chapter_title("Dataset Characteristics")
-        
-        numeric_cols = original_data.select_dtypes(include=[np.number]).columns.tolist()
-        dataset_info = f"""
+    """
+    
+    # Add top detections
+    top_indices = CandidateIndex(probabilities).top(5)
+    for i, idx in enumerate(top_indices, 1):
+        if predictions[idx] == 1:
+            results_text += f"\n{i}. Sample {idx+1}: {probabilities[idx]:.1%} confidence - CONFIRMED"
+        else:
+            results_text += f"\n{i}. Sample {idx+1}: {probabilities[idx]:.1%} confidence - Not detected"
+    
+    pdf.chapter_body(results_text.strip())
+    
+    # Dataset Information Section
+    pdf.chapter_title("Dataset Characteristics")
+    
+    numeric_cols = original_data.select_dtypes(include=[np.number]).columns.tolist()
+    dataset_info = f"""
 Dataset Overview:
 - Total Records: {original_data.shape[0]:,}
 - Total Features: {original_data.shape[1]}
@@ -148,14 +181,14 @@ Data Quality Assessment:
 - Complete records: {len(original_data.dropna())} ({(len(original_data.dropna())/len(original_data)*100):.1f}%)
 - Data processing: Automated cleaning and normalization applied
 - Feature scaling: StandardScaler normalization for ML compatibility
-        """
-        
-        pdf.chapter_body(dataset_info.strip())
-        
-        # Methodology Section
-        pdf.chapter_title("Methodology & Technical Details")
-        
-        methodology_text = """
+    """
+    
+    pdf.chapter_body(dataset_info.strip())
+    
+    # Methodology Section
+    pdf.chapter_title("Methodology & Technical Details")
+    
+    methodology_text = """
 ExoHunter employs a sophisticated hybrid machine learning approach:
 
 1. Data Preprocessing:
@@ -187,14 +220,14 @@ ExoHunter employs a sophisticated hybrid machine learning approach:
 
 This methodology is based on established exoplanet detection practices used by 
 NASA's Kepler, K2, and TESS missions, adapted for modern machine learning frameworks.
-        """
-        
-        pdf.chapter_body(methodology_text.strip())
-        
-        # Recommendations Section
-        pdf.chapter_title("Recommendations & Next Steps")
-        
-        recommendations_text = f"""
+    """
+    
+    pdf.chapter_body(methodology_text.strip())
+    
+    # Recommendations Section
+    pdf.chapter_title("Recommendations & Next Steps")
+    
+    recommendations_text = f"""
 Based on the analysis results, we recommend:
 
 1. Follow-up Observations:
@@ -224,15 +257,15 @@ Based on the analysis results, we recommend:
 
 Remember that machine learning results require observational confirmation.
 ExoHunter provides statistical likelihood, not definitive planet confirmation.
-        """
-        
-        pdf.chapter_body(recommendations_text.strip())
-        
-        # Footer information
-        pdf.add_page()
-        pdf.chapter_title("About ExoHunter")
-        
-        about_text = """
+    """
+    
+    pdf.chapter_body(recommendations_text.strip())
+    
+    # Footer information
+    pdf.add_page()
+    pdf.chapter_title("About ExoHunter")
+    
+    about_text = """
 ExoHunter is an advanced AI-powered platform for exoplanet detection and analysis. 
 Developed using NASA's open datasets and state-of-the-art machine learning techniques, 
 ExoHunter democratizes access to sophisticated astronomical analysis tools.
@@ -264,18 +297,92 @@ For more information, visit our platform or contact the development team.
 Disclaimer: This analysis is for research and educational purposes. 
 Machine learning predictions should be validated through observational confirmation 
 before claiming definitive exoplanet discoveries.
-        """
-        
-        pdf.chapter_body(about_text.strip())
-        
-        # Save PDF to buffer
-        pdf_buffer = io.BytesIO()
-        pdf_output = pdf.output(dest='S').encode('latin1')
-        pdf_buffer.write(pdf_output)
-        pdf_buffer.seek(0)
+    """
+    
+    pdf.chapter_body(about_text.strip())
+    
+    return pdf.output(dest='S').encode('latin1')
+
+def report_cache_key(results, original_data):
+    """Cache key for a rendered report, built from hashes that already exist
+
+    Results are identified by their feature hash, model version, scorer and
+    analysis time; the table by ``dataset_key``, which is computed once per
+    DataFrame, so repeated clicks hash nothing.
+    """
+    return (
+        results['data_hash'], results['model_version'], results.get('scorer', 'fusion'),
+        results.get('analyzed_at'), dataset_key(original_data), REPORT_TEMPLATE_VERSION
+    )
+
+class ReportService:
+    """Renders reports on a background worker and caches the PDF bytes
+    
+    The UI submits a job with ``request`` and polls ``status`` on later reruns;
+    identical requests share one render and repeated downloads serve cached bytes.
+    Renders wait for a ``report`` admission slot, behind interactive scoring.
+    Finished reports and render errors are each kept for the ``max_cached``
+    most recent keys.
+    """
+    
+    def __init__(self, max_workers=2, max_cached=32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exohunter-report")
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._errors = OrderedDict()
+        self._positions = {}
+        self._max_cached = max_cached
+        self._lock = threading.Lock()
+    
+    def request(self, key, results, original_data):
+        """Start rendering ``key`` unless it is cached or already in flight"""
+        with self._lock:
+            if key in self._cache or key in self._pending:
+                return
+            self._errors.pop(key, None)
+            self._pending[key] = self._executor.submit(self._render, key, results, original_data)
+    
+    def _render(self, key, results, original_data):
+        def on_wait(position):
+            with self._lock:
+                self._positions[key] = position
         
-        return pdf_buffer
+        try:
+            with get_admission_controller().admit('report', original_data.memory_usage().sum(), on_wait=on_wait):
+                with self._lock:
+                    self._positions.pop(key, None)
+                pdf_bytes = render_detection_report(results, original_data)
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(key, None)
+                self._positions.pop(key, None)
+                self._errors[key] = str(e)
+                while len(self._errors) > self._max_cached:
+                    self._errors.popitem(last=False)
+            return
+        with self._lock:
+            self._pending.pop(key, None)
+            self._cache[key] = pdf_bytes
+            while len(self._cache) > self._max_cached:
+                self._cache.popitem(last=False)
+    
+    def status(self, key):
+        """Return ``(state, payload)`` where state is ready, pending, failed or missing
         
-    except Exception as e:
-        st.error(f"Error generating PDF report: {str(e)}")
-        return None
+        While pending, the payload is the render's queue position, or None once it has started.
+        """
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return 'ready', self._cache[key]
+            if key in self._pending:
+                return 'pending', self._positions.get(key)
+            if key in self._errors:
+                return 'failed', self._errors[key]
+        return 'missing', None
+
+_report_service = ReportService()
+
+def get_report_service():
+    """Return the process-wide report rendering service"""
+    return _report_service
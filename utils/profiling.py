@@ -0,0 +1,67 @@
+"""Opt-in cProfile capture of whole Streamlit reruns
+
+Each profiled rerun is saved as a ``.pstats`` file under EXOHUNTER_PROFILE_DIR,
+which ``snakeviz``, ``flameprof`` or ``gprof2dot`` turn into flame graphs,
+and its hottest functions are shown inline below the page.
+"""
+import os
+import time
+import pstats
+import cProfile
+import contextlib
+import pandas as pd
+import streamlit as st
+
+PROFILE_DIR = os.environ.get("EXOHUNTER_PROFILE_DIR", "profiles")
+PROFILE_ALWAYS = os.environ.get("EXOHUNTER_PROFILE", "0") == "1"
+
+class ProfileRun:
+    """Result of one profiled rerun"""
+
+    def __init__(self, label):
+        self.label = label
+        self.path = None
+        self.seconds = None
+        self.stats = None
+
+    def top_functions(self, limit=15, sort='cumulative'):
+        """The ``limit`` hottest functions as rows of a table"""
+        column = 'cumtime' if sort == 'cumulative' else 'tottime'
+        rows = []
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in self.stats.stats.items():
+            rows.append({
+                'function': f"{name} ({os.path.basename(filename)}:{line})",
+                'calls': calls,
+                'tottime': tottime,
+                'cumtime': cumtime
+            })
+        rows.sort(key=lambda row: row[column], reverse=True)
+        return rows[:limit]
+
+@contextlib.contextmanager
+def profile_run(label, directory=PROFILE_DIR):
+    """Profile the enclosed block and save its pstats under ``directory``
+
+    Saves even when the block ends in ``st.rerun()`` or ``st.stop()``.
+    """
+    run = ProfileRun(label)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield run
+    finally:
+        profiler.disable()
+        run.seconds = time.perf_counter() - start
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        run.path = os.path.join(directory, f"{stamp}-{int(time.time() * 1000) % 1000:03d}-{label}.pstats")
+        profiler.dump_stats(run.path)
+        run.stats = pstats.Stats(profiler)
+
+def show_profile_report(run, limit=15):
+    """Inline summary of a profiled rerun"""
+    with st.expander(f"⏱️ Profile: {run.label} rerun took {run.seconds:.3f}s", expanded=True):
+        sort = st.radio("Sort by", ["cumulative", "tottime"], horizontal=True, key="profile_sort")
+        st.dataframe(pd.DataFrame(run.top_functions(limit, sort)), use_container_width=True)
+        st.caption(f"Saved to `{run.path}`")
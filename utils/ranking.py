@@ -0,0 +1,78 @@
+"""Ranked index over detection results
+
+Candidates are ranked by probability, highest first, ties broken by row
+position. A ``CandidateIndex`` is built once per result: the full sorted
+permutation is computed on first use, after which top-k, threshold counts
+and pages are slices and binary searches costing O(page) rather than a sort.
+Small top-k queries made before that use an ``argpartition`` fast path.
+"""
+import functools
+import numpy as np
+
+class CandidateIndex:
+    """Rank positions of a result's rows by probability"""
+
+    def __init__(self, probabilities, predictions=None):
+        self.probabilities = np.asarray(probabilities)
+        self.predictions = None if predictions is None else np.asarray(predictions)
+        self._rankings = {}
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    @functools.cached_property
+    def order(self):
+        """Every row position, highest probability first"""
+        probabilities = self.probabilities
+        if probabilities.dtype == np.float32 and not (probabilities < 0).any() and not np.isnan(probabilities).any():
+            # The bits of non-negative float32s order like the values, so one int64 key of
+            # (descending bits, row) sorts with a plain unstable sort, several times faster
+            # than a stable argsort and with the same tie order
+            bits = probabilities.view(np.int32).astype(np.int64)
+            key = ((np.int64(0x7f800000) - bits) << 32) | np.arange(len(probabilities), dtype=np.int64)
+            key.sort()
+            return key & 0xffffffff
+        return np.argsort(-probabilities.astype(np.float64), kind='stable')
+
+    def top(self, k):
+        """Positions of the ``k`` highest-probability rows, ranked"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if 'order' in self.__dict__:
+            return self.order[:k]
+        # Partition instead of sorting everything, then rank only the k winners.
+        # Rows tied with the k-th probability are taken in row order, as in ``order``.
+        cutoff = self.probabilities[np.argpartition(-self.probabilities, k - 1)[k - 1]]
+        above = np.flatnonzero(self.probabilities > cutoff)
+        tied = np.flatnonzero(self.probabilities == cutoff)[:k - len(above)]
+        top = np.concatenate([above, tied])
+        return top[np.lexsort((top, -self.probabilities[top]))]
+
+    def _ranking(self, label):
+        """Ranked positions for ``label`` (None for all rows) and their negated probabilities"""
+        if label not in self._rankings:
+            order = self.order
+            if label is not None:
+                if self.predictions is None:
+                    raise ValueError("Filtering by label needs the predictions.")
+                order = order[self.predictions[order] == label]
+            # Negated so the probabilities along the ranking ascend, for ``np.searchsorted``
+            self._rankings[label] = (order, -self.probabilities[order].astype(np.float64))
+        return self._rankings[label]
+
+    def ranked(self, label=None):
+        """Ranked positions, optionally only rows predicted as ``label``"""
+        return self._ranking(label)[0]
+
+    def count(self, min_probability=0.0, label=None):
+        """Number of ranked rows with probability of at least ``min_probability``"""
+        order, negated = self._ranking(label)
+        # Matching rows are a prefix of the ranking
+        return int(np.searchsorted(negated, -min_probability, side='right')) if min_probability > 0 else len(order)
+
+    def page(self, page, page_size, min_probability=0.0, label=None):
+        """Positions on 1-based ``page`` of the filtered ranking, and the filtered total"""
+        total = self.count(min_probability, label)
+        start = (page - 1) * page_size
+        return self.ranked(label)[start:min(start + page_size, total)], total
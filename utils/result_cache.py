@@ -0,0 +1,94 @@
+import os
+import mmap
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_MAX_BYTES = int(os.environ.get("EXOHUNTER_RESULT_CACHE_MB", "256")) * 1024 * 1024
+
+class ResultCache:
+    """Size-bounded LRU cache of compact detection outputs shared by all sessions
+
+    Entries are keyed by ``(feature hash, model version)`` and hold int8 predictions
+    and float32 probabilities; least recently used entries are evicted once the
+    stored arrays exceed ``max_bytes``. Arrays memory-mapped from a feature
+    store are paged by the OS and do not count against the budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _entry_size(entry):
+        return sum(_heap_bytes(value) for value in entry.values())
+
+    def get(self, key):
+        """Return the cached arrays for ``key`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, predictions, probabilities, xgb_predictions, cnn_predictions):
+        """Store one detection run in compact form and return the stored arrays"""
+        entry = {
+            'predictions': np.asarray(predictions, dtype=np.int8),
+            'probabilities': np.asarray(probabilities, dtype=np.float32),
+            'xgb': np.asarray(xgb_predictions, dtype=np.int8).ravel(),
+            'cnn': np.asarray(cnn_predictions, dtype=np.int8).ravel(),
+        }
+        for value in entry.values():
+            value.flags.writeable = False
+        size = self._entry_size(entry)
+        if size > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self._entry_size(previous)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self._entry_size(evicted)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+def _heap_bytes(array):
+    """Bytes ``array`` holds on the heap; 0 for views of a memory-mapped file"""
+    base = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return 0
+        base = getattr(base, 'base', None)
+    return array.nbytes
+
+_result_cache = ResultCache()
+
+def get_result_cache():
+    """Return the process-wide detection result cache"""
+    return _result_cache
@@ -0,0 +1,128 @@
+"""Row samples for plotting large tables
+
+Charts that only need the shape of the data plot a sample instead of every
+row. Each chart declares a policy:
+
+* ``EXACT`` - always use every row (aggregates, previews)
+* ``UNIFORM`` - a uniform reservoir sample, drawn while the upload is parsed;
+  unbiased, so histograms and box plots keep their shape
+* ``STRATIFIED`` - once detection results exist, a sample stratified by
+  predicted label and confidence band, so rare candidates stay visible in
+  scatter plots; falls back to ``UNIFORM`` before that
+
+Samples are row positions into the full table, so they cost a few hundred
+kilobytes however wide the table is. Summary statistics keep coming from
+full-data sketches.
+"""
+import os
+import functools
+import numpy as np
+
+DEFAULT_SAMPLE_ROWS = int(os.environ.get("EXOHUNTER_CHART_SAMPLE_ROWS", "50000"))
+
+EXACT = 'exact'
+UNIFORM = 'uniform'
+STRATIFIED = 'stratified'
+
+# Confidence bands used as strata within each predicted label
+CONFIDENCE_EDGES = (0.2, 0.5, 0.8, 0.95)
+
+class ReservoirSampler:
+    """Uniform sample of row positions from a stream of chunks (Algorithm R)
+
+    Only the number of rows in each chunk is needed, so the sampler can run
+    alongside chunked parsing without holding rows itself.
+    """
+
+    def __init__(self, size=DEFAULT_SAMPLE_ROWS, seed=0):
+        self.size = size
+        self.seen = 0
+        self._reservoir = np.empty(0, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, rows):
+        """Advance over the next ``rows`` rows of the stream"""
+        positions = np.arange(self.seen, self.seen + rows, dtype=np.int64)
+        free = max(self.size - len(self._reservoir), 0)
+        self._reservoir = np.concatenate([self._reservoir, positions[:free]])
+        rest = positions[free:]
+        if len(rest):
+            # Row i replaces a uniformly chosen slot with probability size / (i + 1)
+            slots = (self._rng.random(len(rest)) * (rest + 1)).astype(np.int64)
+            keep = slots < self.size
+            slots, rest = slots[keep], rest[keep]
+            # When a slot is hit more than once the latest row wins, as in the sequential algorithm
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last
+            self._reservoir[slots[last]] = rest[last]
+        self.seen += rows
+        return self
+
+    def positions(self):
+        """Sampled row positions in table order"""
+        return np.sort(self._reservoir)
+
+def uniform_positions(total_rows, size=DEFAULT_SAMPLE_ROWS, seed=0):
+    return ReservoirSampler(size, seed).update(total_rows).positions()
+
+def confidence_strata(predictions, probabilities, edges=CONFIDENCE_EDGES):
+    """Stratum code per row: predicted label crossed with confidence band"""
+    bands = np.digitize(probabilities, edges)
+    return np.asarray(predictions, dtype=np.int64) * (len(edges) + 1) + bands
+
+def stratified_positions(strata, size=DEFAULT_SAMPLE_ROWS, seed=0):
+    """Sample of row positions with every stratum (a small non-negative int code) represented
+
+    Half of ``size`` is split equally between strata (capped at each stratum's
+    count) and the rest proportionally to what is left of them, so a handful
+    of high-confidence candidates among millions of rows is never sampled away.
+    """
+    strata = np.asarray(strata)
+    if len(strata) <= size:
+        return np.arange(len(strata))
+    rng = np.random.default_rng(seed)
+    codes = np.flatnonzero(np.bincount(strata))
+    counts = np.bincount(strata)[codes]
+    # Half the sample is shared equally, the rest goes to strata by their remaining size
+    quota = np.minimum(counts, size // (2 * len(codes)))
+    room = counts - quota
+    quota += np.minimum(room, (room * (size - quota.sum())) // max(room.sum(), 1))
+    chosen = [
+        rng.choice(np.flatnonzero(strata == code), take, replace=False)
+        for code, take in zip(codes, quota) if take
+    ]
+    return np.sort(np.concatenate(chosen))
+
+class ChartSample:
+    """The rows one chart plots: the whole table or a sample of it"""
+
+    def __init__(self, df, positions=None, method=EXACT, tag=None):
+        self.df = df
+        self.positions = positions
+        self.method = method if positions is not None else EXACT
+        self.tag = tag
+
+    @functools.cached_property
+    def frame(self):
+        return self.df if self.positions is None else self.df.iloc[self.positions]
+
+    @property
+    def row_positions(self):
+        """Positions of the plotted rows in the full table"""
+        return np.arange(len(self.df)) if self.positions is None else self.positions
+
+    @property
+    def rows(self):
+        return len(self.df) if self.positions is None else len(self.positions)
+
+    @property
+    def key(self):
+        """Identifies the sample in figure cache keys"""
+        return (self.method, self.rows, self.tag)
+
+    @property
+    def caption(self):
+        if self.positions is None:
+            return None
+        method = "stratified by predicted label and confidence" if self.method == STRATIFIED else "uniform random sample"
+        return f"Showing {self.rows:,} of {len(self.df):,} rows ({method}). Summary statistics use every row."
@@ -0,0 +1,202 @@
+"""Mergeable streaming summaries for chunked ingest
+
+``KLLSketch`` estimates quantiles and ``Moments`` keeps Welford/Chan running
+moments; both are filled one chunk at a time and combine with ``merge``, so
+sketches built by parallel workers over disjoint chunks merge into the
+sketch of the whole table.
+
+Error bound: a KLL sketch with parameter ``k`` answers quantile queries with
+a value whose true rank is within ``rank_error(k)`` of the requested rank
+with 99% confidence, using O(k) memory per column. That is the Apache
+DataSketches normalised rank error, ``2.446 / k ** 0.9433`` (k=200 -> about
+1.65%). While a column has seen at most ``k`` values the sketch is exact.
+Count, mean, std, min and max are exact up to floating point.
+"""
+import numpy as np
+import pandas as pd
+
+DEFAULT_K = 200
+
+def rank_error(k=DEFAULT_K):
+    """Normalised rank error of a KLL sketch with parameter ``k`` at 99% confidence"""
+    return 2.446 / k ** 0.9433
+
+class KLLSketch:
+    """KLL quantile sketch over float values; NaNs are ignored"""
+
+    def __init__(self, k=DEFAULT_K, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold ``other`` into this sketch"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays behind so the promoted half keeps exact weight
+            held = items[-1:] if len(items) % 2 else items[:0]
+            paired = items[:len(items) - len(held)]
+            promoted = paired[self._rng.integers(2)::2]
+            self.levels[level] = held
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # Adding a level shrinks every capacity, so start over from the bottom
+            level = 0
+
+    def quantiles(self, qs):
+        """Estimated values at ranks ``qs`` (fractions in [0, 1]); NaN when empty"""
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        targets = qs * cumulative[-1]
+        positions = np.searchsorted(cumulative, targets, side='left')
+        return items[np.clip(positions, 0, len(items) - 1)]
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    @property
+    def size(self):
+        """Number of retained items (memory is O(k) regardless of ``n``)"""
+        return sum(len(items) for items in self.levels)
+
+class Moments:
+    """Count, mean, variance, min and max with Welford/Chan parallel updates"""
+
+    def __init__(self):
+        self.count = 0
+        self.missing = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nan = np.isnan(values)
+        self.missing += int(nan.sum())
+        values = values[~nan]
+        if len(values) == 0:
+            return self
+        batch = Moments()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        batch.max = float(values.max())
+        return self.merge(batch, missing=False)
+
+    def merge(self, other, missing=True):
+        if missing:
+            self.missing += other.missing
+        if other.count == 0:
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1, as in pandas)"""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+class TableSketch:
+    """Per-column moments and quantile sketches for the numeric columns of a table"""
+
+    def __init__(self, k=DEFAULT_K):
+        self.k = k
+        self.columns = {}
+
+    def update(self, df):
+        """Add one chunk; numeric columns are picked from the chunk's dtypes"""
+        for column in df.select_dtypes(include=[np.number]).columns:
+            moments, sketch = self.columns.setdefault(column, (Moments(), KLLSketch(self.k)))
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            moments.update(values)
+            sketch.update(values)
+        return self
+
+    def merge(self, other):
+        for column, (moments, sketch) in other.columns.items():
+            if column in self.columns:
+                self.columns[column][0].merge(moments)
+                self.columns[column][1].merge(sketch)
+            else:
+                self.columns[column] = (moments, sketch)
+        return self
+
+    def discard(self, columns):
+        """Forget ``columns``, e.g. ones that turned out not to be numeric"""
+        for column in columns:
+            self.columns.pop(column, None)
+        return self
+
+    def medians(self):
+        """Estimated median per column, for imputation"""
+        return {column: sketch.quantile(0.5) for column, (_, sketch) in self.columns.items()}
+
+    def describe(self, columns=None):
+        """Same rows as ``DataFrame.describe()`` for numeric columns"""
+        columns = list(self.columns) if columns is None else columns
+        summary = {}
+        for column in columns:
+            moments, sketch = self.columns[column]
+            q25, q50, q75 = sketch.quantiles([0.25, 0.5, 0.75])
+            summary[column] = {
+                'count': float(moments.count),
+                'mean': moments.mean if moments.count else np.nan,
+                'std': moments.std,
+                'min': moments.min if moments.count else np.nan,
+                '25%': q25,
+                '50%': q50,
+                '75%': q75,
+                'max': moments.max if moments.count else np.nan
+            }
+        return pd.DataFrame(summary)
+
+def sketch_frame(df, chunk_rows=100000, k=DEFAULT_K):
+    """Build a ``TableSketch`` of an in-memory DataFrame chunk by chunk"""
+    sketch = TableSketch(k)
+    for start in range(0, len(df), chunk_rows):
+        sketch.update(df.iloc[start:start + chunk_rows])
+    return sketch
@@ -0,0 +1,165 @@
+"""SQLite-backed user accounts and signed session tokens
+
+Passwords are stored as ``pbkdf2_sha256$<iterations>$<salt>$<hash>`` so the
+cost can be raised with EXOHUNTER_PBKDF2_ITERATIONS; older, cheaper hashes
+are upgraded on the next successful login. The database runs in WAL mode so
+logins read while signups write, and connections come from a small pool
+shared by all sessions.
+
+A successful login issues an HMAC-signed session token; checking it costs
+one SHA-256, so reruns and page changes never touch the password KDF.
+"""
+import os
+import hmac
+import time
+import queue
+import base64
+import hashlib
+import secrets
+import sqlite3
+import contextlib
+
+USER_DB_PATH = os.environ.get("EXOHUNTER_USER_DB", os.path.join("data", "users.sqlite3"))
+PBKDF2_ITERATIONS = int(os.environ.get("EXOHUNTER_PBKDF2_ITERATIONS", "600000"))
+SESSION_TTL_SECONDS = int(os.environ.get("EXOHUNTER_SESSION_TTL", str(12 * 3600)))
+POOL_SIZE = int(os.environ.get("EXOHUNTER_USER_DB_POOL", "4"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users(email);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def _b64(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _unb64(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password, iterations=PBKDF2_ITERATIONS, salt=None):
+    """Salted PBKDF2-SHA256 hash in the self-describing stored format"""
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+def check_password(password, stored):
+    """Constant-time comparison of ``password`` against a stored hash"""
+    _, iterations, salt, expected = stored.split("$")
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), int(iterations))
+    return hmac.compare_digest(digest, _unb64(expected))
+
+def _iterations(stored):
+    return int(stored.split("$")[1])
+
+class UserStore:
+    """User accounts in one SQLite file, safe to share across threads"""
+
+    def __init__(self, path=USER_DB_PATH, pool_size=POOL_SIZE, iterations=PBKDF2_ITERATIONS, secret=None):
+        self.path = path
+        self.iterations = iterations
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._pool = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        self._secret = secret.encode() if secret else self._load_secret()
+        # Verified against when an email is unknown, so misses cost the same as hits
+        self._dummy_hash = hash_password(secrets.token_hex(8), iterations)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _load_secret(self):
+        """Token signing key from EXOHUNTER_SESSION_SECRET, else one persisted in the database"""
+        configured = os.environ.get("EXOHUNTER_SESSION_SECRET")
+        if configured:
+            return configured.encode()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO settings (key, value) VALUES ('session_secret', ?)",
+                (secrets.token_hex(32),)
+            )
+            return conn.execute("SELECT value FROM settings WHERE key = 'session_secret'").fetchone()[0].encode()
+
+    def create_user(self, email, password):
+        """Add an account; returns False when the email is already registered"""
+        password_hash = hash_password(password, self.iterations)
+        with self._connection() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO users (email, password_hash, created_at) VALUES (?, ?, ?)",
+                    (email.strip().lower(), password_hash, time.time())
+                )
+            except sqlite3.IntegrityError:
+                return False
+        return True
+
+    def ensure_user(self, email, password):
+        """Create an account unless it already exists (used for the demo accounts)"""
+        with self._connection() as conn:
+            exists = conn.execute("SELECT 1 FROM users WHERE email = ?", (email.strip().lower(),)).fetchone()
+        if not exists:
+            self.create_user(email, password)
+
+    def authenticate(self, email, password):
+        """Check credentials, upgrading the stored hash when its cost is below the current setting"""
+        email = email.strip().lower()
+        with self._connection() as conn:
+            row = conn.execute("SELECT password_hash FROM users WHERE email = ?", (email,)).fetchone()
+        if row is None:
+            check_password(password, self._dummy_hash)
+            return False
+        if not check_password(password, row[0]):
+            return False
+        if _iterations(row[0]) < self.iterations:
+            with self._connection() as conn:
+                conn.execute(
+                    "UPDATE users SET password_hash = ? WHERE email = ?",
+                    (hash_password(password, self.iterations), email)
+                )
+        return True
+
+    def issue_token(self, email, ttl=SESSION_TTL_SECONDS):
+        """Signed ``email|expiry`` token proving a completed login"""
+        payload = f"{email.strip().lower()}|{int(time.time()) + ttl}".encode()
+        signature = hmac.new(self._secret, payload, hashlib.sha256).digest()
+        return f"{_b64(payload)}.{_b64(signature)}"
+
+    def verify_token(self, token):
+        """Email of a valid, unexpired token, else None"""
+        try:
+            payload_text, signature_text = token.split(".")
+            payload = _unb64(payload_text)
+            signature = _unb64(signature_text)
+        except (AttributeError, ValueError):
+            return None
+        expected = hmac.new(self._secret, payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(signature, expected):
+            return None
+        email, expiry = payload.decode().rsplit("|", 1)
+        return email if int(expiry) > time.time() else None
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()